@@ -8,17 +8,30 @@ This package contains the core game logic including:
 - Game loop control
 """
 
-from .exceptions import Quit, RoomError
-from .io import IOHandler, TelnetIO
+from .exceptions import Quit, RoomError, LoginRefused
+from .auth import AuthPool, auth
+from .sessions import SessionRegistry, sessions
+from .io import IOHandler, TelnetIO, AsyncIOHandler, AsyncTelnetIO
 from .parser import Parser
-from .server import GameServer
+from .server import GameServer, AsyncGameServer
+from .scheduler import Scheduler, scheduler
 
 __all__ = [
     'GameServer',
+    'AsyncGameServer',
     'IOHandler',
+    'AsyncIOHandler',
     'ConsoleIO', 
     'TelnetIO',
+    'AsyncTelnetIO',
     'Parser',
+    'Scheduler',
+    'scheduler',
+    'AuthPool',
+    'auth',
+    'SessionRegistry',
+    'sessions',
     'Quit',
-    'RoomError'
+    'RoomError',
+    'LoginRefused'
 ]
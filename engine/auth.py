@@ -0,0 +1,225 @@
+"""Password hashing off the session threads: a worker pool, admission and throttling."""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from passlib.hash import pbkdf2_sha256
+
+from ini import AUTH_WORKERS, AUTH_QUEUE, LOGIN_FAILURES, LOGIN_WINDOW
+from .exceptions import LoginRefused
+
+LATENCY_SAMPLES = 1000      # recent logins kept for percentiles
+TRY_AGAIN = "Something went wrong checking your password. Try again in a moment."
+
+
+def hash_password(password: str) -> str:
+    """Run in a worker: hash a new password."""
+    return pbkdf2_sha256.hash(password)
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    """Run in a worker: check a password against its hash."""
+    return pbkdf2_sha256.verify(password, password_hash)
+
+
+class LoginThrottle:
+    """
+    Failed logins per address over a sliding window. Once an address has
+    `failures` failures in the last `window` seconds it must wait for the
+    oldest of them to expire; a successful login wipes its slate.
+    """
+    def __init__(self, failures: int = LOGIN_FAILURES, window: float = LOGIN_WINDOW):
+        self.failures = failures
+        self.window = window
+        self.recent: dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, address: str|None) -> float:
+        """Seconds until `address` may try again, 0 if it may now."""
+        if address is None or not self.failures:
+            return 0.0
+        with self._lock:
+            recent = self._expire(address, time.monotonic())
+            if len(recent) < self.failures:
+                return 0.0
+            return recent[0] + self.window - time.monotonic()
+
+    def record(self, address: str|None, ok: bool) -> None:
+        if address is None:
+            return
+        with self._lock:
+            if ok:
+                self.recent.pop(address, None)
+            else:
+                self.recent.setdefault(address, deque()).append(time.monotonic())
+
+    def _expire(self, address: str, now: float) -> deque:
+        recent = self.recent.get(address)
+        if recent is None:
+            return deque()
+        while recent and recent[0] <= now - self.window:
+            recent.popleft()
+        if not recent:
+            del self.recent[address]
+        return recent
+
+
+class AuthPool:
+    """
+    Hashes and verifies passwords in a pool of worker processes.
+
+    pbkdf2 is slow on purpose, and run on a session thread (or worse, the
+    asyncio loop) a burst of logins after a restart holds everyone else up.
+    Here the work goes to `workers` processes instead. At most `queue`
+    jobs may be waiting or running at once; past that a login is refused
+    with LoginRefused rather than queued without limit, and so is one from
+    an address that LoginThrottle says has failed too often lately.
+
+    The sync calls (hash, verify) block only the calling session thread;
+    the async ones (hash_async, verify_async) await without blocking the
+    loop. If a worker dies, the job fails with LoginRefused too (the
+    player can just try again) and a fresh pool is started for the next.
+    Workers are started with the platform's default method (spawn on
+    Windows), by start() or else on first use.
+    """
+    def __init__(self, workers: int = AUTH_WORKERS, queue: int = AUTH_QUEUE,
+                 throttle: LoginThrottle|None = None):
+        self.workers = max(1, workers)
+        self.queue = max(1, queue)
+        self.throttle = throttle or LoginThrottle()
+        self.executor: ProcessPoolExecutor|None = None
+        self.pending = 0
+        self._lock = threading.Lock()
+        # metrics
+        self.jobs = 0
+        self.logins = 0
+        self.failures = 0
+        self.busy = 0           # refused: queue full
+        self.throttled = 0      # refused: too many failures from the address
+        self.latencies: deque = deque(maxlen=LATENCY_SAMPLES)  # seconds, submit to result
+        self.worst = 0.0
+
+    def start(self) -> None:
+        """Start every worker now rather than on first use."""
+        with self._lock:
+            self._executor()
+        warm = [self._submit(verify_password, '', hash_password('')) for _ in range(self.workers)]
+        for future in warm:
+            future.result()
+
+    def stop(self) -> None:
+        with self._lock:
+            executor, self.executor = self.executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def admit(self, address: str|None) -> None:
+        """Raise LoginRefused if `address` has to wait before trying again."""
+        if wait := self.throttle.wait(address):
+            self.throttled += 1
+            raise LoginRefused(f"Too many failed logins. Try again in {wait:.0f} seconds.")
+
+    def record(self, address: str|None, ok: bool) -> None:
+        """Count a login attempt from `address` as a success or a failure."""
+        self.logins += 1
+        self.failures += not ok
+        self.throttle.record(address, ok)
+
+    def hash(self, password: str) -> str:
+        future = self._submit(hash_password, password)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            raise LoginRefused(TRY_AGAIN) from e
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        future = self._submit(verify_password, password, password_hash)
+        try:
+            return future.result()
+        except BrokenProcessPool as e:
+            raise LoginRefused(TRY_AGAIN) from e
+
+    async def hash_async(self, password: str) -> str:
+        future = self._submit(hash_password, password)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            raise LoginRefused(TRY_AGAIN) from e
+
+    async def verify_async(self, password: str, password_hash: str) -> bool:
+        future = self._submit(verify_password, password, password_hash)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool as e:
+            raise LoginRefused(TRY_AGAIN) from e
+
+    def _submit(self, func, *args) -> Future:
+        with self._lock:
+            if self.pending >= self.queue:
+                self.busy += 1
+                raise LoginRefused("The server is busy. Try again in a moment.")
+            self.pending += 1
+            self.jobs += 1
+        started = time.perf_counter()
+        future = None
+        try:
+            with self._lock:
+                try:
+                    executor = self._executor()
+                    future = executor.submit(func, *args)
+                except BrokenProcessPool:
+                    # a worker died; start a fresh pool and try once more
+                    self._discard(executor)
+                    executor = self._executor()
+                    future = executor.submit(func, *args)
+        except Exception as e:
+            raise LoginRefused(TRY_AGAIN) from e
+        finally:
+            if future is None:
+                with self._lock:
+                    self.pending -= 1
+        future.add_done_callback(lambda done: self._done(done, executor, started))
+        return future
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        return self.executor
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Forget a broken pool, if it's still the current one."""
+        if self.executor is executor:
+            self.executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, future: Future, executor: ProcessPoolExecutor, started: float) -> None:
+        latency = time.perf_counter() - started
+        broken = not future.cancelled() and isinstance(future.exception(), BrokenProcessPool)
+        with self._lock:
+            self.pending -= 1
+            self.latencies.append(latency)
+            self.worst = max(self.worst, latency)
+            if broken:
+                self._discard(executor)
+
+    def percentiles(self, *points: float) -> list[float]:
+        """Latency percentiles (0-100) over the recent jobs, in seconds."""
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return [0.0 for _ in points]
+        return [samples[min(len(samples) - 1, int(len(samples) * point / 100))]
+                for point in points]
+
+    def report(self) -> str:
+        p50, p95, p99 = self.percentiles(50, 95, 99)
+        return (f"{self.logins} logins, {self.failures} failed, {self.busy} refused busy, "
+                f"{self.throttled} throttled, {self.pending} pending; latency "
+                f"p50 {p50 * 1000:.0f}ms p95 {p95 * 1000:.0f}ms p99 {p99 * 1000:.0f}ms "
+                f"worst {self.worst * 1000:.0f}ms")
+
+
+auth = AuthPool()
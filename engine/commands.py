@@ -1,6 +1,10 @@
+import random
+
 from orm import GameObject, Creature, Player, Item, Room, Exit
-from orm import do, SQL
+from orm import do, SQL, world, combat, presence, metrics
+from ini import ADMINS
 from engine import Quit
+from engine.sessions import sessions
 
 
 def target_types(*target_types):
@@ -12,6 +16,14 @@ def target_types(*target_types):
         return func
     return decorator
 
+def exact_only(func):
+    ''' 
+    This decorator keeps a command from being abbreviated: it only runs
+    when its name (or an alias) is typed in full.
+    '''
+    func.__exact_only__ = True
+    return func
+
 class CommandList():
     ''' 
     This is the master list of all player commands outside of combat,
@@ -106,6 +118,7 @@ class CommandList():
         elif not target:
             player.io.print(f'I cannot find that.')
         
+    @exact_only
     @target_types(None)
     def quit(player: Player, **kwargs):
         """
@@ -145,8 +158,110 @@ class CommandList():
             player.io.print(f"You go {way.direction}.")
             do(player, 'echo_around', None, arg=f"{player.name} heads {way.direction}.")
             do(player, 'chown', player, way.to_room)
-            player.io.print(player.room.view(player))
             do(player, 'echo_around', None, arg=f"{player.name} arrives.")
+            # queued, so it shows the room the move above ends up in
+            do(player, 'look', None, None)
+
+    @target_types(None)
+    def travel(player: Player, arg: str = None, **kwargs):
+        """
+        travel <room>   - walk the shortest way to a room, by name or #number
+        """
+        if not arg:
+            player.io.print("Travel where?")
+            return
+        destination = world.find_room(arg)
+        if destination is None:
+            player.io.print(f"There is no room called '{arg}'.")
+            return
+        # the way is worked out when the walk starts, after any moves
+        # already queued, and again at every step
+        do(player, 'walk', destination, None)
+
+    @target_types(Creature)
+    def kill(player: Player, target: Creature = None, arg: str = None, **kwargs):
+        """
+        kill <creature> - attack a creature until one of you dies or flees
+        """
+        if not target:
+            player.io.print('I cannot find that.' if arg else 'Kill what?')
+            return
+        if target is player:
+            player.io.print("You can't attack yourself.")
+            return
+        if combat.opponent(player) is target:
+            player.io.print(f'You are already fighting {target.name}!')
+            return
+        combat.engage(player, target)
+        player.io.print(f'You attack {target.name}!')
+        do(player, 'echo_around', None, arg=f"{player.name} attacks {target.name}!")
+
+    @target_types(None)
+    def flee(player: Player, **kwargs):
+        """
+        flee - run from a fight through a random exit
+        """
+        if combat.opponent(player) is None:
+            player.io.print("You aren't fighting anyone.")
+            return
+        if not player.room.exits:
+            player.io.print('There is nowhere to run!')
+            return
+        way = random.choice(player.room.exits)
+        combat.disengage(player)
+        player.io.print(f'You flee {way.direction}!')
+        do(player, 'echo_around', None, arg=f"{player.name} flees {way.direction}.")
+        do(player, 'chown', player, way.to_room)
+        do(player, 'echo_around', None, arg=f"{player.name} arrives, out of breath.")
+        do(player, 'look', None, None)
+
+    @target_types(None)
+    def who(player: Player, **kwargs):
+        """
+        who - list the players in the game
+        """
+        online = sorted(presence.online, key=lambda other: other.name)
+        link_dead = sorted(sessions.link_dead(), key=lambda other: other.name)
+        player.io.print(f' --- Players online: {len(online)} ---')
+        for other in online:
+            player.io.print(f'    {other.name}')
+        for other in link_dead:
+            player.io.print(f'    {other.name} (link-dead)')
+
+    @target_types(None)
+    def stats(player: Player, arg: str = None, **kwargs):
+        """
+        stats       - (admins) timings and traffic since the last reset
+        stats start - start timing commands, actions and commits
+        stats stop  - stop timing them
+        stats reset - forget everything recorded so far
+        """
+        if player.username not in ADMINS:
+            player.io.print('Only admins can do that.')
+            return
+        match arg:
+            case 'start':
+                metrics.enabled = True
+                player.io.print('Metrics on.')
+            case 'stop':
+                metrics.enabled = False
+                player.io.print('Metrics off.')
+            case 'reset':
+                metrics.reset()
+                player.io.print('Metrics reset.')
+            case None:
+                if not metrics.enabled:
+                    player.io.print("Metrics are off; 'stats start' turns them on.")
+                for line in metrics.report():
+                    player.io.print(line)
+                player.io.print(f'{"connections":<22}{"in":>12}{"out":>12}')
+                for other in sorted(presence.online, key=lambda other: other.name):
+                    player.io.print(f'  {other.name:<20}{other.io.bytes_in:>12}'
+                                    f'{other.io.bytes_out:>12}')
+                player.io.print(f'  {f"{metrics.connections} closed":<20}'
+                                f'{metrics.bytes_in:>12}{metrics.bytes_out:>12}')
+            case _:
+                player.io.print(CommandList.stats.__doc__)
 
     @target_types(None)
     def say(player: Player, arg: str = None, **kwargs):
@@ -157,9 +272,33 @@ class CommandList():
             player.io.print("Say what?")
             return
             
-        do(player, 'echo_at', None, arg=f"You say '{arg}'")
+        do(player, 'echo_at', player, arg=f"You say '{arg}'")
         do(player, 'echo_around', None, arg=f"{player.name} says, '{arg}'")
 
+    @target_types(None)
+    def shout(player: Player, arg: str = None, **kwargs):
+        """
+        shout <message> - Shout something to everyone in this zone
+        """
+        if not arg:
+            player.io.print("Shout what?")
+            return
+
+        do(player, 'echo_at', player, arg=f"You shout '{arg}'")
+        do(player, 'echo_zone', None, arg=f"{player.name} shouts, '{arg}'")
+
+    @target_types(None)
+    def chat(player: Player, arg: str = None, **kwargs):
+        """
+        chat <message> - Say something to everyone in the game
+        """
+        if not arg:
+            player.io.print("Chat what?")
+            return
+
+        do(player, 'echo_at', player, arg=f"[chat] You: {arg}")
+        do(player, 'broadcast', None, arg=f"[chat] {player.name}: {arg}", channel='global')
+
     @target_types(None)
     def emote(player: Player, arg: str = None, **kwargs):
         """
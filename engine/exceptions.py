@@ -10,3 +10,6 @@ class Quit(GameException):
 
 class RoomError(GameException):
     """Raised when a GameObject is not a Room, but should be."""
+
+class LoginRefused(GameException):
+    """Raised when a login can't be attempted now; the message says why."""
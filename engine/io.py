@@ -1,11 +1,25 @@
 from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import select
 import socket
+import threading
 
-from orm import Player, SQL
-from ini import STARTING_ROOM
+from sqlalchemy.exc import IntegrityError
+
+from orm import Player, session_scope, world_lock, load_player, presence, accounts, metrics
+from ini import STARTING_ROOM, OUTPUT_QUEUE_LIMIT, OUTPUT_OVERFLOW_POLICY
 from .parser import Parser
-from .exceptions import Quit
+from .exceptions import Quit, LoginRefused
+from .auth import auth
+from .sessions import sessions
+from .telnet import TelnetLineReader
+from .output import OutputQueue
 
+# Async connections hand everything that takes world_lock to this one
+# thread, so the event loop never waits on the lock (a slow action or a
+# checkpoint's copy would otherwise freeze every connection)
+game_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix='game')
 
 class IOHandler(ABC):
     """Base class for handling input/output operations in the game."""
@@ -13,25 +27,73 @@ class IOHandler(ABC):
     def __init__(self, parser: Parser):
         """Initialize with a command parser."""
         self.parser = parser
+        self.address: str|None = None   # the client's IP, for login throttling
+        # output counters, see output_stats()
+        self.commands = 0
+        self.prints = 0
+        self.writes = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
 
     def start_session(self) -> None:
         """Start a game session - authenticate and begin command loop."""
-        if player := self.authenticate():
-            # attach the io handler to the player object:
+        player = None
+        dropped = True
+        try:
+            if player := self.authenticate():
+                self._enter(player)
+                self.listen(player)
+                dropped = False
+        finally:
+            if player:
+                self._leave(player, dropped)
+            self.flush()
+            metrics.closed(self)
+
+    def _enter(self, player: Player) -> None:
+        """Attach to a logged-in player and start delivering broadcasts to it."""
+        with world_lock:
+            previous = getattr(player, 'io', None)
             player.io = self
-            self.listen(player)
+            presence.enter(player)
+        if previous is not None and previous is not self:
+            # resumed, or logged in again, while the old connection lingered
+            previous.close()
+        token = sessions.login(player)
+        if sessions.grace:
+            self.print(f"Your session token is {token}. If you lose your connection, "
+                       f"choose [R]esume and give it within {sessions.grace:.0f} "
+                       f"seconds to carry on.")
+
+    def _leave(self, player: Player, dropped: bool = False) -> None:
+        """
+        Stop delivering broadcasts to a player that has disconnected. One
+        whose connection dropped stays resumable for the grace period.
+        """
+        with world_lock:
+            if player.io is not self:
+                return  # resumed on another connection
+            presence.leave(player)
+        if dropped:
+            sessions.drop(player)
+        else:
+            sessions.logout(player)
 
     def authenticate(self) -> Player|None:
         """Authenticate player and return Player object or None."""
         while True:
-            choice = self.input("[L]ogin or [C]reate character? ")
+            choice = self.input(self._login_prompt())
             
             match choice.lower():
                 case "l":
                     if player := self._login():
                         return player
                 case "c":
-                    return self._create_player()
+                    if player := self._create_player():
+                        return player
+                case "r" if sessions.grace:
+                    if player := self._resume(self.input("Session token: ")):
+                        return player
                 case "q":
                     return None
     
@@ -40,7 +102,9 @@ class IOHandler(ABC):
         try:
             while True:
                 command = self.input()
-                self.parser.parse(player, command)
+                self.commands += 1
+                with world_lock:
+                    self.parser.parse(player, command)
         except Quit:
             self.print("Goodbye!")
             # Here we could do cleanup if needed
@@ -56,39 +120,116 @@ class IOHandler(ABC):
         """Get input from the user."""
         pass
 
+    def flush(self, wait: bool = True) -> None:
+        """Send any buffered output; handlers that buffer override this.
+
+        wait=False asks for a best-effort flush that never blocks the caller.
+        """
+        pass
+
+    def close(self) -> None:
+        """Hang up on a connection whose player has moved to another one."""
+        pass
+
+    def output_stats(self) -> dict:
+        """Output counters for this connection."""
+        return {
+            'commands': self.commands,
+            'prints': self.prints,
+            'writes': self.writes,
+            'writes_per_command': self.writes / max(self.commands, 1),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+        }
+
     def _login(self) -> Player|None:
         """Handle login flow."""
         username = self.input("Username: ").lower()
         password = self.input("Password: ")
         
-        if player := SQL.query(Player).filter_by(username=username).first():
-            if player.check_password(password):
-                return player
+        try:
+            auth.admit(self.address)
+            account = accounts.lookup(username)
+            ok = account is not None and auth.verify(password, account[1])
+        except LoginRefused as e:
+            self.print(str(e))
+            return None
+        auth.record(self.address, ok)
+        if ok:
+            return load_player(account[0])
         self.print("Invalid username or password")
         return None
 
-    def _create_player(self) -> Player:
+    @staticmethod
+    def _login_prompt() -> str:
+        if sessions.grace:
+            return "[L]ogin, [C]reate character or [R]esume? "
+        return "[L]ogin or [C]reate character? "
+
+    def _resume(self, token: str) -> Player|None:
+        """Take over a link-dead player's session with their token."""
+        try:
+            auth.admit(self.address)
+        except LoginRefused as e:
+            self.print(str(e))
+            return None
+        player = sessions.resume(token)
+        # bad tokens count towards the same limit as bad passwords
+        auth.throttle.record(self.address, player is not None)
+        if player is None:
+            self.print("That session has expired. Please log in.")
+            return None
+        self.print("Welcome back.")
+        return player
+
+    def _create_player(self) -> Player|None:
         """Handle new player creation flow."""
+        username = self._choose_username()
+        password = self.input("Choose password: ")
+        try:
+            password_hash = auth.hash(password)
+        except LoginRefused as e:
+            self.print(str(e))
+            return None
+        while (player := self._new_player(username, password_hash)) is None:
+            # someone else took the name while the password was being chosen
+            self.print("Username taken")
+            username = self._choose_username()
+        return player
+
+    def _choose_username(self) -> str:
         while True:
             username = self.input("Choose username: ").lower()
-            if not SQL.query(Player).filter_by(username=username).first():
-                break
+            if not accounts.taken(username):
+                return username
             self.print("Username taken")
-        
+
+    def _new_player(self, username: str, password_hash: str) -> Player|None:
+        """
+        Create and persist a new player with an already hashed password.
+        Return None if the username has been taken since it was checked.
+        """
         name = username.capitalize()
-        password = self.input("Choose password: ")
-        
         player = Player(
             username=username,
             name=name,
+            noun=username,
             description=f"A brave adventurer known as {name}",
             article=False,
             owner_id=STARTING_ROOM,
         )
-        player.set_password(password)
-        SQL.add(player)
-        SQL.commit()
-        return player
+        player.password_hash = password_hash
+        try:
+            with session_scope() as session:
+                session.add(player)
+                session.flush()
+                player_id = player.id
+        except IntegrityError:
+            # session_scope has rolled back; the cache may think it's free
+            accounts.forget(username)
+            return None
+        accounts.add(username, player_id, password_hash)
+        return load_player(player_id)
 
 class ConsoleIO(IOHandler):
     """Implementation of IOHandler for console-based interaction."""
@@ -99,6 +240,21 @@ class ConsoleIO(IOHandler):
     def input(self, prompt: str|None = None) -> str:
         return input(prompt or " > ").strip().lower()
 
+def telnet_encode(message: str = '', **kwargs) -> bytes:
+    """Encode a print() call for a telnet client with preserved formatting."""
+    # Handle end= parameter for prompts
+    if kwargs.get('end', '\n') == '':
+        # Single line without newline (prompt)
+        return message.encode()
+    # Split message into lines to preserve exact formatting
+    lines = message.splitlines() or ['']  # Handle empty strings
+    # Full message with preserved line breaks
+    output = []
+    for line in lines:
+        output.append(line)
+        output.append('\r\n')  # Explicit newline after each line
+    return ''.join(output).encode()
+
 class TelnetIO(IOHandler):
     """Implementation of IOHandler for telnet connections."""
     
@@ -109,31 +265,111 @@ class TelnetIO(IOHandler):
     WONT = bytes([252])
     WILL = bytes([251])
     
+    READ_SIZE = 4096
+
     def __init__(self, parser: Parser, connection: socket.socket):
         super().__init__(parser)
         self.connection = connection
-        self.buffer = bytearray()
+        try:
+            self.address = connection.getpeername()[0]
+        except (OSError, IndexError):
+            pass
+        # The socket is non-blocking, so a flush from another thread can never
+        # get stuck in send(); the session thread waits on select() instead,
+        # with the timeout the socket was given.
+        self.timeout = connection.gettimeout()
+        connection.setblocking(False)
+        self.buffer = bytearray(self.READ_SIZE)
+        self.decoder = TelnetLineReader()
+        # Output is coalesced here until the next flush(): the prompt, or
+        # the end of an action processing tick for messages from others.
+        self.outbuf = OutputQueue(OUTPUT_QUEUE_LIMIT, OUTPUT_OVERFLOW_POLICY)
+        self.link_dead = False
+        self._out_lock = threading.Lock()
+        self._send_lock = threading.Lock()
         
     def print(self, message: str = '', **kwargs) -> None:
-        """Send output to telnet client with preserved formatting."""
+        """Queue output for the telnet client with preserved formatting."""
+        data = telnet_encode(message, **kwargs)
+        with self._out_lock:
+            self.prints += 1
+            if self.outbuf.push(data):
+                return
+        self._drop_link()
+
+    def flush(self, wait: bool = True) -> None:
+        """
+        Send all queued output in a single write.
+
+        With wait=False (other threads, e.g. the action processor) this never
+        blocks: whatever the socket won't take now stays queued for later.
+        """
+        # Without wait, give up if someone else is already sending: they
+        # check the queue again after letting go of the lock
+        while self._send_lock.acquire(blocking=wait):
+            try:
+                if not self._send(wait):
+                    return  # the socket won't take more for now
+            finally:
+                self._send_lock.release()
+            with self._out_lock:
+                if not self.outbuf:
+                    return
+            # output arrived from a flush that found us sending: go again
+
+    def _send(self, wait: bool) -> bool:
+        """Send until the queue is empty (True) or the socket is full or gone (False)."""
+        while not self.link_dead:
+            with self._out_lock:
+                data = self.outbuf.take()
+            if not data:
+                return True
+            try:
+                sent = self.connection.send(data)
+            except BlockingIOError:
+                sent = 0
+            except Exception as e:
+                print(f"Error sending to client: {e}")
+                return False
+            if sent:
+                self.writes += 1
+                self.bytes_out += sent
+            if sent < len(data):
+                with self._out_lock:
+                    self.outbuf.unshift(data[sent:])
+                if not wait:
+                    return False
+                self._wait(writing=True)
+        return False
+
+    def _wait(self, writing: bool = False) -> None:
+        """Block until the socket can be read (or written), or it times out."""
+        waiting = [self.connection]
+        if writing:
+            ready = select.select([], waiting, [], self.timeout)[1]
+        else:
+            ready = select.select(waiting, [], [], self.timeout)[0]
+        if not ready:
+            raise socket.timeout("timed out")
+
+    def close(self) -> None:
+        """Hang up; wakes the session thread from waiting for input."""
         try:
-            # Split message into lines to preserve exact formatting
-            lines = message.splitlines() or ['']  # Handle empty strings
-            
-            # Handle end= parameter for prompts
-            if kwargs.get('end', '\n') == '':
-                # Single line without newline (prompt)
-                self.connection.send(message.encode())
-            else:
-                # Full message with preserved line breaks
-                output = []
-                for line in lines:
-                    output.append(line)
-                    output.append('\r\n')  # Explicit newline after each line
-                self.connection.send(''.join(output).encode())
-                
-        except Exception as e:
-            print(f"Error sending to client: {e}")
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _drop_link(self) -> None:
+        """Disconnect a client that stopped reading its output."""
+        if self.link_dead:
+            return
+        self.link_dead = True
+        print("Dropping link-dead client: output queue overflowed")
+        try:
+            # wakes the session thread from waiting for input
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
         
     def input(self, prompt: str|None = None) -> str:
         """Get input from telnet client."""
@@ -142,46 +378,236 @@ class TelnetIO(IOHandler):
                 self.print(prompt, end='')
             else:
                 self.print(" >> ", end='')  # Added default prompt
-            
-            line = ''
-            self.buffer.clear()
-            
-            while True:
-                byte = self.connection.recv(1)
-                if not byte:
-                    raise ConnectionError("Client disconnected")
-                
-                # Handle telnet protocol commands
-                if byte == self.IAC:
-                    cmd = self.connection.recv(1)
-                    opt = self.connection.recv(1)
-                    continue
-                
-                # Handle normal input
-                if byte == b'\r':
-                    continue
-                if byte == b'\n':
-                    self.connection.send(b'\r\n')  # Move to next line
-                    return line.strip().lower()
-                
-                # Handle backspace
-                if byte == b'\x7f' or byte == b'\x08':
-                    if line:
-                        line = line[:-1]
-                        # Erase character from screen
-                        self.connection.send(b'\x08 \x08')
+
+            if self.decoder.lines:
+                # typed ahead: still send each command's output as it's
+                # done, rather than letting a pasted batch pile up
+                self.flush()
+            # Read whole chunks; the reader keeps any typed-ahead lines
+            while not self.decoder.lines:
+                self.flush()
+                try:
+                    size = self.connection.recv_into(self.buffer)
+                except BlockingIOError:
+                    self._wait()
                     continue
-                
-                # Add printable characters to line
-                if byte.isascii() and not byte[0] > 127:
-                    char = byte.decode()
-                    line += char
-                    # Echo character back
-                    self.connection.send(byte)
-                    
+                if not size:
+                    raise ConnectionError("Client disconnected")
+                self.bytes_in += size
+                if echo := self.decoder.feed(memoryview(self.buffer)[:size]):
+                    with self._out_lock:
+                        queued = self.outbuf.push(echo)
+                    if not queued:
+                        self._drop_link()   # the next recv() sees the hang up
+            return self.decoder.lines.popleft()
+
         except Exception as e:
             print(f"Error receiving from client: {e}")
             raise
 
+class AsyncIOHandler(IOHandler):
+    """Base class for input/output on an asyncio event loop.
+
+    The session flow mirrors IOHandler, but input() is a coroutine so one
+    event loop can multiplex every connection. print() stays synchronous
+    (and safe from any thread), so the Parser and CommandList are shared
+    unchanged between both server modes. Commands are parsed on game_thread.
+    """
+
+    async def start_session(self) -> None:
+        """Start a game session - authenticate and begin command loop."""
+        player = None
+        dropped = True
+        try:
+            if player := await self.authenticate():
+                await self._in_game_thread(self._enter, player)
+                await self.listen(player)
+                dropped = False
+        finally:
+            if player:
+                await self._in_game_thread(self._leave, player, dropped)
+            self.flush()
+            metrics.closed(self)
+
+    async def _in_game_thread(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(game_thread, func, *args)
+
+    def _parse(self, player: Player, command: str) -> None:
+        with world_lock:
+            self.parser.parse(player, command)
+
+    async def authenticate(self) -> Player|None:
+        """Authenticate player and return Player object or None."""
+        while True:
+            choice = await self.input(self._login_prompt())
+
+            match choice.lower():
+                case "l":
+                    if player := await self._login():
+                        return player
+                case "c":
+                    if player := await self._create_player():
+                        return player
+                case "r" if sessions.grace:
+                    if player := self._resume(await self.input("Session token: ")):
+                        return player
+                case "q":
+                    return None
+
+    async def listen(self, player: Player) -> None:
+        """Main command loop - get input and pass to parser."""
+        try:
+            while True:
+                command = await self.input()
+                self.commands += 1
+                await self._in_game_thread(self._parse, player, command)
+        except Quit:
+            self.print("Goodbye!")
+            return
+
+    @abstractmethod
+    async def input(self, prompt: str|None = None) -> str:
+        """Get input from the user."""
+        pass
+
+    # Anything that may touch the database (an account that isn't cached,
+    # loading or creating a player) runs on a worker thread, so a slow query
+    # holds up this one login rather than the whole event loop.
+
+    async def _login(self) -> Player|None:
+        """Handle login flow."""
+        username = (await self.input("Username: ")).lower()
+        password = await self.input("Password: ")
+
+        try:
+            auth.admit(self.address)
+            account = await asyncio.to_thread(accounts.lookup, username)
+            ok = account is not None and await auth.verify_async(password, account[1])
+        except LoginRefused as e:
+            self.print(str(e))
+            return None
+        auth.record(self.address, ok)
+        if ok:
+            return await asyncio.to_thread(load_player, account[0])
+        self.print("Invalid username or password")
+        return None
+
+    async def _create_player(self) -> Player|None:
+        """Handle new player creation flow."""
+        username = await self._choose_username()
+        password = await self.input("Choose password: ")
+        try:
+            password_hash = await auth.hash_async(password)
+        except LoginRefused as e:
+            self.print(str(e))
+            return None
+        while (player := await asyncio.to_thread(self._new_player, username,
+                                                 password_hash)) is None:
+            self.print("Username taken")
+            username = await self._choose_username()
+        return player
+
+    async def _choose_username(self) -> str:
+        while True:
+            username = (await self.input("Choose username: ")).lower()
+            if not await asyncio.to_thread(accounts.taken, username):
+                return username
+            self.print("Username taken")
+
+class AsyncTelnetIO(AsyncIOHandler):
+    """Implementation of AsyncIOHandler for telnet connections."""
+
+    READ_SIZE = 4096
+
+    def __init__(self, parser: Parser,
+                 reader: asyncio.StreamReader,
+                 writer: asyncio.StreamWriter,
+                 timeout: float|None = None):
+        super().__init__(parser)
+        self.reader = reader
+        self.writer = writer
+        if peer := writer.get_extra_info('peername'):
+            self.address = peer[0]
+        self.timeout = timeout
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread = threading.get_ident()
+        self.decoder = TelnetLineReader()
+        # coalesced output until the next flush()
+        self.outbuf = OutputQueue(OUTPUT_QUEUE_LIMIT, OUTPUT_OVERFLOW_POLICY)
+        self._draining: asyncio.Task|None = None
+
+    def print(self, message: str = '', **kwargs) -> None:
+        """Queue output for the telnet client; safe to call from any thread."""
+        data = telnet_encode(message, **kwargs)
+        if threading.get_ident() == self.loop_thread:
+            self._queue(data)
+        else:
+            # e.g. echoes coming from the action processing thread
+            self.loop.call_soon_threadsafe(self._queue, data)
+
+    def close(self) -> None:
+        """Hang up; safe to call from any thread."""
+        if threading.get_ident() == self.loop_thread:
+            self.writer.transport.abort()
+        else:
+            self.loop.call_soon_threadsafe(self.writer.transport.abort)
+
+    def _queue(self, data: bytes) -> None:
+        self.prints += 1
+        if not self.outbuf.push(data):
+            print("Dropping link-dead client: output queue overflowed")
+            self.writer.transport.abort()
+
+    def flush(self, wait: bool = True) -> None:
+        """Send all queued output in a single write; never blocks."""
+        if threading.get_ident() != self.loop_thread:
+            self.loop.call_soon_threadsafe(self.flush)
+            return
+        if self.writer.is_closing() or self._draining:
+            return
+        transport = self.writer.transport
+        if transport.get_write_buffer_size() >= transport.get_write_buffer_limits()[1]:
+            # The client isn't keeping up; let output wait in our bounded
+            # queue rather than growing the transport's unbounded buffer.
+            self._draining = self.loop.create_task(self._drain())
+            return
+        if data := self.outbuf.take():
+            try:
+                self.writer.write(data)
+                self.writes += 1
+                self.bytes_out += len(data)
+            except Exception as e:
+                print(f"Error sending to client: {e}")
+
+    async def _drain(self) -> None:
+        try:
+            await self.writer.drain()
+        except Exception:
+            return
+        finally:
+            self._draining = None
+        self.flush()
+
+    async def input(self, prompt: str|None = None) -> str:
+        """Get input from telnet client."""
+        self.print(prompt or " >> ", end='')
+        lines = self.decoder.lines
+        if lines:
+            self.flush()    # typed ahead, as in TelnetIO.input
+        while not lines:
+            self.flush()
+            if self.timeout:
+                data = await asyncio.wait_for(self.reader.read(self.READ_SIZE),
+                                              self.timeout)
+            else:
+                data = await self.reader.read(self.READ_SIZE)
+            if not data:
+                raise ConnectionError("Client disconnected")
+            self.bytes_in += len(data)
+            if (echo := self.decoder.feed(data)) and not self.outbuf.push(echo):
+                print("Dropping link-dead client: output queue overflowed")
+                self.writer.transport.abort()
+        return lines.popleft()
+
 if __name__ == "__main__":
     print("This module is not meant to be run directly. use main.py instead.")
\ No newline at end of file
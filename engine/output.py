@@ -0,0 +1,81 @@
+"""Bounded per-connection output queue with an overflow policy."""
+from collections import deque
+
+
+class OutputQueue:
+    """
+    Holds a connection's unsent output, bounded to `limit` bytes.
+
+    When a client stops reading, output piles up here instead of blocking
+    whoever is printing to it. Once the limit is reached the policy decides:
+        drop_oldest - discard the oldest queued messages to make room
+        truncate    - discard new output (the client sees a marker)
+        disconnect  - refuse the output; the caller drops the link
+    """
+    DROP_OLDEST = 'drop_oldest'
+    TRUNCATE = 'truncate'
+    DISCONNECT = 'disconnect'
+    POLICIES = (DROP_OLDEST, TRUNCATE, DISCONNECT)
+
+    TRUNCATED = b'\r\n[output truncated]\r\n'
+
+    def __init__(self, limit: int = 64 * 1024, policy: str = DROP_OLDEST):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown output overflow policy: {policy}")
+        self.limit = limit
+        self.policy = policy
+        self.chunks = deque()
+        self.size = 0
+        self.dropped = 0        # bytes discarded by the policy
+        self.overflows = 0      # times the limit was hit
+        self.truncated = False
+
+    def __len__(self) -> int:
+        return self.size
+
+    def push(self, data: bytes) -> bool:
+        """Queue data; False means the policy wants the link dropped."""
+        if self.size + len(data) <= self.limit:
+            self.chunks.append(data)
+            self.size += len(data)
+            return True
+
+        self.overflows += 1
+        if self.policy == self.DISCONNECT:
+            self.dropped += len(data)
+            return False
+        if self.policy == self.TRUNCATE:
+            self.dropped += len(data)
+            if not self.truncated:
+                self.truncated = True
+                self.chunks.append(self.TRUNCATED)
+                self.size += len(self.TRUNCATED)
+            return True
+
+        # drop oldest
+        if len(data) > self.limit:
+            self.dropped += len(data) - self.limit
+            data = data[-self.limit:]
+        while self.chunks and self.size + len(data) > self.limit:
+            oldest = self.chunks.popleft()
+            self.size -= len(oldest)
+            self.dropped += len(oldest)
+        self.chunks.append(data)
+        self.size += len(data)
+        return True
+
+    def take(self) -> bytes:
+        """Remove and return everything queued as a single write."""
+        if not self.chunks:
+            return b''
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        self.size = 0
+        self.truncated = False
+        return data
+
+    def unshift(self, data: bytes) -> None:
+        """Put back the unsent tail of a partial write, ahead of newer output."""
+        if data:
+            self.chunks.appendleft(data)
+            self.size += len(data)
@@ -1,33 +1,112 @@
-from typing import List
+import time
+from typing import Callable, List
 
 from engine.commands import AliasList, CommandList
 from orm import Player, GameObject, Room, Item, Creature, Exit
+from orm import target_index, action_queue, metrics
+
+
+class TrieNode:
+    """One character of a verb prefix."""
+    __slots__ = ('children', 'commands')
+
+    def __init__(self):
+        self.children: dict[str, TrieNode] = {}
+        self.commands: set[Callable] = set()    # every handler whose verbs start here
+
+
+class CommandTable:
+    """
+    Every verb a player can type, built once from the command lists.
+
+    Exact verbs (commands and aliases alike) are a dictionary lookup. Anything
+    else is taken as an abbreviation and walked down a prefix trie, which
+    matches if every verb it could start belongs to the same handler: "invent"
+    is inventory, but "so" could be south, southeast or southwest. Commands
+    marked @exact_only are left out of the trie.
+    """
+    def __init__(self, *command_lists: type):
+        self.verbs: dict[str, Callable] = {}
+        self.root = TrieNode()
+        for command_list in command_lists:
+            for verb, handler in vars(command_list).items():
+                if verb.startswith('_') or not hasattr(handler, '__target_types__'):
+                    continue
+                # the first list to define a verb wins, as getattr() order did
+                self.verbs.setdefault(verb, handler)
+        for verb, handler in self.verbs.items():
+            if getattr(handler, '__exact_only__', False):
+                continue
+            node = self.root
+            for char in verb:
+                node = node.children.setdefault(char, TrieNode())
+                node.commands.add(handler)
+        # a handler's longest verb names it when listing ambiguous matches
+        self.names: dict[Callable, str] = {}
+        for verb, handler in sorted(self.verbs.items(), key=lambda item: len(item[0])):
+            self.names[handler] = verb
+
+    def lookup(self, verb: str) -> tuple[Callable|None, list[str]]:
+        """
+        The handler for a verb or an abbreviation of one. If there is none,
+        also return the verbs an ambiguous abbreviation could mean.
+        """
+        handler = self.verbs.get(verb)
+        if handler is not None:
+            return handler, []
+        node = self.root
+        for char in verb:
+            node = node.children.get(char)
+            if node is None:
+                return None, []
+        if len(node.commands) == 1:
+            return next(iter(node.commands)), []
+        return None, sorted(self.names[handler] for handler in node.commands)
+
 
 class Parser:
     """Handles parsing and executing game commands."""
-    
+
+    def __init__(self):
+        self.commands = CommandTable(CommandList, AliasList)
+
     def parse(self, player: Player, command_str: str) -> None:
         """Parse and execute a game command."""
-        if not command_str:
-            player.io.print('Huh?\n')   
+        if not metrics.enabled:
+            self._parse(player, command_str)
             return
+        started = time.perf_counter()
+        if command := self._parse(player, command_str):
+            metrics.observe('command', self.commands.names[command],
+                            time.perf_counter() - started)
 
-        if command_str[0] == "'":
+    def _parse(self, player: Player, command_str: str) -> Callable|None:
+        """Parse and execute a game command; return the handler if one ran."""
+        if command_str and command_str[0] == "'":
             command_str = 'say ' + command_str[1:]
 
+        if not command_str or command_str.isspace():
+            player.io.print('Huh?\n')   
+            return
+
+        if not action_queue.admits(player):
+            player.io.print("You're doing too much at once. Wait a moment.")
+            return
+
         verb, *args = command_str.split()
      
         mine = False
         preposition = None
         article = None
-        command = getattr(CommandList, verb, None)
-        alias = getattr(AliasList, verb, None)
+        command, candidates = self.commands.lookup(verb.lower())
 
-        if not command and not alias: 
+        if candidates:
+            player.io.print(f"'{verb}' could mean: {', '.join(candidates)}")
+            return
+        if not command:
             player.io.print(f"Command '{command_str}' not found")
             return
-        else:
-            valid_target_types = command.__target_types__ if command else alias.__target_types__
+        valid_target_types = command.__target_types__
 
         if args:
             # check for prepositions
@@ -44,21 +123,13 @@ class Parser:
         else:
             arg = None
     
-        if mine:
-            if arg not in [inv.name for inv in player.inventory]:
-                player.io.print(f'I cannot find your "{arg}".')
-                return 
-
         target = find_target(player, valid_target_types, arg, mine)
+        if mine and target is None:
+            return
 
         
-        if command: 
-            command(player=player, arg=arg, target=target)                
-        elif alias:
-            alias(player=player, arg=arg, target=target)
-        else:                 
-            player.io.print(f'Unknown command "{command}".')
-            player.io.print('Type "help" for a list of commands.\n')
+        command(player=player, arg=arg, target=target)
+        return command
 
 
 def find_target(player:Player, target_types:List[type], arg:str, mine:bool=False) -> GameObject:
@@ -67,7 +138,8 @@ def find_target(player:Player, target_types:List[type], arg:str, mine:bool=False
     Args:
         player: The player looking for the target
         target_types: List of valid target classes (Item, Creature, etc)
-        arg: Name of target to find
+        arg: Name of target to find: a name, noun or "adjective noun",
+             optionally numbered ("2.sword" is the second sword)
         mine: Whether to search inventory instead of room
     """
     if not arg:
@@ -75,21 +147,24 @@ def find_target(player:Player, target_types:List[type], arg:str, mine:bool=False
     
     if arg in ['me', 'myself']:
         return player
-    
-    if mine:
-        for item in player.inventory:
-            if item.name == arg and any(isinstance(item, t) for t in target_types):
-                return item
-        else:
-            player.io.print(f'I cannot find your "{arg}".')
-            return None
-        
-    for object in player.room.inventory:
-        if object.name == arg and any(isinstance(object, t) for t in target_types):
-            return object
-        
-    for object in player.inventory:
-        if object.name == arg and any(isinstance(object, t) for t in target_types):
-            return object
 
+    number, dot, words = arg.partition('.')
+    if dot and number.isdigit() and int(number) > 0:
+        nth = int(number)
+    else:
+        nth, words = 1, arg
+    types = tuple(t for t in target_types if t is not None)
+
+    containers = [player] if mine else [player.room, player]
+    for container in containers:
+        if container is None:
+            continue
+        for object in target_index(container).find(words):
+            if isinstance(object, types):
+                nth -= 1
+                if not nth:
+                    return object
+
+    if mine:
+        player.io.print(f'I cannot find your "{arg}".')
     return None
@@ -0,0 +1,256 @@
+"""Game time: a fixed-rate tick loop and a timer wheel for delayed events."""
+import threading
+import time
+from typing import Callable
+
+from orm import do
+from ini import TICK_RATE, TICK_CATCHUP, ACTION_STATS_INTERVAL
+
+# Wheel geometry: 256 one-tick slots, then three levels of 256 slots, each
+# slot spanning all of the level below (256, 65536 and 2**24 ticks). Wide
+# levels keep cascades small: at 10 ticks a second, the first two levels
+# cover 1.8 hours. Anything further out than 2**32 ticks waits in the last
+# level's furthest slot and is re-placed each time it comes round.
+ROOT_BITS = 8
+LEVEL_BITS = 8
+LEVELS = 4
+ROOT_SIZE = 1 << ROOT_BITS
+LEVEL_SIZE = 1 << LEVEL_BITS
+HORIZON = 1 << (ROOT_BITS + LEVEL_BITS * (LEVELS - 1))
+
+
+class Timer:
+    """One scheduled event; keep it to cancel() it."""
+    __slots__ = ('expires', 'payload', 'slot')
+
+    def __init__(self, expires: int, payload):
+        self.expires = expires
+        self.payload = payload
+        self.slot = None        # the dict holding it, None once fired or cancelled
+
+    @property
+    def active(self) -> bool:
+        return self.slot is not None
+
+
+class TimerWheel:
+    """
+    A hierarchical timer wheel counting in ticks.
+
+    schedule() and cancel() are O(1): a timer goes in the slot of the
+    coarsest level it fits, and slots are dicts so it can be taken out again
+    by key. advance() moves time on a tick and returns what expired. Each
+    time the fine level wraps, the next level's current slot is cascaded
+    down, so a timer is touched once per level rather than once per tick.
+    """
+    def __init__(self):
+        self.now = 0
+        self.levels = [[{} for _ in range(ROOT_SIZE)]]
+        self.levels += [[{} for _ in range(LEVEL_SIZE)] for _ in range(LEVELS - 1)]
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def schedule(self, ticks: int, payload) -> Timer:
+        """Fire payload `ticks` ticks from now (at least one)."""
+        timer = Timer(self.now + max(1, ticks), payload)
+        self._place(timer)
+        self.count += 1
+        return timer
+
+    def resume(self, timer: Timer, ticks: int) -> Timer:
+        """Put a cancelled timer back, to fire `ticks` ticks from now."""
+        if timer.slot is None:
+            timer.expires = self.now + max(1, ticks)
+            self._place(timer)
+            self.count += 1
+        return timer
+
+    def cancel(self, timer: Timer) -> bool:
+        if timer.slot is None:
+            return False
+        del timer.slot[timer]
+        timer.slot = None
+        self.count -= 1
+        return True
+
+    def _place(self, timer: Timer) -> None:
+        expires = timer.expires
+        delta = expires - self.now
+        if delta < ROOT_SIZE:
+            slot = self.levels[0][expires & (ROOT_SIZE - 1)]
+        else:
+            if delta >= HORIZON:
+                expires = self.now + HORIZON - 1
+            for level in range(1, LEVELS):
+                shift = ROOT_BITS + LEVEL_BITS * level
+                if delta < 1 << shift or level == LEVELS - 1:
+                    slot = self.levels[level][(expires >> (shift - LEVEL_BITS)) & (LEVEL_SIZE - 1)]
+                    break
+        slot[timer] = None
+        timer.slot = slot
+
+    def _cascade(self, level: int) -> int:
+        shift = ROOT_BITS + LEVEL_BITS * (level - 1)
+        index = (self.now >> shift) & (LEVEL_SIZE - 1)
+        slot = self.levels[level][index]
+        timers = list(slot)
+        slot.clear()
+        for timer in timers:
+            self._place(timer)
+        return index
+
+    def advance(self) -> list:
+        """Move on one tick; return the payloads of the timers that expired."""
+        self.now += 1
+        index = self.now & (ROOT_SIZE - 1)
+        if index == 0:
+            level = 1
+            while level < LEVELS and self._cascade(level) == 0:
+                level += 1
+        slot = self.levels[0][index]
+        if not slot:
+            return []
+        expired = []
+        for timer in slot:
+            timer.slot = None
+            expired.append(timer.payload)
+        self.count -= len(slot)
+        slot.clear()
+        return expired
+
+
+class Scheduler:
+    """
+    Runs game time at a fixed tick rate and fires scheduled events.
+
+    An event is either an action, handed to do() when it fires so it runs
+    in order with everything else on the action queue, or a callable,
+    called on the scheduler thread (take world_lock to touch the world).
+    The loop keeps to a fixed rate: a late tick is caught up by running the
+    missed ones back to back, up to TICK_CATCHUP, beyond which the missed
+    time is skipped. Ticks that take longer than their period are counted
+    as overruns.
+    """
+    def __init__(self, tick_rate: float = TICK_RATE):
+        self.tick_seconds = 1 / tick_rate
+        self.wheel = TimerWheel()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # instrumentation
+        self.ticks = 0
+        self.fired = 0
+        self.overruns = 0           # ticks whose work took longer than a tick
+        self.skipped = 0            # ticks dropped after falling too far behind
+        self.busy_seconds = 0.0
+        self.worst_tick = 0.0
+        self.worst_lag = 0.0
+
+    @property
+    def now(self) -> int:
+        """Game time, in ticks."""
+        return self.wheel.now
+
+    def ticks_for(self, seconds: float) -> int:
+        return max(1, round(seconds / self.tick_seconds))
+
+    def after(self, seconds: float, subject, action: str, target=None, arg=None, **kwargs) -> Timer:
+        """do(subject, action, target, arg, **kwargs) in `seconds`."""
+        return self.schedule(self.ticks_for(seconds), (subject, action, target, arg, kwargs))
+
+    def call_later(self, seconds: float, callback: Callable, *args) -> Timer:
+        """callback(*args) on the scheduler thread in `seconds`."""
+        return self.schedule(self.ticks_for(seconds), (callback, args))
+
+    def every(self, seconds: float, callback: Callable, *args) -> None:
+        """callback(*args) every `seconds`, until it returns False."""
+        ticks = self.ticks_for(seconds)
+        def repeat(*args):
+            if callback(*args) is not False:
+                self.schedule(ticks, (repeat, args))
+        self.schedule(ticks, (repeat, args))
+
+    def schedule(self, ticks: int, payload) -> Timer:
+        with self._lock:
+            return self.wheel.schedule(ticks, payload)
+
+    def cancel(self, timer: Timer) -> bool:
+        with self._lock:
+            return self.wheel.cancel(timer)
+
+    def suspend(self, timer: Timer) -> int|None:
+        """Take a timer out of the wheel; return the ticks it had left, or None."""
+        with self._lock:
+            if not timer.active:
+                return None
+            self.wheel.cancel(timer)
+            return timer.expires - self.wheel.now
+
+    def resume(self, timer: Timer, ticks: int) -> Timer:
+        """Put a suspended timer back, to fire `ticks` ticks from now."""
+        with self._lock:
+            return self.wheel.resume(timer, ticks)
+
+    def tick(self) -> int:
+        """Advance game time by one tick and fire what is due."""
+        with self._lock:
+            expired = self.wheel.advance()
+        for payload in expired:
+            try:
+                if len(payload) == 2:
+                    callback, args = payload
+                    callback(*args)
+                else:
+                    subject, action, target, arg, kwargs = payload
+                    do(subject, action, target, arg, **kwargs)
+            except Exception as e:
+                print(f"Error in scheduled event {payload}: {e}")
+        self.ticks += 1
+        self.fired += len(expired)
+        return len(expired)
+
+    def run(self) -> None:
+        """Tick at the fixed rate until stop()."""
+        next_tick = time.monotonic()
+        next_report = next_tick + ACTION_STATS_INTERVAL if ACTION_STATS_INTERVAL else None
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if now < next_tick:
+                self._stop.wait(next_tick - now)
+                continue
+            lag = now - next_tick
+            self.worst_lag = max(self.worst_lag, lag)
+            behind = int(lag / self.tick_seconds)
+            if behind > TICK_CATCHUP:
+                self.skipped += behind - TICK_CATCHUP
+                next_tick += (behind - TICK_CATCHUP) * self.tick_seconds
+            started = time.perf_counter()
+            self.tick()
+            elapsed = time.perf_counter() - started
+            self.busy_seconds += elapsed
+            self.worst_tick = max(self.worst_tick, elapsed)
+            if elapsed > self.tick_seconds:
+                self.overruns += 1
+            next_tick += self.tick_seconds
+            if next_report and now >= next_report:
+                next_report = now + ACTION_STATS_INTERVAL
+                print(f"Ticks: {self.report()}")
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, daemon=True, name='scheduler')
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def report(self) -> str:
+        """Instrumentation since the start."""
+        load = self.busy_seconds / max(self.ticks * self.tick_seconds, 1e-9)
+        return (f"{self.ticks} ticks, {self.fired} events fired, {len(self.wheel)} pending, "
+                f"{load:.1%} busy, {self.overruns} overruns, {self.skipped} skipped, "
+                f"worst tick {self.worst_tick * 1000:.1f}ms, worst lag {self.worst_lag * 1000:.1f}ms")
+
+
+scheduler = Scheduler()
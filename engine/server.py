@@ -1,9 +1,11 @@
+import asyncio
 import socket
 import threading
 import time
-from typing import Optional, Dict, Set
+from typing import Optional, Dict
 from .parser import Parser
-from .io import TelnetIO
+from .io import TelnetIO, AsyncTelnetIO
+from .sessions import sessions
 
 class GameServer:
     """Game server that listens for and handles client connections."""
@@ -25,7 +27,7 @@ class GameServer:
         self.parser = Parser()
         self.running = False
         self.clients: Dict[socket.socket, threading.Thread] = {}
-        self.active_players: Set[str] = set()
+        self.sessions = sessions   # logged-in and link-dead players
         self._lock = threading.Lock()
         
     def start(self) -> None:
@@ -66,11 +68,15 @@ class GameServer:
                 except:
                     pass
             self.clients.clear()
-            self.active_players.clear()
+            self.sessions.clear()
             
     def _handle_client(self, client_socket: socket.socket) -> None:
         """Create new thread for client connection."""
         client_socket.settimeout(self.timeout)
+        # Output goes out in a few writes a command (the action tick's, then
+        # the prompt); without this, Nagle holds the second back until the
+        # client's delayed ACK for the first, ~40ms later
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self._setup_telnet(client_socket)
         
         client_thread = threading.Thread(
@@ -113,5 +119,83 @@ class GameServer:
         except Exception as e:
             print(f"Telnet negotiation error: {e}")
 
+class AsyncGameServer(GameServer):
+    """Game server that multiplexes every client on a single asyncio loop.
+
+    Each connection is a coroutine rather than a thread, so thousands of
+    idle players cost a few kilobytes each instead of a thread stack.
+    """
+
+    def __init__(self, host: str = '0.0.0.0', port: int = 4000,
+                 timeout: int = 300, backlog: int = 1024):
+        super().__init__(host, port, timeout)
+        self.backlog = backlog
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.clients: Dict[asyncio.StreamWriter, asyncio.Task] = {}
+
+    def start(self) -> None:
+        """Start the game server and block until it is stopped."""
+        try:
+            asyncio.run(self.serve())
+        except asyncio.CancelledError:
+            pass
+
+    async def serve(self) -> None:
+        """Accept connections until stop() is called."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(
+            self._client_session, self.host, self.port, backlog=self.backlog)
+        self.running = True
+
+        print(f"Game server listening on {self.host}:{self.port} (asyncio)")
+
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            self.running = False
+            self._cleanup()
+
+    def stop(self) -> None:
+        """Stop the game server and disconnect all clients."""
+        self.running = False
+        if self.server and self.loop and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    def _cleanup(self) -> None:
+        """Clean up all client connections."""
+        for writer, task in list(self.clients.items()):
+            task.cancel()
+            writer.close()
+        self.clients.clear()
+        self.sessions.clear()
+
+    async def _client_session(self, reader: asyncio.StreamReader,
+                              writer: asyncio.StreamWriter) -> None:
+        """Handle individual client connection."""
+        print(f"New connection from {writer.get_extra_info('peername')}")
+        self.clients[writer] = asyncio.current_task()
+        try:
+            self._setup_telnet(writer)
+            io_handler = AsyncTelnetIO(self.parser, reader, writer,
+                                       timeout=self.timeout)
+            await io_handler.start_session()
+        except asyncio.TimeoutError:
+            print("Client connection timed out")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Client session error: {e}")
+        finally:
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def _setup_telnet(self, writer: asyncio.StreamWriter) -> None:
+        """Send initial telnet protocol negotiations."""
+        # Tell client we'll echo, and that we want it to echo
+        writer.write(self.IAC + self.WILL + self.ECHO
+                     + self.IAC + self.DO + self.ECHO)
+
 if __name__=="__main__":
     print("This module is not meant to be run directly.")
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""Logged-in players, and link-dead ones who may still come back."""
+import secrets
+import threading
+import time
+
+from ini import LINKDEAD_GRACE, SESSION_TOKEN_BYTES
+
+
+class SessionRegistry:
+    """
+    Every logged-in player's session token, and which players are link-dead.
+
+    A player is given a fresh token each time they log in or resume. When
+    their connection drops (rather than them quitting) they go link-dead:
+    the Player object stays in memory, in the world, and for `grace`
+    seconds the token lets a new connection take it over without a
+    password or a trip to the database. A token works once; resuming
+    issues the next one. A token also works while the old connection
+    still looks alive, since a dropped socket can take minutes to notice.
+
+    grace=0 turns resuming off: dropping is then the same as quitting.
+    """
+    def __init__(self, grace: float = LINKDEAD_GRACE, token_bytes: int = SESSION_TOKEN_BYTES):
+        self.grace = grace
+        self.token_bytes = token_bytes
+        self.players: dict[str, object] = {}    # token -> Player
+        self.tokens: dict[object, str] = {}     # Player -> token
+        self.dropped: dict[object, float] = {}  # link-dead Player -> when its token expires
+        self._lock = threading.Lock()
+        # metrics
+        self.resumed = 0
+        self.expired = 0
+        self.refused = 0
+
+    def login(self, player) -> str:
+        """A player has (re)connected: issue them a new token."""
+        with self._lock:
+            self._forget(player)
+            token = secrets.token_hex(self.token_bytes)
+            self.players[token] = player
+            self.tokens[player] = token
+            return token
+
+    def logout(self, player) -> None:
+        """A player has quit; their token is no good any more."""
+        with self._lock:
+            self._forget(player)
+
+    def drop(self, player) -> None:
+        """A player's connection was lost: keep their token for the grace period."""
+        with self._lock:
+            if not self.grace:
+                self._forget(player)
+            elif player in self.tokens:
+                self.dropped[player] = time.monotonic() + self.grace
+
+    def resume(self, token: str):
+        """The player a token belongs to, now resumed; None if it's unknown or expired."""
+        token = token.strip().lower()   # telnet input arrives lowercased
+        with self._lock:
+            self._expire(time.monotonic())
+            player = self.players.get(token)
+            if player is None:
+                self.refused += 1
+                return None
+            self.dropped.pop(player, None)
+            self.resumed += 1
+            return player
+
+    def is_link_dead(self, player) -> bool:
+        with self._lock:
+            self._expire(time.monotonic())
+            return player in self.dropped
+
+    def link_dead(self) -> list:
+        """Players whose connection dropped and whose grace period hasn't run out."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return list(self.dropped)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.players.clear()
+            self.tokens.clear()
+            self.dropped.clear()
+
+    def report(self) -> str:
+        with self._lock:
+            self._expire(time.monotonic())
+            return (f"{len(self.tokens) - len(self.dropped)} connected, "
+                    f"{len(self.dropped)} link-dead, {self.resumed} resumed, "
+                    f"{self.expired} expired, {self.refused} bad tokens")
+
+    def _expire(self, now: float) -> None:
+        for player in [player for player, expires in self.dropped.items() if expires <= now]:
+            self._forget(player)
+            self.expired += 1
+
+    def _forget(self, player) -> None:
+        if (token := self.tokens.pop(player, None)) is not None:
+            del self.players[token]
+        self.dropped.pop(player, None)
+
+
+sessions = SessionRegistry()
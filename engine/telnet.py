@@ -0,0 +1,114 @@
+"""Incremental telnet input decoding shared by the socket IO handlers."""
+from collections import deque
+import re
+
+# Telnet protocol bytes
+IAC  = 255  # Interpret As Command
+DONT = 254
+DO   = 253
+WONT = 252
+WILL = 251
+SB   = 250  # Subnegotiation Begin
+SE   = 240  # Subnegotiation End
+
+# Anything that is not plain printable input needs the slow path
+_SPECIAL = re.compile(rb'[\x00\x08\r\n\x7f-\xff]')
+
+
+class TelnetLineReader:
+    """
+    Decodes raw client bytes into complete input lines.
+
+    Feed it whatever recv() returned; it strips telnet commands (including
+    option negotiation and subnegotiation blocks), applies backspaces, splits
+    on CR LF / CR NUL / LF and returns the bytes to echo back, so a whole
+    chunk costs one recv and at most one send.
+    """
+    DATA, COMMAND, OPTION, SUBNEG, SUBNEG_IAC, CR = range(6)
+    MAX_LINE = 4096
+
+    def __init__(self):
+        self.state = self.DATA
+        self.line = bytearray()     # the line currently being typed
+        self.lines = deque()        # complete lines not yet consumed
+        self.commands = deque(maxlen=32)  # (command, option) received
+        self.subnegotiation = bytearray()
+        self._command = 0
+
+    def feed(self, data) -> bytes:
+        """Consume a chunk of client bytes, return the bytes to echo."""
+        echo = bytearray()
+        data = bytes(data)
+        i, n = 0, len(data)
+        while i < n:
+            if self.state == self.CR:
+                # CR LF and CR NUL both mean a single end of line
+                self.state = self.DATA
+                if data[i] in (0, 10):
+                    i += 1
+                continue
+            if self.state == self.DATA:
+                # Fast path: copy the run of printable characters in one go
+                match = _SPECIAL.search(data, i)
+                end = match.start() if match else n
+                if end > i:
+                    run = data[i:end]
+                    room = self.MAX_LINE - len(self.line)
+                    if room > 0:
+                        self.line += run[:room]
+                        echo += run[:room]
+                    i = end
+                    continue
+            byte = data[i]
+            i += 1
+            self._step(byte, echo)
+        return bytes(echo)
+
+    def _step(self, byte: int, echo: bytearray) -> None:
+        """Advance the state machine by a single special byte."""
+        state = self.state
+        if state == self.DATA:
+            if byte == IAC:
+                self.state = self.COMMAND
+            elif byte == 13:
+                self._end_line(echo)
+                self.state = self.CR
+            elif byte == 10:
+                self._end_line(echo)
+            elif byte in (8, 127):  # backspace / delete
+                if self.line:
+                    del self.line[-1]
+                    echo += b'\x08 \x08'
+            # NUL and non-ASCII bytes are dropped
+        elif state == self.COMMAND:
+            if byte in (WILL, WONT, DO, DONT):
+                self._command = byte
+                self.state = self.OPTION
+            elif byte == SB:
+                self.subnegotiation.clear()
+                self.state = self.SUBNEG
+            else:
+                # IAC IAC is a literal 255, which is not valid ASCII input;
+                # everything else (NOP, GA, AYT, ...) is a two byte command.
+                self.state = self.DATA
+        elif state == self.OPTION:
+            self.commands.append((self._command, byte))
+            self.state = self.DATA
+        elif state == self.SUBNEG:
+            if byte == IAC:
+                self.state = self.SUBNEG_IAC
+            elif len(self.subnegotiation) < self.MAX_LINE:
+                self.subnegotiation.append(byte)
+        elif state == self.SUBNEG_IAC:
+            if byte == IAC:
+                self.subnegotiation.append(IAC)
+                self.state = self.SUBNEG
+            else:
+                # SE, or a malformed block we give up on
+                self.commands.append((SB, bytes(self.subnegotiation)))
+                self.state = self.DATA
+
+    def _end_line(self, echo: bytearray) -> None:
+        echo += b'\r\n'
+        self.lines.append(self.line.decode('ascii').strip().lower())
+        self.line.clear()
@@ -1,5 +1,88 @@
 # Description: This file contains the configuration for the game.
 STARTING_ROOM = 0
+# Rooms are grouped into zones by id: zone n is rooms ZONE_SIZE*n and up.
+# A zone is only simulated while players are in it, and for ZONE_IDLE
+# seconds after the last one leaves.
+ZONE_SIZE = 1000
+ZONE_IDLE = 300
+
+# Per-connection output queue: bytes a client may fall behind by, and what
+# to do when it does ('drop_oldest', 'truncate' or 'disconnect')
+OUTPUT_QUEUE_LIMIT = 64 * 1024
+OUTPUT_OVERFLOW_POLICY = 'drop_oldest'
+
+# Password hashing runs in AUTH_WORKERS processes, with at most AUTH_QUEUE
+# logins waiting or in progress (more are turned away). An address with
+# LOGIN_FAILURES failed logins in LOGIN_WINDOW seconds has to wait.
+AUTH_WORKERS = 2
+AUTH_QUEUE = 64
+LOGIN_FAILURES = 5
+LOGIN_WINDOW = 60               # seconds
+
+# A player whose connection drops stays in the world, link-dead, for
+# LINKDEAD_GRACE seconds, and can pick up where they left off by giving
+# the session token they got at login (0 disables resuming)
+LINKDEAD_GRACE = 180            # seconds
+SESSION_TOKEN_BYTES = 6
+
+# Usernames are looked up in memory; one that doesn't exist is remembered
+# as missing for ACCOUNT_NEGATIVE_TTL seconds, up to ACCOUNT_NEGATIVE_CACHE names
+ACCOUNT_NEGATIVE_CACHE = 10_000
+ACCOUNT_NEGATIVE_TTL = 60       # seconds
+
+# Action processing: group commits of up to ACTION_BATCH_SIZE actions, and
+# never hold an applied action uncommitted longer than ACTION_BATCH_LATENCY
+ACTION_BATCH_SIZE = 256
+ACTION_BATCH_LATENCY = 0.1      # seconds
+ACTION_STATS_INTERVAL = 60      # seconds between rate reports, 0 disables
+
+# Players take turns on the action queue and each may average ACTION_RATE
+# actions a second, in bursts of up to ACTION_BURST (0 disables the limit).
+# A command is refused while its player has ACTION_QUEUE_CAP actions waiting.
+ACTION_RATE = 20
+ACTION_BURST = 40
+ACTION_QUEUE_CAP = 400
+
+# Keep the world in memory and write changes to the database in bulk every
+# CHECKPOINT_INTERVAL seconds instead of committing actions as they happen
+WRITE_BEHIND = True
+CHECKPOINT_INTERVAL = 30        # seconds
+
+# Journal of actions applied since the last checkpoint (None disables it);
+# fsynced when the action queue drains or after this many records / seconds
+JOURNAL_PATH = 'world.journal'
+JOURNAL_SYNC_RECORDS = 256
+JOURNAL_SYNC_INTERVAL = 0.05    # seconds
+
+# Written on clean shutdown and loaded at start instead of querying the
+# database, as long as no checkpoint has happened since (None disables it)
+SNAPSHOT_PATH = 'world.snapshot'
+
+# Game time: ticks per second, and how many missed ticks the scheduler
+# runs back to back to catch up before it skips the rest
+TICK_RATE = 10
+TICK_CATCHUP = 5
+
+# Seconds between combat rounds; every fight is resolved at once each round
+COMBAT_ROUND = 2
+
+# Seconds between regeneration steps, and the hit points regained each step
+# (status effects count down in these steps too)
+REGEN_INTERVAL = 10
+REGEN_HP = 1
+
+# Longest route the travel command will look for, in steps
+TRAVEL_MAX_STEPS = 100
+
+# Timing histograms for commands, actions, the action queue and commits
+# (admins can switch them on and off in game with the stats command), and
+# where to write them every METRICS_DUMP_INTERVAL seconds (None disables)
+METRICS_ENABLED = False
+METRICS_DUMP_PATH = 'metrics.json'
+METRICS_DUMP_INTERVAL = 60      # seconds
+
+# Usernames allowed to use admin commands
+ADMINS = []
 
 __version__ = '0.1.0'
 __author__ = 'Giles Cooper'
@@ -12,7 +95,8 @@ __requires__ = [
     'pymssql>=2.2.0',     # For MS SQL Server connection
     'passlib>=1.7.4',     # For password hashing
     'typing_extensions>=4.0.0',  # For type hints
-    'python-dotenv>=1.0.0'  # Suggested for handling .env files with DB credentials
+    'python-dotenv>=1.0.0',  # Suggested for handling .env files with DB credentials
+    'numpy>=1.24',        # For resolving combat in batches
 ]
 
 splash_art = f'''
@@ -1,24 +1,64 @@
+import argparse
 import threading
 
-from engine import GameServer
+from engine import GameServer, AsyncGameServer, scheduler, auth, sessions
+from orm import accounts, metrics
 import ini
 
+def report_logins():
+    if auth.logins:
+        print(f"Logins: {auth.report()}")
+        print(f"Sessions: {sessions.report()}")
+        print(f"Accounts: {accounts.report()}")
+
 def main():
-    from orm import process_actions
+    from orm import process_actions, world, load_world, recover, do, zones
+
+    arg_parser = argparse.ArgumentParser(description=ini.__description__)
+    arg_parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='serve every connection from one asyncio event loop')
+    args = arg_parser.parse_args()
+
+    # Start the password hashing workers before anyone can log in
+    auth.start()
+
+    # Load the world into memory before anyone can connect
+    if ini.WRITE_BEHIND:
+        load_world()
+        recover()
+        world.start_checkpointer(ini.CHECKPOINT_INTERVAL)
+    print(f"Loaded {accounts.load()} accounts")
 
     # Start the action processing thread
     action_thread = threading.Thread(target=process_actions, daemon=True)
     action_thread.start()
 
+    # Start game time
+    zones.scheduler = scheduler
+    scheduler.start()
+    scheduler.every(ini.COMBAT_ROUND, do, None, 'combat_round', None, None)
+    scheduler.every(ini.REGEN_INTERVAL, do, None, 'regenerate', None, None)
+    if ini.ACTION_STATS_INTERVAL:
+        scheduler.every(ini.ACTION_STATS_INTERVAL, report_logins)
+    if ini.METRICS_DUMP_PATH and ini.METRICS_DUMP_INTERVAL:
+        scheduler.every(ini.METRICS_DUMP_INTERVAL, metrics.dump, ini.METRICS_DUMP_PATH)
+
     # Start the player connection thread:
           
     print("Starting server...")
-    server = GameServer('0.0.0.0', 4000)
+    server_class = AsyncGameServer if args.use_async else GameServer
+    server = server_class('0.0.0.0', 4000)
     try:
         server.start()
     except KeyboardInterrupt:
         print("\nShutting down server...")
         server.stop()
+        scheduler.stop()
+        auth.stop()
+        if ini.METRICS_DUMP_PATH:
+            metrics.dump(ini.METRICS_DUMP_PATH)
+        if world.loaded:
+            world.stop()
 
 if __name__ == "__main__":
     main()  
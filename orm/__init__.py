@@ -5,10 +5,33 @@ Database models and SQLAlchemy setup for the dungeon crawler game.
 """
 
 from .models import GameObject, Room, Exit, Item, Creature, Player
-from .db import do, SQL, process_actions
+from .db import do, SQL, process_actions, session_scope, world_lock, load_player
+from .db import world, journal, load_world, recover, presence, action_queue, combat
+from .db import zones, accounts
+from .index import TargetIndex, target_index
+from .fairqueue import FairQueue
+from .stats import StatStore
+from .metrics import Metrics, metrics
 # Explicitly declare public API
 __all__ = [
-    'SQL',              # SQLAlchemy scoped session object
+    'SQL',              # SQLAlchemy session holding the live world
+    'world_lock',       # lock guarding SQL and the objects it owns
+    'session_scope',    # private session for one unit of work
+    'load_player',      # load a player into the world session
+    'world',            # the in-memory world and its checkpointer
+    'journal',          # action journal covering changes since the checkpoint
+    'load_world',       # load the world from its snapshot or the database
+    'recover',          # replay the journal after a crash
+    'presence',         # who is online, by room, zone and channel
+    'combat',           # every fight, resolved in batches each combat round
+    'zones',            # which zones are simulated, and their timers
+    'accounts',         # username -> player id and password hash, cached
+    'TargetIndex',      # a container's contents indexed by name, noun and adjectives
+    'target_index',     # the (lazily built) TargetIndex of a container
+    'FairQueue',        # per-subject, rate limited action queue
+    'StatStore',        # creature stats and status effects as arrays (world.stats)
+    'Metrics',          # timing histograms and byte counts
+    'metrics',          # the server's Metrics, off unless METRICS_ENABLED
     'Base',             # SQLAlchemy declarative base
     'GameObject',       # Base game object class
     'Room',             # Room model for dungeon locations
@@ -17,6 +40,7 @@ __all__ = [
     'Item',             # Item model for objects that can be collected
     'Player',           # Player model for the user-controlled character
     'do',               # action queue interface
+    'action_queue',     # the FairQueue do() puts actions on
     'process_actions',  # process action queue
 
 ]
\ No newline at end of file
@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable
+
+from .models import Player
+
+
+class Accounts():
+    '''
+    Every account's player id and password hash, by username.
+
+    load() reads them all at startup and add() keeps up with characters
+    created since, so logging in and checking whether a name is taken
+    don't go to the database. A name that isn't known is looked up there
+    once anyway, in case the account was made some other way (an admin
+    script, another server); if it's not there either, that is remembered
+    for `negative_ttl` seconds, up to `negative_size` names, so someone
+    hammering at unknown usernames costs no queries either.
+
+    Thread-safe: logins look accounts up from their session threads.
+    '''
+    def __init__(self, session_scope: Callable, negative_size: int = 10_000,
+                 negative_ttl: float = 60):
+        self.session_scope = session_scope
+        self.negative_size = negative_size
+        self.negative_ttl = negative_ttl
+        self.accounts: dict[str, tuple[int, str]] = {}  # username -> (id, password hash)
+        self.missing: OrderedDict[str, float] = OrderedDict()   # username -> expires
+        self.loaded = False
+        self._lock = threading.Lock()
+        # metrics
+        self.hits = 0
+        self.negative_hits = 0
+        self.queries = 0
+
+    def load(self) -> int:
+        ''' Read every account from the database; return how many. '''
+        with self.session_scope() as session:
+            rows = session.query(Player.username, Player.id, Player.password_hash).all()
+        with self._lock:
+            self.accounts = {username: (player_id, password_hash)
+                             for username, player_id, password_hash in rows}
+            self.missing.clear()
+            self.loaded = True
+        return len(rows)
+
+    def lookup(self, username: str) -> tuple[int, str]|None:
+        ''' The id and password hash of an account, or None if there's no such account. '''
+        now = time.monotonic()
+        with self._lock:
+            if (account := self.accounts.get(username)) is not None:
+                self.hits += 1
+                return account
+            expires = self.missing.get(username)
+            if expires is not None:
+                if expires > now:
+                    self.negative_hits += 1
+                    return None
+                del self.missing[username]
+        # Not under the lock: a slow query shouldn't hold up other logins
+        with self.session_scope() as session:
+            row = session.query(Player.id, Player.password_hash).filter_by(
+                username=username).first()
+        with self._lock:
+            self.queries += 1
+            if row is None:
+                self.missing[username] = now + self.negative_ttl
+                self.missing.move_to_end(username)
+                while len(self.missing) > self.negative_size:
+                    self.missing.popitem(last=False)
+                return None
+            account = self.accounts[username] = (row[0], row[1])
+            return account
+
+    def taken(self, username: str) -> bool:
+        return self.lookup(username) is not None
+
+    def add(self, username: str, player_id: int, password_hash: str) -> None:
+        ''' A character has just been created. '''
+        with self._lock:
+            self.accounts[username] = (player_id, password_hash)
+            self.missing.pop(username, None)
+
+    def forget(self, username: str) -> None:
+        ''' Drop what is cached about a name, e.g. after losing a race to create it. '''
+        with self._lock:
+            self.accounts.pop(username, None)
+            self.missing.pop(username, None)
+
+    def report(self) -> str:
+        return (f"{len(self.accounts)} accounts, {len(self.missing)} names known missing; "
+                f"{self.hits} hits, {self.negative_hits} negative hits, "
+                f"{self.queries} queries")
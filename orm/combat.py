@@ -0,0 +1,124 @@
+from typing import Callable
+
+import numpy as np
+
+from .models import Creature
+from .stats import StatStore, NOWHERE
+
+# Chance to hit: HIT_CHANCE, plus HIT_PER_DEX for each point of Dex the
+# attacker has over the defender, kept within [HIT_MIN, HIT_MAX]
+HIT_CHANCE = 0.6
+HIT_PER_DEX = 0.05
+HIT_MIN = 0.05
+HIT_MAX = 0.95
+
+
+class Round():
+    '''
+    The outcome of one combat round.
+        fights      (attacker, defender) pairs that fought
+        damage      damage dealt in each fight, 0 for a miss
+        creatures   the StatStore's creatures
+        hp          their hit points before the round and after it, by row
+    '''
+    def __init__(self, fights, damage, creatures, hp_before, hp_after):
+        self.fights = fights
+        self.damage = damage
+        self.creatures = creatures
+        self.hp_before = hp_before
+        self.hp_after = hp_after
+
+    def __len__(self) -> int:
+        return len(self.fights)
+
+    def changed(self) -> list[tuple[Creature, int, int]]:
+        ''' (creature, hp before, hp after) for everyone who was hurt. '''
+        hurt = np.flatnonzero(self.hp_after != self.hp_before)
+        return [(self.creatures[i], int(self.hp_before[i]), int(self.hp_after[i]))
+                for i in hurt.tolist()]
+
+
+class Combat():
+    '''
+    Every fight in the world, resolved a round at a time in one batch.
+
+    A fight is an attacker and the creature it is attacking; each creature
+    attacks one other at a time. round() looks the fighters up in the
+    StatStore and works on its columns: which fights are still on (both
+    alive, in the same room) is one array comparison, and resolve() rolls
+    to hit and for damage for every fight at once and sums the damage each
+    creature takes. Fights that are over are dropped as they are found, so
+    fleeing or dying needs no more than disengage().
+
+    Blows in a round land simultaneously: two creatures can kill each other.
+    Applying the outcome (hit points, deaths, messages) is left to the
+    caller, see Action.combat_round.
+
+    Call with world_lock held, like everything else touching the world.
+    '''
+    def __init__(self, stats: StatStore, present: Callable = lambda creature: True,
+                 seed: int|None = None):
+        self.stats = stats
+        self.present = present      # present(creature): can it fight (e.g. online)?
+        self.fights: dict[Creature, Creature] = {}
+        self.rng = np.random.default_rng(seed)
+        self.rounds = 0
+        self.resolved = 0
+
+    def engage(self, attacker: Creature, defender: Creature) -> None:
+        ''' Start attacking; a defender not already fighting fights back. '''
+        self.fights[attacker] = defender
+        self.fights.setdefault(defender, attacker)
+
+    def disengage(self, creature: Creature) -> Creature|None:
+        ''' Stop attacking; return whom it was attacking. '''
+        return self.fights.pop(creature, None)
+
+    def opponent(self, creature: Creature) -> Creature|None:
+        return self.fights.get(creature)
+
+    def round(self) -> Round:
+        ''' Gather the fights that are still on and resolve them together. '''
+        stats = self.stats
+        row = stats.row
+        fights = list(self.fights.items())
+        attackers = np.fromiter((row(attacker) for attacker, _ in fights), np.intp, len(fights))
+        defenders = np.fromiter((row(defender) for _, defender in fights), np.intp, len(fights))
+        hp, room = stats['hp'], stats['room']
+        on = ((attackers != defenders) & (hp[attackers] > 0) & (hp[defenders] > 0)
+              & (room[attackers] != NOWHERE) & (room[attackers] == room[defenders]))
+        present = self.present
+        ongoing, keep = [], []
+        for fight, still_on in zip(fights, on.tolist()):
+            still_on = still_on and present(fight[0]) and present(fight[1])
+            keep.append(still_on)
+            if still_on:
+                ongoing.append(fight)
+            else:
+                del self.fights[fight[0]]
+        if len(ongoing) < len(fights):
+            keep = np.array(keep, dtype=bool)
+            attackers, defenders = attackers[keep], defenders[keep]
+        damage, hp_after = self.resolve(stats['Str'], stats['Dex'], hp, attackers, defenders)
+        self.rounds += 1
+        self.resolved += len(ongoing)
+        return Round(ongoing, damage, stats.creatures, hp.copy(), hp_after)
+
+    def resolve(self, strength: np.ndarray, dexterity: np.ndarray, hp: np.ndarray,
+                attackers: np.ndarray, defenders: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        '''
+        Roll every fight at once. Str, Dex and hp are per creature; attackers
+        and defenders index them, one entry per fight. A hit does 1 to Str
+        damage. Return the damage dealt in each fight and every creature's
+        hit points afterwards.
+        '''
+        count = len(attackers)
+        if not count:
+            return np.zeros(0, dtype=np.int64), hp.copy()
+        chance = np.clip(HIT_CHANCE + HIT_PER_DEX * (dexterity[attackers] - dexterity[defenders]),
+                         HIT_MIN, HIT_MAX)
+        hits = self.rng.random(count) < chance
+        rolls = self.rng.random(count) * np.maximum(strength[attackers], 1)
+        damage = (rolls.astype(np.int64) + 1) * hits
+        taken = np.bincount(defenders, weights=damage, minlength=len(hp)).astype(np.int64)
+        return damage, hp - taken
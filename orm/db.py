@@ -1,11 +1,30 @@
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import os
 import pymssql
 import queue
-from sqlalchemy import create_engine 
-from sqlalchemy.orm import Session, scoped_session
+import threading
+import time
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm import Session, sessionmaker
 
-from orm import Player
+from orm import Player, Room
+from .world import World
+from .journal import Journal
+from .presence import Presence
+from .snapshot import read_header, SnapshotError
+from .fairqueue import FairQueue
+from .combat import Combat
+from .zones import Zones
+from .accounts import Accounts
+from .metrics import metrics
+from ini import ACTION_BATCH_SIZE, ACTION_BATCH_LATENCY, ACTION_STATS_INTERVAL
+from ini import WRITE_BEHIND, JOURNAL_PATH, JOURNAL_SYNC_RECORDS, JOURNAL_SYNC_INTERVAL
+from ini import SNAPSHOT_PATH, ZONE_SIZE
+from ini import ACTION_RATE, ACTION_BURST, ACTION_QUEUE_CAP
+from ini import REGEN_HP, ZONE_IDLE, TRAVEL_MAX_STEPS
+from ini import ACCOUNT_NEGATIVE_CACHE, ACCOUNT_NEGATIVE_TTL
 
 # Load and validate database configuration
 load_dotenv()
@@ -13,24 +32,152 @@ SERVER = os.getenv('DB_SERVER')
 USER = os.getenv('DB_USER')
 PASSWORD = os.getenv('DB_PASSWORD')
 DATABASE = os.getenv('DB_DATABASE')
+# A full SQLAlchemy URL (e.g. sqlite:///dev.db) overrides the settings above
+URL = os.getenv('DB_URL')
 
-if not all([SERVER, USER, PASSWORD, DATABASE]):
+if not URL and not all([SERVER, USER, PASSWORD, DATABASE]):
     raise ValueError("Missing required database environment variables. Check your .env file.")
 
+# Optional connection pool tuning
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+POOL_MAX_OVERFLOW = int(os.getenv('DB_POOL_MAX_OVERFLOW', 20))
+POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))         # seconds
+POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))       # seconds
+POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+
 STARTING_ROOM = 0
 
 # Database connection setup
-connection = f"mssql+pymssql://{USER}:{PASSWORD}@{SERVER}/{DATABASE}"
-sql_engine = create_engine(connection)
-SQL = Session(sql_engine)
+connection = URL or f"mssql+pymssql://{USER}:{PASSWORD}@{SERVER}/{DATABASE}"
+url = make_url(connection)
+pool_args = {}
+# The pool tuning only applies to a server's QueuePool; SQLite (a file, or
+# memory with its SingletonThreadPool) is local and has nothing to tune
+if url.get_backend_name() != 'sqlite' and \
+        issubclass(url.get_dialect().get_pool_class(url), QueuePool):
+    pool_args = dict(pool_size=POOL_SIZE,
+                     max_overflow=POOL_MAX_OVERFLOW,
+                     pool_timeout=POOL_TIMEOUT,
+                     pool_recycle=POOL_RECYCLE)
+sql_engine = create_engine(url, pool_pre_ping=POOL_PRE_PING, **pool_args)
+
+# Objects stay usable after a commit instead of being reloaded on next use
+session_factory = sessionmaker(bind=sql_engine, expire_on_commit=False)
+
+# The world session holds the live game objects shared by every connection
+# and the action processor. Sessions aren't thread-safe: hold world_lock
+# whenever touching it or the objects it owns. With WRITE_BEHIND, changes
+# only reach the database at world checkpoints, never by autoflush. This
+# serializes every command and action in the game (see World); only work
+# outside the live world gets a session of its own (session_scope()).
+SQL = session_factory(autoflush=not WRITE_BEHIND)
+world_lock = threading.RLock()
+world = World(SQL, world_lock)
+
+# Between checkpoints, the journal is what makes applied actions durable
+journal = None
+if WRITE_BEHIND and JOURNAL_PATH:
+    journal = Journal(JOURNAL_PATH, JOURNAL_SYNC_RECORDS, JOURNAL_SYNC_INTERVAL)
+    world.journal = journal
+    # a snapshot can only be trusted if the journal says which checkpoint it is
+    world.snapshot_path = SNAPSHOT_PATH
+
+@contextmanager
+def session_scope():
+    ''' 
+    A private session for one unit of work outside the live world,
+    e.g. looking up an account. Commits on success, rolls back on error.
+    '''
+    session = session_factory()
+    try:
+        yield session
+        session.commit()
+    except:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# Username -> account, so logins and name checks don't query the database
+accounts = Accounts(session_scope, ACCOUNT_NEGATIVE_CACHE, ACCOUNT_NEGATIVE_TTL)
+
+def load_player(player_id: int) -> Player:
+    ''' Bring a player into the world session (and its room). '''
+    with world_lock:
+        if world.loaded:
+            if player := world.objects.get(player_id):
+                return player
+            player = SQL.get(Player, player_id)
+            world.add(player)
+            return player
+        player = SQL.get(Player, player_id)
+        room = player.owner
+        if room is not None and player not in room.inventory:
+            # the room's contents were loaded before this player existed
+            SQL.expire(room, ['inventory'])
+        world.stats.add(player)
+        return player
+
+# Action queue setup: each subject gets its own queue and they take turns,
+# with players held to ACTION_RATE actions a second
+action_queue = FairQueue(ACTION_RATE, ACTION_BURST, ACTION_QUEUE_CAP,
+                         limited=lambda subject: isinstance(subject, Player),
+                         observe=lambda item, wait: metrics.observe('queue', item[1], wait))
+
+# Connections written to during the current tick; flushed once it ends
+unflushed = set()
+
+def tell(player, message, **kwargs):
+    ''' Queue a message to a player, to be flushed at the end of the tick. '''
+    player.io.print(message, **kwargs)
+    unflushed.add(player.io)
+
+def flush_output():
+    ''' Flush every connection written to since the last flush. '''
+    while unflushed:
+        io = unflushed.pop()
+        try:
+            # never wait on a slow client: the rest of the world is waiting
+            io.flush(wait=False)
+        except Exception as e:
+            print(f"Error flushing output: {e}")
+
+# Who is online and where, for broadcasts (see Action.echo and friends)
+presence = Presence(tell, ZONE_SIZE)
 
-# Action queue setup
-action_queue = queue.Queue()
+# Only zones with players in them are simulated; the rest sleep and are
+# caught up when someone arrives
+zones = Zones(presence, world, ZONE_SIZE, ZONE_IDLE, REGEN_HP,
+              write=lambda creature, hp: do(None, 'set_hp', creature, str(hp)))
+
+# Every fight, resolved together once a combat round (see Action.combat_round)
+combat = Combat(world.stats, present=lambda creature: not isinstance(creature, Player)
+                                         or presence.is_online(creature))
+
+def persistent(func):
+    ''' 
+    This decorator marks actions that change the database, as opposed
+    to ones that only send messages.
+    '''
+    func.__persistent__ = True
+    return func
+
+def composite(func):
+    ''' 
+    This decorator marks persistent actions that apply their changes as
+    other actions. Only those are journaled, and retried after a failed
+    commit, so a replay repeats what happened rather than rolling the dice
+    again.
+    '''
+    func.__persistent__ = True
+    func.__composite__ = True
+    return func
 
 class Action():
     # class because each function will be an database action
 
     @staticmethod
+    @persistent
     def chown(subject, target, arg, **kwargs):
         ''' Change the owner of an object. '''
         print(f"Changing owner of {repr(target)} to {repr(arg)}")
@@ -38,48 +185,333 @@ class Action():
         SQL.add(target)
         return True
     
+    @staticmethod
+    @persistent
+    def set_hp(subject, target, arg, **kwargs):
+        ''' Set a creature's hit points (arg is text, to journal like any message). '''
+        target.hp = int(arg)
+        SQL.add(target)
+        return True
+
+    @staticmethod
+    @composite
+    def combat_round(subject, target, arg, **kwargs):
+        ''' Resolve every fight at once, then apply the damage and deaths. '''
+        outcome = combat.round()
+        if not outcome:
+            return
+        for (attacker, defender), damage in zip(outcome.fights, outcome.damage.tolist()):
+            if isinstance(attacker, Player):
+                tell(attacker, f"You hit {defender.name} for {damage}." if damage
+                               else f"You miss {defender.name}.")
+            if isinstance(defender, Player):
+                tell(defender, f"{attacker.name} hits you for {damage}." if damage
+                               else f"{attacker.name} misses you.")
+        for creature, _, hp in outcome.changed():
+            if hp > 0:
+                _run_action(None, 'set_hp', creature, str(hp), {})
+            else:
+                _slay(creature)
+
+    @staticmethod
+    @composite
+    def regenerate(subject, target, arg, **kwargs):
+        ''' Step regeneration and effects in the active zones; write back what changed. '''
+        zones.sweep()
+        for creature, hp in world.stats.step(REGEN_HP, zones.active_rows()):
+            _run_action(None, 'set_hp', creature, str(hp), {})
+
+    @staticmethod
+    @composite
+    def walk(subject, target, arg, steps: int = 0, **kwargs):
+        '''
+        Take the next step on the shortest way to room `target` (the travel
+        command) and queue the one after, so only one step is ever waiting
+        and each waits its turn. The way is worked out afresh every step,
+        from wherever the walker has got to.
+        '''
+        route = world.route(subject.owner, target, TRAVEL_MAX_STEPS)
+        if route is None:
+            tell(subject, f"You don't know the way to {target.name}.")
+            return
+        if steps >= TRAVEL_MAX_STEPS:
+            tell(subject, f"You give up on finding {target.name}.")
+            return
+        if not route:
+            tell(subject, "You are already there.")
+            return
+        if not steps:
+            tell(subject, f"You set off for {target.name}: {', '.join(route)}.")
+        direction = route[0]
+        way = next((exit for exit in subject.owner.exits if exit.direction == direction), None)
+        if way is None:
+            tell(subject, "You have lost your way.")
+            return
+        presence.to_room(subject.owner, f"{subject.name} heads {direction}.", exclude=subject)
+        _run_action(subject, 'chown', subject, way.to_room, {})
+        presence.to_room(subject.owner, f"{subject.name} arrives.", exclude=subject)
+        if len(route) > 1:
+            do(subject, 'walk', target, None, steps=steps + 1)
+        else:
+            tell(subject, subject.owner.view(subject))
+
     @staticmethod
     def echo(subject, target, arg, **kwargs):
         ''' Print to all in the player's room. '''
-        room = subject.owner
-        for everyone in room.inventory:
-            if isinstance(everyone, Player):
-                try:
-                    everyone.io.print(arg)
-                except Exception as e:
-                    print(f"Error echoing to {everyone}: {e}")
+        presence.to_room(subject.owner, arg)
 
     @staticmethod
     def echo_at(subject, target, arg, **kwargs):
         ''' Print to a specific player. '''
         try:
-            target.io.print(arg)
+            tell(target, arg)
         except Exception as e:
             print(f"Error echoing to {target}: {e}")
 
     @staticmethod
     def echo_around(subject, target, arg, **kwargs):
         ''' Print to all in the player's room except the player. '''
-        room = subject.owner
-        for everyone in room.inventory:
-            if isinstance(everyone, Player) and everyone != subject:
-                try:
-                    everyone.io.print(arg)
-                except Exception as e:
-                    print(f"Error echoing to {everyone}: {e}")
+        presence.to_room(subject.owner, arg, exclude=subject)
+
+    @staticmethod
+    def echo_zone(subject, target, arg, **kwargs):
+        ''' Print to all in the player's zone except the player. '''
+        presence.to_zone(subject.owner, arg, exclude=subject)
+
+    @staticmethod
+    def broadcast(subject, target, arg, channel: str = 'global', **kwargs):
+        ''' Print to every listener of a channel except the player. '''
+        presence.publish(channel, arg, exclude=subject)
+
+    @staticmethod
+    def look(subject, target, arg, **kwargs):
+        ''' Show the player the room it is in once earlier actions are done. '''
+        tell(subject, subject.owner.view(subject))
+
+def _slay(creature) -> None:
+    ''' 
+    A creature has died in combat. Players wake up whole in the starting
+    room; anything else is taken out of the world.
+    '''
+    combat.disengage(creature)
+    presence.to_room(creature.owner, f"{creature.name} is slain!", exclude=creature)
+    if isinstance(creature, Player):
+        start = SQL.get(Room, STARTING_ROOM)
+        tell(creature, "You have died.")
+        _run_action(None, 'set_hp', creature, str(creature.hp_max or 1), {})
+        _run_action(None, 'chown', creature, start, {})
+        tell(creature, start.view(creature))
+    else:
+        _run_action(None, 'set_hp', creature, '0', {})
+        _run_action(None, 'chown', creature, None, {})
 
 def do(subject, action, target, arg, **kwargs):
     action_queue.put((subject, action, target, arg, kwargs))
 
+class ActionStats():
+    ''' Counts actions and commits to report their rates. '''
+    def __init__(self):
+        self.actions = 0
+        self.commits = 0
+        self.failures = 0
+        self._since = time.monotonic()
+        self._last = (0, 0)
+
+    def report(self) -> str:
+        ''' Rates since the previous report. '''
+        now = time.monotonic()
+        elapsed = max(now - self._since, 1e-9)
+        actions, commits = self.actions - self._last[0], self.commits - self._last[1]
+        self._since, self._last = now, (self.actions, self.commits)
+        return (f"{actions / elapsed:.1f} actions/sec, "
+                f"{commits / elapsed:.1f} commits/sec, "
+                f"{actions / max(commits, 1):.1f} actions/commit")
+
+action_stats = ActionStats()
+
+# The non-composite persistent actions applied since the action processor
+# last collected them: what a batch has to redo if its commit fails
+_applied: list = []
+
+def _take_applied() -> list:
+    applied = _applied[:]
+    _applied.clear()
+    return applied
+
+def _run_action(subject, action, target, arg, kwargs) -> bool:
+    ''' Apply one action to the world; True if it needs committing. '''
+    if action not in Action.__dict__:
+        print(f"Unknown action: {action}")
+        return False
+    func = getattr(Action, action)
+    if metrics.enabled:
+        started = time.perf_counter()
+        func(subject, target, arg, **kwargs)
+        metrics.observe('action', action, time.perf_counter() - started)
+    else:
+        func(subject, target, arg, **kwargs)
+    action_stats.actions += 1
+    persistent = getattr(func, '__persistent__', False)
+    if persistent and not getattr(func, '__composite__', False):
+        if journal:
+            journal.append(subject, action, target, arg)
+        if not WRITE_BEHIND:
+            _applied.append((subject, action, target, arg, kwargs))
+    return persistent
+
+def load_world():
+    '''
+    Load the world from the snapshot written at the last clean shutdown if
+    it matches the last checkpoint in the journal; otherwise (a crash since,
+    no journal, a damaged file) from the database.
+    '''
+    path = world.snapshot_path
+    if path and journal and os.path.exists(path):
+        try:
+            seq, _, _ = read_header(path)
+            if seq == journal.checkpoint_seq():
+                world.load_snapshot(path)
+                return
+            print(f"Snapshot {path} is older than the last checkpoint")
+        except (SnapshotError, OSError) as e:
+            print(f"Could not load snapshot:\n   {e}")
+    world.load()
+
+def recover():
+    ''' 
+    Rebuild the world as it was at a crash: re-apply the actions journaled
+    since the last checkpoint on top of the loaded world, then checkpoint.
+    '''
+    if not journal:
+        return
+    replayed = 0
+    with world_lock:
+        for record in journal.read():
+            find = world.objects.get
+            subject = find(record.subject_id) if record.subject_id is not None else None
+            target = find(record.target_id) if record.target_id is not None else None
+            arg = find(record.arg) if record.arg_is_object else record.arg
+            try:
+                getattr(Action, record.action)(subject, target, arg)
+                replayed += 1
+            except Exception as e:
+                print(f"Could not replay journal record {record.seq} ({record.action}): {e}")
+        journal.open()
+    if replayed:
+        print(f"Replayed {replayed} journaled actions")
+        world.checkpoint()
+
+def _commit(pending: list) -> None:
+    ''' 
+    Commit a batch of applied actions in one transaction. If that fails,
+    roll back and retry each action in its own transaction so a single bad
+    action only loses itself.
+    '''
+    try:
+        started = time.perf_counter()
+        SQL.commit()
+        metrics.observe('commit', 'batch', time.perf_counter() - started)
+        action_stats.commits += 1
+        return
+    except Exception as e:
+        SQL.rollback()
+        print(f"Error committing batch of {len(pending)} actions:\n   {e}")
+    _replay(pending)
+
+def _replay(pending: list) -> None:
+    '''
+    Re-apply rolled back actions, each in its own transaction. These are
+    the simple ones a batch applied (see _applied), never composites like
+    combat_round, which would roll the dice again; and they are already
+    journaled.
+    '''
+    for subject, action, target, arg, kwargs in pending:
+        try:
+            getattr(Action, action)(subject, target, arg, **kwargs)
+            SQL.commit()
+            action_stats.commits += 1
+        except Exception as e:
+            SQL.rollback()
+            action_stats.failures += 1
+            print(f"Dropping action {action} on {target!r}:\n   {e}")
+
+def run_pending():
+    ''' Apply and commit everything queued right now, without waiting. '''
+    pending = []
+    while True:
+        try:
+            item = action_queue.get_nowait()
+        except queue.Empty:
+            break
+        with world_lock:
+            if _run_action(*item) and not WRITE_BEHIND:
+                pending.extend(_take_applied())
+        action_queue.task_done()
+    if pending:
+        with world_lock:
+            _commit(pending)
+    if journal:
+        journal.sync()
+    flush_output()
+
 def process_actions():
+    ''' 
+    Apply queued actions as they arrive, but commit them in groups: once
+    ACTION_BATCH_SIZE actions are pending or the oldest has waited
+    ACTION_BATCH_LATENCY seconds. With WRITE_BEHIND, nothing is committed
+    here at all; the world checkpointer writes changes out.
+    '''
+    pending = []        # persistent actions applied but not yet committed
+    batch_start = 0.0
+    next_report = time.monotonic() + ACTION_STATS_INTERVAL
     while True:
         try:
-            subject, action, target, arg, kwargs = action_queue.get()
-            if action in Action.__dict__:
-                Action.__dict__[action](subject, target, arg, **kwargs)
-                SQL.commit()
-            else:
-                print(f"Unknown action: {action}")
-            action_queue.task_done()
+            timeout = None
+            if pending:
+                timeout = max(0.0, batch_start + ACTION_BATCH_LATENCY - time.monotonic())
+            try:
+                item = action_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item:
+                with world_lock:
+                    try:
+                        if _run_action(*item) and not WRITE_BEHIND:
+                            if not pending:
+                                batch_start = time.monotonic()
+                            pending.extend(_take_applied())
+                    except Exception as e:
+                        print(f"Error processing action:\n   {e}")
+                        if not WRITE_BEHIND:
+                            # the failed action may have left partial changes behind
+                            _take_applied()
+                            SQL.rollback()
+                            _replay(pending)
+                            pending = []
+                action_queue.task_done()
+                if journal and journal.due():
+                    journal.sync()  # not under world_lock: an fsync can take a while
+
+            if pending and (len(pending) >= ACTION_BATCH_SIZE
+                            or time.monotonic() - batch_start >= ACTION_BATCH_LATENCY):
+                with world_lock:
+                    _commit(pending)
+                pending = []
+
+            if action_queue.idle():
+                if journal:
+                    journal.sync()
+                flush_output()
+                if ACTION_STATS_INTERVAL and time.monotonic() >= next_report:
+                    next_report = time.monotonic() + ACTION_STATS_INTERVAL
+                    if action_stats.actions:
+                        print(f"Actions: {action_stats.report()}")
+                        print(f"Action queue: {action_queue.report()}")
+                        print(f"Zones: {zones.report()}")
+                    if Room.view_misses:
+                        print(f"Room views: {Room.view_hits} cached, {Room.view_misses} rendered")
         except Exception as e:
-            print(f"Error processing action:\n   {e}")
\ No newline at end of file
+            # keep going: without this thread the world stops while every
+            # connection stays open
+            print(f"Error in the action processor:\n   {e!r}")
@@ -0,0 +1,216 @@
+import heapq
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class FairQueue():
+    '''
+    The action queue, drained fairly between the subjects doing things.
+
+    Each subject (the first element of an item) has its own FIFO, and
+    subjects take turns: weighted round robin, where a subject's turn is up
+    to weight(subject) actions (1 unless set_weight() says otherwise). One
+    player pasting a hundred commands only ever delays the others by a turn.
+
+    Subjects for which limited(subject) is true also get a token bucket:
+    `rate` actions a second on average, bursts of up to `burst`. A subject
+    out of tokens sits out until it has one again; its actions wait in its
+    own queue rather than being dropped. admits() is the back-pressure: it
+    is false once a limited subject already has `cap` actions waiting.
+
+    The methods queue.Queue users need are here (put, get, get_nowait,
+    task_done, qsize, empty), plus idle(), which unlike empty() is also true
+    when everything waiting is held back by its rate limit.
+    '''
+    def __init__(self, rate: float = 0, burst: int = 1, cap: int = 0,
+                 limited: Callable = lambda subject: True, observe: Callable|None = None):
+        self.rate = rate            # tokens a second; 0 disables rate limiting
+        self.burst = max(1, burst)
+        self.cap = cap              # 0 disables the cap
+        self.limited = limited
+        self.observe = observe      # observe(item, seconds it waited) as each is taken
+        self.weights: dict = {}
+        self.queues: dict[object, deque] = {}       # subject -> (queued at, item)
+        self.ready: deque = deque()                 # subjects in turn order
+        self.throttled: list = []                   # heap of (token due, n, subject)
+        self.buckets: dict[object, list] = {}       # subject -> [tokens, at]
+        self.turn = 0                               # taken this turn by ready[0]
+        self.count = 0
+        self._seq = 0
+        self._cond = threading.Condition()
+        # metrics, since the last report()
+        self.max_depth = 0
+        self.taken = 0
+        self.total_wait = 0.0
+        self.worst_wait = 0.0
+        self.worst_subject = None
+        self.waits: dict[object, list] = {}         # subject -> [taken, total, worst]
+        self.held = 0               # times a subject ran out of tokens
+        self.refused = 0            # times admits() said no
+
+    def set_weight(self, subject, weight: int) -> None:
+        ''' Let a subject take `weight` actions a turn (1 restores the default). '''
+        with self._cond:
+            if weight == 1:
+                self.weights.pop(subject, None)
+            else:
+                self.weights[subject] = max(1, weight)
+
+    def admits(self, subject) -> bool:
+        ''' Whether a subject may queue more: false once it has `cap` waiting. '''
+        if not self.cap or not self.limited(subject):
+            return True
+        with self._cond:
+            if len(self.queues.get(subject, ())) < self.cap:
+                return True
+            self.refused += 1
+            return False
+
+    def backlog(self, subject) -> int:
+        ''' How many actions a subject has waiting. '''
+        return len(self.queues.get(subject, ()))
+
+    def put(self, item: tuple) -> None:
+        subject = item[0]
+        with self._cond:
+            own = self.queues.get(subject)
+            if own is None:
+                own = self.queues[subject] = deque()
+                self.ready.append(subject)
+            own.append((time.monotonic(), item))
+            self.count += 1
+            self.max_depth = max(self.max_depth, self.count)
+            self._cond.notify()
+
+    def get(self, block: bool = True, timeout: float|None = None) -> tuple:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                item = self._take(now)
+                if item is not None:
+                    return item
+                wait = None if deadline is None else deadline - now
+                if self.throttled:
+                    due = self.throttled[0][0] - now
+                    wait = due if wait is None else min(wait, due)
+                if not block or (deadline is not None and deadline <= now):
+                    raise queue.Empty
+                self._cond.wait(wait)
+
+    def get_nowait(self) -> tuple:
+        return self.get(block=False)
+
+    def task_done(self) -> None:
+        pass
+
+    def qsize(self) -> int:
+        return self.count
+
+    def empty(self) -> bool:
+        return not self.count
+
+    def idle(self) -> bool:
+        ''' Nothing can be taken right now: empty, or everything is rate limited. '''
+        with self._cond:
+            if self.ready:
+                return False
+            return not self.throttled or self.throttled[0][0] > time.monotonic()
+
+    def clear(self) -> None:
+        with self._cond:
+            self.queues.clear()
+            self.ready.clear()
+            self.throttled.clear()
+            self.turn = 0
+            self.count = 0
+
+    def _take(self, now: float) -> tuple|None:
+        ''' The next item in turn, or None if nothing may go now. '''
+        throttled = self.throttled
+        while throttled and throttled[0][0] <= now:
+            self.ready.append(heapq.heappop(throttled)[2])
+        ready = self.ready
+        while ready:
+            subject = ready[0]
+            if self.rate and self.limited(subject) and not self._spend(subject, now):
+                ready.popleft()
+                self.turn = 0
+                due = now + (1 - self.buckets[subject][0]) / self.rate
+                self._seq += 1
+                heapq.heappush(throttled, (due, self._seq, subject))
+                self.held += 1
+                continue
+            own = self.queues[subject]
+            queued_at, item = own.popleft()
+            self.count -= 1
+            self.turn += 1
+            if not own:
+                del self.queues[subject]
+                ready.popleft()
+                self.turn = 0
+            elif self.turn >= self.weights.get(subject, 1):
+                ready.rotate(-1)
+                self.turn = 0
+            self._waited(subject, now - queued_at)
+            if self.observe is not None:
+                self.observe(item, now - queued_at)
+            return item
+        return None
+
+    def _spend(self, subject, now: float) -> bool:
+        ''' Take a token from a subject's bucket, if it has one. '''
+        bucket = self.buckets.get(subject)
+        if bucket is None:
+            bucket = self.buckets[subject] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def _waited(self, subject, wait: float) -> None:
+        self.taken += 1
+        self.total_wait += wait
+        if wait > self.worst_wait:
+            self.worst_wait, self.worst_subject = wait, subject
+        waits = self.waits.get(subject)
+        if waits is None:
+            waits = self.waits[subject] = [0, 0.0, 0.0]
+        waits[0] += 1
+        waits[1] += wait
+        waits[2] = max(waits[2], wait)
+
+    def wait_times(self) -> dict:
+        ''' subject -> (actions taken, mean wait, worst wait) since the last report(). '''
+        with self._cond:
+            return {subject: (taken, total / taken, worst)
+                    for subject, (taken, total, worst) in self.waits.items()}
+
+    def report(self) -> str:
+        ''' Depth and waiting since the previous report, then start afresh. '''
+        with self._cond:
+            mean = self.total_wait / max(self.taken, 1)
+            line = (f"depth {self.count} (max {self.max_depth}), "
+                    f"{len(self.queues)} subjects waiting, "
+                    f"mean wait {mean * 1000:.1f}ms, worst {self.worst_wait * 1000:.1f}ms")
+            if self.worst_subject is not None:
+                line += f" ({self.worst_subject!r})"
+            line += f", {self.held} rate limited, {self.refused} refused"
+            self.max_depth = self.count
+            self.taken = 0
+            self.total_wait = self.worst_wait = 0.0
+            self.worst_subject = None
+            self.waits = {}
+            self.held = self.refused = 0
+            # a full bucket is the same as none
+            if self.rate:
+                now = time.monotonic()
+                self.buckets = {subject: bucket for subject, bucket in self.buckets.items()
+                                if bucket[0] + (now - bucket[1]) * self.rate < self.burst}
+            return line
@@ -0,0 +1,173 @@
+import weakref
+from array import array
+from bisect import bisect_right
+from typing import Iterable
+
+from sqlalchemy import event
+
+from .models import Room, Exit
+
+# Every RoomGraph, so the exit events below can reach them
+_graphs = weakref.WeakSet()
+
+
+class RoomGraph():
+    '''
+    The exits between rooms as a compact adjacency index, for route finding.
+
+    Rooms are numbered densely and a room's exits are a contiguous slice
+    of `targets` (the room they lead to) and `labels` (their direction),
+    starting at offsets[room]: compressed sparse rows, so a search touches
+    arrays rather than ORM objects.
+
+    Changes to exits don't rebuild the arrays. The events below mark the
+    room stale, and before the next query its exits are re-read into
+    `patched`, which overrides its slice. Once patches pile up, compact()
+    folds them back into the arrays.
+    '''
+    def __init__(self):
+        self.ids = array('q')               # dense number -> room id
+        self.index: dict[int, int] = {}     # room id -> dense number
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        self.labels: list[str] = []
+        self.patched: dict[int, list[tuple[str, int]]] = {}
+        self.stale: dict[int, Room] = {}
+        self.built = False
+        _graphs.add(self)
+
+    def build(self, room_ids: Iterable[int], exits: Iterable[tuple[int, int, str]]) -> None:
+        ''' Index rooms and their (from_room_id, to_room_id, direction) exits. '''
+        self.ids = array('q', sorted(set(room_ids)))
+        self.index = {room_id: n for n, room_id in enumerate(self.ids)}
+        rows = [[] for _ in self.ids]
+        for from_id, to_id, direction in exits:
+            if from_id in self.index and to_id in self.index:
+                rows[self.index[from_id]].append((direction, self.index[to_id]))
+        self._pack(rows)
+        self.stale.clear()
+        self.built = True
+
+    def _pack(self, rows: list[list[tuple[str, int]]]) -> None:
+        offsets, targets, labels = array('l', [0]), array('l'), []
+        for row in rows:
+            for direction, to in row:
+                labels.append(direction)
+                targets.append(to)
+            offsets.append(len(targets))
+        self.offsets, self.targets, self.labels = offsets, targets, labels
+        self.patched = {}
+
+    def exits_from(self, n: int) -> list[tuple[str, int]]:
+        ''' (direction, dense number) of the exits from room number n. '''
+        patch = self.patched.get(n)
+        if patch is not None:
+            return patch
+        if n + 1 >= len(self.offsets):
+            return []
+        start, end = self.offsets[n], self.offsets[n + 1]
+        return list(zip(self.labels[start:end], self.targets[start:end]))
+
+    def _number(self, room_id: int) -> int:
+        n = self.index.get(room_id)
+        if n is None:
+            n = self.index[room_id] = len(self.ids)
+            self.ids.append(room_id)
+            self.patched[n] = []
+        return n
+
+    def mark_stale(self, room: Room) -> None:
+        ''' Re-read this room's exits before the next query. '''
+        if self.built and room is not None:
+            self.stale[id(room)] = room
+
+    def refresh(self) -> None:
+        ''' Bring in exit changes since the last query. '''
+        while self.stale:
+            _, room = self.stale.popitem()
+            if room.id is None:
+                continue    # not flushed yet
+            n = self._number(room.id)
+            self.patched[n] = [(exit.direction, self._number(exit.to_room.id))
+                               for exit in room.exits
+                               if exit.to_room is not None and exit.to_room.id is not None]
+        if len(self.patched) > max(64, len(self.ids) // 8):
+            self.compact()
+
+    def compact(self) -> None:
+        ''' Fold every patch back into the arrays. '''
+        self._pack([self.exits_from(n) for n in range(len(self.ids))])
+
+    def route(self, from_id: int, to_id: int, max_steps: int|None = None) -> list[str]|None:
+        '''
+        The directions of a shortest route between two rooms (breadth-first),
+        [] if they are the same room, or None if there is no route within
+        max_steps.
+        '''
+        self.refresh()
+        start, goal = self.index.get(from_id), self.index.get(to_id)
+        if start is None or goal is None:
+            return None
+        if start == goal:
+            return []
+        offsets, targets, labels, patched = self.offsets, self.targets, self.labels, self.patched
+        last = len(offsets) - 1
+        # came_from[n] is the edge that reached room n: its index in the
+        # arrays, or -2 - i for detours[i], an exit of a patched room
+        came_from = array('l', [-1]) * len(self.ids)
+        came_from[start] = -1
+        reached = bytearray(len(self.ids))
+        reached[start] = 1
+        detours = []
+        frontier = [start]
+        steps = 0
+        while frontier and (max_steps is None or steps < max_steps):
+            steps += 1
+            following = []
+            for n in frontier:
+                patch = patched.get(n)
+                if patch is None and n < last:
+                    for edge in range(offsets[n], offsets[n + 1]):
+                        to = targets[edge]
+                        if not reached[to]:
+                            reached[to] = 1
+                            came_from[to] = edge
+                            following.append(to)
+                else:
+                    for direction, to in patch or ():
+                        if not reached[to]:
+                            reached[to] = 1
+                            came_from[to] = -2 - len(detours)
+                            detours.append((n, direction))
+                            following.append(to)
+                if reached[goal]:
+                    return self._path(came_from, detours, goal)
+            frontier = following
+        return None
+
+    def _path(self, came_from: array, detours: list, n: int) -> list[str]:
+        # the room an array edge leaves from is the row its index falls in
+        path = []
+        while (edge := came_from[n]) != -1:
+            if edge <= -2:
+                n, direction = detours[-2 - edge]
+            else:
+                n = bisect_right(self.offsets, edge) - 1
+                direction = self.labels[edge]
+            path.append(direction)
+        return path[::-1]
+
+
+@event.listens_for(Room.exits, 'append')
+@event.listens_for(Room.exits, 'remove')
+def _exits_changed(room, exit, initiator):
+    for graph in _graphs:
+        graph.mark_stale(room)
+
+
+@event.listens_for(Exit.to_room, 'set')
+@event.listens_for(Exit.direction, 'set')
+def _exit_changed(exit, value, oldvalue, initiator):
+    room = exit.__dict__.get('from_room')
+    for graph in _graphs:
+        graph.mark_stale(room)
@@ -0,0 +1,113 @@
+from sqlalchemy import event
+
+from .models import GameObject
+
+
+class TargetIndex():
+    '''
+    What a container holds, indexed by the words players use to name things.
+
+    Keys are the lower-cased name, the noun, and (adjective, noun) pairs, so
+    "sword", "rusty sword" and "Excalibur" each cost a dictionary lookup
+    however full the room is. Matches come back in inventory order, which is
+    what ordinals count in ("2.sword" is the second sword).
+
+    An index is built the first time a container is searched and kept up to
+    date by the inventory append/remove events below, so moves done by
+    Action.chown (or anything else that sets an owner) don't rebuild it.
+    '''
+    def __init__(self, container: GameObject):
+        self.source = container.inventory
+        self.keys: dict[object, dict[int, GameObject]] = {}  # key -> id(obj) -> obj, in order
+        self.order: dict[GameObject, int] = {}
+        self.added = 0
+        for obj in self.source:
+            self.add(obj)
+
+    @staticmethod
+    def adjectives_of(obj: GameObject) -> set[str]:
+        adjectives = obj.adjectives or ()
+        if isinstance(adjectives, str):
+            # "rusty old", not a list of words
+            adjectives = adjectives.split()
+        return {adjective.lower() for adjective in adjectives}
+
+    @classmethod
+    def keys_of(cls, obj: GameObject) -> set:
+        noun = (obj.noun or '').lower()
+        keys = {(obj.name or '').lower(), noun}
+        keys.update((adjective, noun) for adjective in cls.adjectives_of(obj))
+        keys.discard('')
+        return keys
+
+    def add(self, obj: GameObject) -> None:
+        if obj in self.order:
+            return
+        self.added += 1
+        self.order[obj] = self.added
+        for key in self.keys_of(obj):
+            self.keys.setdefault(key, {})[id(obj)] = obj
+
+    def remove(self, obj: GameObject) -> None:
+        if self.order.pop(obj, None) is None:
+            return
+        for key in self.keys_of(obj):
+            matches = self.keys.get(key)
+            if matches and matches.pop(id(obj), None) is not None and not matches:
+                del self.keys[key]
+
+    def find(self, words: str) -> list[GameObject]:
+        ''' Everything matching `words` ("sword", "rusty sword", a full name), in order. '''
+        words = words.lower()
+        by_name = list(self.keys.get(words, {}).values())
+        *adjectives, noun = words.split() or ['']
+        if adjectives:
+            # narrow to the rarest (adjective, noun) pair, then check the rest
+            pairs = [self.keys.get((adjective, noun), {}) for adjective in adjectives]
+            fewest = min(pairs, key=len)
+            wanted = set(adjectives)
+            described = [obj for obj in fewest.values() if wanted <= self.adjectives_of(obj)]
+        else:
+            described = []
+        if not described:
+            return by_name
+        if not by_name:
+            return described
+        matches = set(by_name).union(described)
+        return sorted(matches, key=self.order.__getitem__)
+
+
+def target_index(container: GameObject) -> TargetIndex:
+    ''' The index of a container's inventory, building it if need be. '''
+    index = container.__dict__.get('_target_index')
+    # a reloaded (expired) or reassigned collection starts a fresh index
+    if index is None or index.source is not container.inventory:
+        index = TargetIndex(container)
+        container._target_index = index
+    return index
+
+
+def _index_of(container: GameObject) -> TargetIndex|None:
+    return container.__dict__.get('_target_index') if container is not None else None
+
+
+@event.listens_for(GameObject.inventory, 'append', propagate=True)
+def _indexed_append(container, obj, initiator):
+    if index := _index_of(container):
+        index.add(obj)
+
+
+@event.listens_for(GameObject.inventory, 'remove', propagate=True)
+def _indexed_remove(container, obj, initiator):
+    if index := _index_of(container):
+        index.remove(obj)
+
+
+@event.listens_for(GameObject.name, 'set', propagate=True)
+@event.listens_for(GameObject.noun, 'set', propagate=True)
+@event.listens_for(GameObject.adjectives, 'set', propagate=True)
+def _renamed(obj, value, oldvalue, initiator):
+    # a renamed object's keys are out of date; reindex its container on next use
+    owner = obj.__dict__.get('owner')
+    if owner is not None:
+        owner.__dict__.pop('_target_index', None)
@@ -0,0 +1,239 @@
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Iterator, NamedTuple
+
+# Record layout (little-endian):
+#   header  length:I crc32:I           length and checksum of the body
+#   body    seq:Q time:d kind:B subject:q target:q arg_kind:B name_len:B
+#           name:bytes[name_len] arg:(q | H + utf-8 bytes | nothing)
+HEADER = struct.Struct('<II')
+BODY = struct.Struct('<QdBqqBB')
+OBJECT_ID = struct.Struct('<q')
+STR_LEN = struct.Struct('<H')
+
+ACTION, CHECKPOINT = 0, 1              # record kinds
+ARG_NONE, ARG_OBJECT, ARG_STR = 0, 1, 2
+NO_OBJECT = -1
+
+
+class Record(NamedTuple):
+    seq: int
+    time: float
+    kind: int
+    subject_id: int|None
+    action: str
+    target_id: int|None
+    arg: object             # None, an object id or a string
+    arg_is_object: bool
+
+
+class Journal():
+    '''
+    An append-only log of the persistent actions applied since the last
+    world checkpoint, so a crash between checkpoints loses nothing.
+
+    Records are buffered and written with one fsync per group (when the
+    action queue drains, or after JOURNAL_SYNC_RECORDS records /
+    JOURNAL_SYNC_INTERVAL seconds). Once a checkpoint has committed
+    everything to the database, reset() empties the file of what it
+    covered.
+    '''
+    def __init__(self, path: str, sync_records: int = 256, sync_interval: float = 0.05):
+        self.path = path
+        self.sync_records = sync_records
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._oldest = 0.0
+        self.seq = 0
+        self.syncs = 0
+        self.records = 0
+        self.file = None
+
+    def open(self) -> None:
+        ''' Open for appending, cutting off any torn record at the end. '''
+        good = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                for record, good in decode_all(f.read()):
+                    self.seq = max(self.seq, record.seq)
+        self.file = open(self.path, 'ab')
+        self.file.truncate(good)
+
+    def append(self, subject, action: str, target, arg) -> None:
+        ''' Buffer one action; objects are recorded by id. '''
+        with self._lock:
+            self.seq += 1
+            self._pending += encode(self.seq, ACTION, subject, action, target, arg)
+            if not self._pending_records:
+                self._oldest = time.monotonic()
+            self._pending_records += 1
+            self.records += 1
+
+    def due(self) -> bool:
+        '''
+        Whether enough is buffered, or it has waited long enough, to sync.
+        append() leaves syncing to the caller, since it runs under the world
+        lock and an fsync there would hold up everyone.
+        '''
+        with self._lock:
+            return bool(self._pending_records) and (
+                self._pending_records >= self.sync_records
+                or time.monotonic() - self._oldest >= self.sync_interval)
+
+    def sync(self) -> None:
+        ''' Write and fsync everything buffered. '''
+        with self._lock:
+            if not self._pending or not self.file:
+                return
+            self.file.write(self._pending)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self._pending.clear()
+            self._pending_records = 0
+            self.syncs += 1
+
+    def reset(self, through: int|None = None) -> None:
+        '''
+        Everything up to record `through` (by default, everything so far) is
+        in the database: start the journal again from a checkpoint record,
+        followed by any records written since.
+        '''
+        with self._lock:
+            kept = bytearray()
+            if through is not None and through < self.seq:
+                kept = self._records_after(through)
+            if self.file:
+                # each checkpoint gets its own seq, which names the database
+                # state it committed (see snapshot.py)
+                self.seq += 1
+                # the kept records aren't in the database yet: write the new
+                # journal beside the old one and swap it in whole, so a
+                # crash leaves one or the other
+                temporary = self.path + '.tmp'
+                with open(temporary, 'wb') as f:
+                    f.write(encode(self.seq, CHECKPOINT, None, '', None, None))
+                    f.write(kept)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.file.close()
+                try:
+                    os.replace(temporary, self.path)
+                    _sync_directory(self.path)
+                finally:
+                    self.file = open(self.path, 'ab')
+            self._pending.clear()
+            self._pending_records = 0
+
+    def _records_after(self, through: int) -> bytearray:
+        ''' The encoded action records after seq `through`, written or not. '''
+        data = b''
+        if self.file:
+            self.file.flush()
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        data += self._pending
+        kept = bytearray()
+        start = 0
+        for record, end in decode_all(data):
+            if record.kind == ACTION and record.seq > through:
+                kept += data[start:end]
+            start = end
+        return kept
+
+    def close(self) -> None:
+        self.sync()
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def checkpoint_seq(self) -> int|None:
+        ''' The seq of the last checkpoint recorded, if any. '''
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        seq = None
+        for record, _ in decode_all(data):
+            if record.kind == CHECKPOINT:
+                seq = record.seq
+        return seq
+
+    def read(self) -> Iterator[Record]:
+        ''' Yield the records written after the last checkpoint. '''
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        tail = []
+        for record, _ in decode_all(data):
+            self.seq = max(self.seq, record.seq)
+            if record.kind == CHECKPOINT:
+                tail.clear()
+            else:
+                tail.append(record)
+        yield from tail
+
+
+def _sync_directory(path: str) -> None:
+    ''' Make a rename in path's directory durable (where that's possible). '''
+    if not hasattr(os, 'O_DIRECTORY'):
+        return  # Windows: directories can't be opened, and renames are journaled anyway
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _object_id(obj) -> int:
+    return NO_OBJECT if obj is None else obj.id
+
+
+def encode(seq: int, kind: int, subject, action: str, target, arg) -> bytes:
+    ''' Pack one record, header included. '''
+    name = action.encode()
+    if arg is None:
+        arg_kind, payload = ARG_NONE, b''
+    elif isinstance(arg, str):
+        # cut long text on a character boundary, so it still decodes
+        text = arg.encode()[:0xFFFF].decode('utf-8', 'ignore').encode()
+        arg_kind, payload = ARG_STR, STR_LEN.pack(len(text)) + text
+    else:
+        arg_kind, payload = ARG_OBJECT, OBJECT_ID.pack(arg.id)
+    body = (BODY.pack(seq, time.time(), kind, _object_id(subject), _object_id(target),
+                      arg_kind, len(name))
+            + name + payload)
+    return HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def decode_all(data: bytes) -> Iterator[tuple[Record, int]]:
+    ''' Yield (record, end offset), stopping at a torn or corrupt tail. '''
+    view = memoryview(data)
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        length, crc = HEADER.unpack_from(view, offset)
+        start, end = offset + HEADER.size, offset + HEADER.size + length
+        if end > len(data) or zlib.crc32(view[start:end]) != crc:
+            return
+        seq, when, kind, subject, target, arg_kind, name_len = BODY.unpack_from(view, start)
+        pos = start + BODY.size
+        action = bytes(view[pos:pos + name_len]).decode()
+        pos += name_len
+        if arg_kind == ARG_OBJECT:
+            arg, = OBJECT_ID.unpack_from(view, pos)
+        elif arg_kind == ARG_STR:
+            size, = STR_LEN.unpack_from(view, pos)
+            arg = bytes(view[pos + STR_LEN.size:pos + STR_LEN.size + size]).decode()
+        else:
+            arg = None
+        yield Record(seq, when, kind,
+                     None if subject == NO_OBJECT else subject,
+                     action,
+                     None if target == NO_OBJECT else target,
+                     arg, arg_kind == ARG_OBJECT), end
+        offset = end
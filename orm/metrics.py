@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from ini import METRICS_ENABLED
+
+# Histogram bucket upper bounds in seconds: 1us, 2us, 5us, 10us ... 50s
+BOUNDS = [base * 10.0 ** exponent for exponent in range(-6, 2) for base in (1, 2, 5)]
+
+
+class Histogram():
+    '''
+    Timings in fixed buckets (BOUNDS, and one past the last), so recording
+    one is a bisect and an increment however many there are. Percentiles
+    are the upper bound of the bucket they fall in, so read them as "no
+    more than"; the exact worst is kept as well.
+    '''
+    __slots__ = ('counts', 'count', 'total', 'worst')
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.worst = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.counts[bisect_left(BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.worst:
+            self.worst = seconds
+
+    def percentile(self, point: float) -> float:
+        ''' Seconds within which `point` percent (0-100) of the timings fell. '''
+        if not self.count:
+            return 0.0
+        wanted = self.count * point / 100
+        seen = 0
+        for bound, count in zip(BOUNDS, self.counts):
+            seen += count
+            if seen >= wanted:
+                return min(bound, self.worst)
+        return self.worst
+
+    def summary(self) -> dict:
+        return {'count': self.count,
+                'mean': self.total / self.count if self.count else 0.0,
+                'p50': self.percentile(50), 'p95': self.percentile(95),
+                'p99': self.percentile(99), 'max': self.worst,
+                'buckets': list(self.counts)}
+
+
+class Metrics():
+    '''
+    Timing histograms, grouped: "command" by verb (Parser.parse),
+    "action" by action (_run_action), "queue" for time spent on the
+    action queue, "commit" for transactions (action batches and world
+    checkpoints). Byte counts come from the connections themselves
+    (IOHandler.bytes_in and bytes_out); closed() adds a connection's to
+    the running totals here when it ends.
+
+    Turned off, nothing is timed: callers check `enabled` before reading
+    the clock, so the cost is one attribute lookup. It can be switched on
+    and off while the server runs (the admin stats command).
+    '''
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self.groups: dict[str, dict[str, Histogram]] = {}
+        self.connections = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.since = time.time()
+        self._lock = threading.Lock()
+
+    def observe(self, group: str, name: str, seconds: float) -> None:
+        ''' Record a timing, if metrics are on. '''
+        if not self.enabled:
+            return
+        with self._lock:
+            histograms = self.groups.get(group)
+            if histograms is None:
+                histograms = self.groups[group] = {}
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = Histogram()
+            histogram.add(seconds)
+
+    def closed(self, io) -> None:
+        ''' A connection has ended: count its bytes. '''
+        with self._lock:
+            self.connections += 1
+            self.bytes_in += io.bytes_in
+            self.bytes_out += io.bytes_out
+
+    def reset(self) -> None:
+        with self._lock:
+            self.groups = {}
+            self.connections = self.bytes_in = self.bytes_out = 0
+            self.since = time.time()
+
+    def snapshot(self) -> dict:
+        ''' Everything recorded so far, as plain data. '''
+        with self._lock:
+            return {
+                'since': self.since,
+                'taken': time.time(),
+                'enabled': self.enabled,
+                'bounds': BOUNDS,
+                'closed_connections': {'count': self.connections,
+                                       'bytes_in': self.bytes_in,
+                                       'bytes_out': self.bytes_out},
+                'timings': {group: {name: histogram.summary()
+                                    for name, histogram in sorted(histograms.items())}
+                            for group, histograms in sorted(self.groups.items())},
+            }
+
+    def dump(self, path: str) -> None:
+        ''' Write snapshot() to `path` as JSON, replacing it whole. '''
+        if not self.enabled:
+            return
+        temporary = f'{path}.tmp'
+        try:
+            with open(temporary, 'w') as file:
+                json.dump(self.snapshot(), file, indent=1)
+            os.replace(temporary, path)
+        except OSError as e:
+            print(f"Could not write metrics to {path}:\n   {e}")
+
+    def report(self) -> list[str]:
+        ''' A table of every histogram, for people. '''
+        snapshot = self.snapshot()
+        lines = [f'{"":22}{"count":>8}{"p50":>10}{"p95":>10}{"p99":>10}{"max":>10}']
+        for group, histograms in snapshot['timings'].items():
+            lines.append(f'{group}:')
+            for name, summary in histograms.items():
+                lines.append(f'  {name:<20}{summary["count"]:>8}'
+                             + ''.join(f'{summary[key] * 1000:>8.2f}ms'
+                                       for key in ('p50', 'p95', 'p99', 'max')))
+        return lines
+
+
+metrics = Metrics()
@@ -1,5 +1,5 @@
 from passlib.hash import pbkdf2_sha256
-from sqlalchemy import ForeignKey, JSON 
+from sqlalchemy import ForeignKey, JSON, event
 from sqlalchemy.orm import DeclarativeBase, mapped_column, relationship, Mapped
 from typing import List
 from typing_extensions import Annotated
@@ -31,8 +31,11 @@ class GameObject(Base):
         **kwargs: Additional attributes to set on the object
     """
     __tablename__ = 'game_objects'
+    # Load subclass columns in the same query (one LEFT OUTER JOIN per
+    # subclass table) rather than one SELECT per object on first access.
     __mapper_args__ = {'polymorphic_identity': 'game_object',
-                       'polymorphic_on': 'object_type'}
+                       'polymorphic_on': 'object_type',
+                       'with_polymorphic': '*'}
     id: Mapped[pk_id]
     name: Mapped[str]
     noun: Mapped[str] # Noun form of the name
@@ -45,9 +48,13 @@ class GameObject(Base):
                                             foreign_keys='GameObject.owner_id',
                                             remote_side='GameObject.id',
                                             back_populates='inventory')
+    # Contents load with their container, one SELECT per level: a room
+    # brings its contents, and (join_depth) what those are carrying.
     inventory: Mapped[List["GameObject"]] = relationship('GameObject',
                                                          back_populates='owner', 
-                                                         foreign_keys='GameObject.owner_id')    
+                                                         foreign_keys='GameObject.owner_id',
+                                                         lazy='selectin',
+                                                         join_depth=2)    
 
     def __init__(self, 
                  name: str = 'unnamed',
@@ -58,7 +65,8 @@ class GameObject(Base):
                  article: bool = True,
                  *args, **kwargs):
         self.name = name
-        
+        self.noun = noun
+        self.adjectives = adjectives if adjectives is not None else []
         self.description = description
         self.owner_id = owner_id
         self.article = article
@@ -107,13 +115,40 @@ class Room(GameObject):
     __mapper_args__ = {'polymorphic_identity': 'room'}
 
     id: Mapped[fk_id]
-    exits: Mapped[List["Exit"]] = relationship(back_populates="from_room", foreign_keys='Exit.from_room_id')
+    exits: Mapped[List["Exit"]] = relationship(back_populates="from_room", foreign_keys='Exit.from_room_id',
+                                               lazy='selectin')
     entries: Mapped[List["Exit"]] = relationship(back_populates="to_room", foreign_keys='Exit.to_room_id')
+
+    # Room.view() cache performance, across all rooms
+    view_hits = 0
+    view_misses = 0
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
     def view(self, looker) -> str:
+        """
+        The room as `looker` sees it. Renders are cached until the room's
+        contents, exits or description change (see the events below); the
+        looker's own entry is left out of the creature list, so a creature
+        in the room gets a render of its own.
+        """
+        cached = self.__dict__.get('_views')
+        # a reloaded collection means changes the events never saw
+        if cached is None or cached[0] is not self.inventory or cached[1] is not self.exits:
+            occupants = {mob for mob in self.inventory if isinstance(mob, Creature)}
+            cached = self._views = (self.inventory, self.exits, {}, occupants)
+        views, occupants = cached[2], cached[3]
+        key = looker if looker in occupants else None
+        view = views.get(key)
+        if view is None:
+            Room.view_misses += 1
+            view = views[key] = self._render(looker)
+        else:
+            Room.view_hits += 1
+        return view
+
+    def _render(self, looker) -> str:
         items = [obj for obj in self.inventory if isinstance(obj, Item)]
         creatures = [mob for mob in self.inventory if isinstance(mob, Creature) and mob != looker]
         items_text = "Items: " + ", ".join(i.name for i in items) if items else ""
@@ -214,5 +249,29 @@ class Exit(Base):
                 f'{self.direction}->[{self.to_room_id}]>')
 
 
+# Invalidate Room.view() caches
+def _forget_views(room) -> None:
+    if room is not None:
+        room.__dict__.pop('_views', None)
+
+@event.listens_for(GameObject.inventory, 'append', propagate=True)
+@event.listens_for(GameObject.inventory, 'remove', propagate=True)
+@event.listens_for(Room.exits, 'append', propagate=True)
+@event.listens_for(Room.exits, 'remove', propagate=True)
+def _room_changed(room, value, initiator):
+    _forget_views(room)
+
+@event.listens_for(GameObject.name, 'set', propagate=True)
+@event.listens_for(GameObject.description, 'set', propagate=True)
+def _renamed(obj, value, oldvalue, initiator):
+    # a room shows its own name and description, and its contents' names
+    _forget_views(obj)
+    _forget_views(obj.__dict__.get('owner'))
+
+@event.listens_for(Exit.direction, 'set')
+def _exit_renamed(exit, value, oldvalue, initiator):
+    _forget_views(exit.__dict__.get('from_room'))
+
+
 if __name__=="__main__":
     print("this module is not meant to be run directly")
\ No newline at end of file
@@ -0,0 +1,144 @@
+import weakref
+from collections import defaultdict
+from typing import Callable
+
+from sqlalchemy import event
+
+from .models import GameObject, Player
+
+GLOBAL = 'global'
+
+# every Presence that is still in use, for the owner listener at the bottom
+_live: weakref.WeakSet = weakref.WeakSet()
+
+
+class Presence():
+    '''
+    Who is connected, and which channels each of them listens to.
+
+    A channel is a named set of players; publishing to one reaches exactly
+    its listeners, however much else is lying about the room. Three kinds
+    are kept up to date automatically:
+        room:<id>   everyone online in a room
+        zone:<n>    everyone online in rooms zone_size * n and up
+        global      everyone online
+    enter() and leave() are called on login and logout, and moves are
+    followed through owner changes (Action.chown, Room setter, ...).
+    Anything else can subscribe() players to channels of its own, or
+    watch() players come, go and move (see Zones).
+
+    Call with world_lock held, like everything else touching the world.
+    '''
+    def __init__(self, deliver: Callable, zone_size: int = 1000):
+        self.deliver = deliver      # deliver(player, message)
+        self.zone_size = zone_size
+        self.channels: dict[str, set[Player]] = defaultdict(set)
+        self.subscriptions: dict[Player, set[str]] = {}
+        self.locations: dict[Player, int|None] = {}     # online players' room ids
+        self.watchers: list[Callable] = []     # watcher(player, old room id, new room id)
+        self.published = 0
+        self.delivered = 0
+        _live.add(self)
+
+    @staticmethod
+    def room_channel(room_id: int) -> str:
+        return f'room:{room_id}'
+
+    def zone_channel(self, room_id: int) -> str:
+        return f'zone:{room_id // self.zone_size}'
+
+    def zone_of(self, room_id: int) -> int:
+        return room_id // self.zone_size
+
+    @property
+    def online(self) -> set[Player]:
+        return self.channels[GLOBAL]
+
+    def is_online(self, player: Player) -> bool:
+        return player in self.subscriptions
+
+    def enter(self, player: Player) -> None:
+        ''' A player has connected. '''
+        self.subscriptions.setdefault(player, set())
+        self.subscribe(player, GLOBAL)
+        self._place(player, player.owner_id)
+
+    def leave(self, player: Player) -> None:
+        ''' A player has disconnected: drop every subscription. '''
+        for channel in self.subscriptions.pop(player, ()):
+            self._drop(player, channel)
+        old = self.locations.pop(player, None)
+        for watcher in self.watchers:
+            watcher(player, old, None)
+
+    def watch(self, watcher: Callable) -> None:
+        ''' Call watcher(player, old room id, new room id) whenever an online player moves. '''
+        self.watchers.append(watcher)
+
+    def subscribe(self, player: Player, channel: str) -> None:
+        self.channels[channel].add(player)
+        self.subscriptions.setdefault(player, set()).add(channel)
+
+    def unsubscribe(self, player: Player, channel: str) -> None:
+        self._drop(player, channel)
+        if player in self.subscriptions:
+            self.subscriptions[player].discard(channel)
+
+    def listeners(self, channel: str) -> set[Player]:
+        return self.channels.get(channel, set())
+
+    def publish(self, channel: str, message: str, exclude: Player|None = None) -> int:
+        ''' Send a message to every listener of a channel; return how many got it. '''
+        self.published += 1
+        sent = 0
+        for player in tuple(self.channels.get(channel, ())):
+            if player is exclude:
+                continue
+            try:
+                self.deliver(player, message)
+                sent += 1
+            except Exception as e:
+                print(f"Error delivering to {player}: {e}")
+        self.delivered += sent
+        return sent
+
+    def to_room(self, room: GameObject|None, message: str, exclude: Player|None = None) -> int:
+        if room is None:
+            return 0
+        return self.publish(self.room_channel(room.id), message, exclude)
+
+    def to_zone(self, room: GameObject|None, message: str, exclude: Player|None = None) -> int:
+        if room is None:
+            return 0
+        return self.publish(self.zone_channel(room.id), message, exclude)
+
+    def _place(self, player: Player, room_id: int|None) -> None:
+        old = self.locations.get(player)
+        if old is not None:
+            self.unsubscribe(player, self.room_channel(old))
+            if room_id is None or self.zone_of(old) != self.zone_of(room_id):
+                self.unsubscribe(player, self.zone_channel(old))
+        self.locations[player] = room_id
+        if room_id is not None:
+            self.subscribe(player, self.room_channel(room_id))
+            self.subscribe(player, self.zone_channel(room_id))
+        for watcher in self.watchers:
+            watcher(player, old, room_id)
+
+    def _drop(self, player: Player, channel: str) -> None:
+        listeners = self.channels.get(channel)
+        if listeners is not None:
+            listeners.discard(player)
+            if not listeners and channel != GLOBAL:
+                del self.channels[channel]
+
+    def _moved(self, obj, owner, old_owner, initiator) -> None:
+        if obj in self.subscriptions:
+            self._place(obj, owner.id if owner is not None else None)
+
+
+@event.listens_for(GameObject.owner, 'set', propagate=True)
+def _moved(obj, owner, old_owner, initiator):
+    # registered once: a listener per instance would never be removed
+    for presence in _live:
+        presence._moved(obj, owner, old_owner, initiator)
@@ -0,0 +1,215 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from sqlalchemy.orm import Session, configure_mappers, make_transient_to_detached
+
+from .models import GameObject, Room, Creature, Player, Item, Exit
+from .journal import _sync_directory
+
+# File layout (little-endian), every section 8-byte aligned so the columns
+# can be used in place from a memory map:
+#   header   magic:8s version:I checkpoint_seq:Q objects:Q exits:Q
+#   sections name_len:H typecode:c count:Q size:Q name, then `size` bytes
+# Numeric columns are plain arrays; a string column is three sections:
+# '<col>.offsets' (count + 1 positions), '<col>.data' (utf-8) and '<col>.null'.
+MAGIC = b'DC95SNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sIQQQ')
+SECTION = struct.Struct('<HcQQ')
+NONE = -1
+
+TYPES = [GameObject, Room, Creature, Player, Item]
+TYPE_CODES = {cls: code for code, cls in enumerate(TYPES)}
+CREATURE_STATS = ('Str', 'Dex', 'Int', 'hp', 'hp_max')
+OBJECT_STRINGS = ('name', 'noun', 'description', 'adjectives', 'username',
+                  'password_hash', 'stats')
+JSON_COLUMNS = ('adjectives', 'stats')
+
+
+class SnapshotError(Exception):
+    ''' The snapshot is missing, damaged, or from another version. '''
+
+
+def write(path: str, objects: list, exits: list, checkpoint_seq: int = 0) -> None:
+    ''' Write objects and exits to `path` atomically. '''
+    objects = sorted(objects, key=lambda obj: obj.id)
+    exits = sorted(exits, key=lambda exit: exit.id)
+    columns = {
+        'id': array('q', (obj.id for obj in objects)),
+        'owner_id': array('q', (NONE if obj.owner_id is None else obj.owner_id
+                                for obj in objects)),
+        'type': array('B', (TYPE_CODES[type(obj)] for obj in objects)),
+        'article': array('B', (bool(obj.article) for obj in objects)),
+    }
+    for stat in CREATURE_STATS:
+        columns[stat] = array('q', (getattr(obj, stat, None) or 0 for obj in objects))
+    for name in OBJECT_STRINGS:
+        values = [getattr(obj, name, None) for obj in objects]
+        if name in JSON_COLUMNS:
+            values = [None if value is None else json.dumps(value) for value in values]
+        columns.update(_strings(name, values))
+    columns.update({
+        'exit.id': array('q', (exit.id for exit in exits)),
+        'exit.from_room_id': array('q', (exit.from_room_id for exit in exits)),
+        'exit.to_room_id': array('q', (exit.to_room_id for exit in exits)),
+    })
+    columns.update(_strings('exit.direction', [exit.direction for exit in exits]))
+
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, checkpoint_seq, len(objects), len(exits)))
+        _pad(f)
+        for name, values in columns.items():
+            data = values.tobytes()
+            f.write(SECTION.pack(len(name), values.typecode.encode(), len(values), len(data)))
+            f.write(name.encode())
+            _pad(f)
+            f.write(data)
+            _pad(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def discard(path: str) -> None:
+    ''' Remove a snapshot that no longer holds the whole world, for good. '''
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return
+    _sync_directory(path)
+
+
+def read_header(path: str) -> tuple[int, int, int]:
+    ''' (checkpoint_seq, objects, exits) of a snapshot file. '''
+    try:
+        with open(path, 'rb') as f:
+            magic, version, seq, objects, exits = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error) as e:
+        raise SnapshotError(f"Cannot read snapshot {path}: {e}")
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError(f"{path} is not a version {VERSION} snapshot")
+    return seq, objects, exits
+
+
+def load(path: str, session: Session) -> tuple[list, list]:
+    '''
+    Rebuild the objects and exits in a snapshot as persistent instances of
+    `session`, without touching the database. Relationships are left for
+    World.link() to fill in.
+    '''
+    read_header(path)
+    configure_mappers()     # normally done by the first query
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            _, _, _, count, exit_count = HEADER.unpack_from(view)
+            columns = _sections(view)
+            objects = _objects(columns, count)
+            exits = _exits(columns, exit_count)
+        finally:
+            # the columns are views into the map, which can't close under them
+            columns = None
+            view.release()
+    for instance in objects + exits:
+        make_transient_to_detached(instance)
+    session.add_all(objects)
+    session.add_all(exits)
+    return objects, exits
+
+
+def _objects(columns: dict, count: int) -> list:
+    ids, owners, types, articles = (columns[name] for name in ('id', 'owner_id', 'type', 'article'))
+    stats = [columns[stat] for stat in CREATURE_STATS]
+    strings = {name: _string_reader(columns, name) for name in OBJECT_STRINGS}
+    # instances are made the way the ORM makes them for query rows: no
+    # __init__, columns written straight into __dict__
+    new = {cls: cls._sa_class_manager.new_instance for cls in TYPES}
+    identities = {cls: cls.__mapper__.polymorphic_identity for cls in TYPES}
+    objects = []
+    for i in range(count):
+        cls = TYPES[types[i]]
+        obj = new[cls]()
+        values = obj.__dict__
+        values.update(id=ids[i],
+                      owner_id=None if owners[i] == NONE else owners[i],
+                      article=bool(articles[i]),
+                      object_type=identities[cls])
+        for name in ('name', 'noun', 'description', 'adjectives'):
+            values[name] = strings[name](i)
+        if issubclass(cls, Creature):
+            for stat, column in zip(CREATURE_STATS, stats):
+                values[stat] = column[i]
+        if cls is Player:
+            values['username'] = strings['username'](i)
+            values['password_hash'] = strings['password_hash'](i)
+        if cls is Item:
+            values['stats'] = strings['stats'](i)
+        objects.append(obj)
+    return objects
+
+
+def _exits(columns: dict, count: int) -> list:
+    ids, from_ids, to_ids = (columns[name] for name in
+                             ('exit.id', 'exit.from_room_id', 'exit.to_room_id'))
+    direction = _string_reader(columns, 'exit.direction')
+    new = Exit._sa_class_manager.new_instance
+    exits = []
+    for i in range(count):
+        exit = new()
+        exit.__dict__.update(id=ids[i], from_room_id=from_ids[i], to_room_id=to_ids[i],
+                             direction=direction(i))
+        exits.append(exit)
+    return exits
+
+
+def _strings(name: str, values: list) -> dict:
+    ''' Encode a string column as offsets, utf-8 data and null flags. '''
+    offsets, data, nulls = array('q', [0]), bytearray(), array('B')
+    for value in values:
+        if value is not None:
+            data += value.encode()
+        nulls.append(value is None)
+        offsets.append(len(data))
+    return {f'{name}.offsets': offsets,
+            f'{name}.data': array('B', data),
+            f'{name}.null': nulls}
+
+
+def _string_reader(columns: dict, name: str):
+    offsets, data, nulls = (columns[f'{name}.{part}'] for part in ('offsets', 'data', 'null'))
+    data = bytes(data)
+    is_json = name in JSON_COLUMNS
+    def read(i: int):
+        if nulls[i]:
+            return None
+        value = data[offsets[i]:offsets[i + 1]].decode()
+        return json.loads(value) if is_json else value
+    return read
+
+
+def _sections(view: memoryview) -> dict:
+    columns = {}
+    offset = _aligned(HEADER.size)
+    while offset < len(view):
+        name_len, typecode, count, size = SECTION.unpack_from(view, offset)
+        offset += SECTION.size
+        name = bytes(view[offset:offset + name_len]).decode()
+        offset = _aligned(offset + name_len)
+        if offset + size > len(view):
+            raise SnapshotError(f"Snapshot is truncated in section {name}")
+        columns[name] = view[offset:offset + size].cast(typecode.decode())
+        if len(columns[name]) != count:
+            raise SnapshotError(f"Snapshot section {name} is damaged")
+        offset = _aligned(offset + size)
+    return columns
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _pad(f) -> None:
+    f.write(b'\0' * (_aligned(f.tell()) - f.tell()))
@@ -0,0 +1,202 @@
+import weakref
+from typing import Iterable
+
+import numpy as np
+from sqlalchemy import event
+
+from .models import GameObject, Creature
+
+STATS = ('Str', 'Dex', 'Int', 'hp', 'hp_max')
+# Status effects and the hit points they add (or take) each step
+EFFECTS = {
+    'poisoned': -2,
+    'regenerating': 3,
+}
+NOWHERE = -1
+
+# Every StatStore, so the attribute events below can reach them
+_stores = weakref.WeakSet()
+
+
+class StatStore():
+    '''
+    The stats of every live creature as arrays, one row per creature.
+
+    Str, Dex, Int, hp and hp_max are int64 columns, `room` is the id of the
+    room each creature is in, and every status effect in EFFECTS has a
+    column of steps left to run. Updates that touch everyone (regeneration,
+    effects wearing off, combat) are whole-column operations, and only the
+    rows whose values actually changed need writing back to the Creature
+    objects; step() returns just those.
+
+    The Creature attributes stay the record: setting one (Action.set_hp,
+    say) updates its row through the events below, so the arrays never go
+    stale. A creature gets a row when the world is loaded, when it is
+    added, or the first time row() is asked for it.
+
+    Call with world_lock held, like everything else touching the world.
+    '''
+    def __init__(self, capacity: int = 1024):
+        self.creatures: list[Creature] = []
+        self.rows: dict[Creature, int] = {}
+        self.capacity = max(1, capacity)
+        self.columns = {name: np.zeros(self.capacity, np.int64) for name in STATS + ('room',)}
+        self.effects = {name: np.zeros(self.capacity, np.int32) for name in EFFECTS}
+        self.steps = 0
+        self.written = 0
+        _stores.add(self)
+
+    def __len__(self) -> int:
+        return len(self.creatures)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        ''' A column, cut to the creatures in the store (a view, not a copy). '''
+        column = self.columns.get(name)
+        if column is None:
+            column = self.effects[name]
+        return column[:len(self.creatures)]
+
+    def build(self, creatures: Iterable[Creature]) -> None:
+        ''' Start over with these creatures. '''
+        self.creatures = list(creatures)
+        self.rows = {creature: row for row, creature in enumerate(self.creatures)}
+        count = len(self.creatures)
+        self.capacity = max(1024, count * 2)
+        for name in STATS:
+            values = (self._value(creature, name) for creature in self.creatures)
+            self.columns[name] = np.zeros(self.capacity, np.int64)
+            self.columns[name][:count] = np.fromiter(values, np.int64, count)
+        self.columns['room'] = np.full(self.capacity, NOWHERE, np.int64)
+        self.columns['room'][:count] = np.fromiter(
+            (self._room(creature) for creature in self.creatures), np.int64, count)
+        self.effects = {name: np.zeros(self.capacity, np.int32) for name in EFFECTS}
+
+    def add(self, creature: Creature) -> int:
+        ''' Give a creature a row (if it has none); return it. '''
+        row = self.rows.get(creature)
+        if row is not None:
+            return row
+        row = len(self.creatures)
+        if row == self.capacity:
+            self._grow()
+        self.creatures.append(creature)
+        self.rows[creature] = row
+        for name in STATS:
+            self.columns[name][row] = self._value(creature, name)
+        self.columns['room'][row] = self._room(creature)
+        for timers in self.effects.values():
+            timers[row] = 0
+        return row
+
+    row = add
+
+    def remove(self, creature: Creature) -> None:
+        ''' Drop a creature's row, moving the last row into its place. '''
+        row = self.rows.pop(creature, None)
+        if row is None:
+            return
+        last = len(self.creatures) - 1
+        moved = self.creatures.pop()
+        if row != last:
+            self.creatures[row] = moved
+            self.rows[moved] = row
+            for column in (*self.columns.values(), *self.effects.values()):
+                column[row] = column[last]
+
+    def afflict(self, creature: Creature, effect: str, steps: int) -> None:
+        ''' Put an effect on a creature for `steps` steps (or cure it, with 0). '''
+        timers = self.effects[effect]
+        row = self.add(creature)
+        timers[row] = 0 if steps <= 0 else max(timers[row], steps)
+
+    def affected(self, creature: Creature, effect: str) -> int:
+        ''' Steps an effect has left on a creature. '''
+        row = self.rows.get(creature)
+        return 0 if row is None else int(self.effects[effect][row])
+
+    def step(self, regen: int, rows: np.ndarray|None = None) -> list[tuple[Creature, int]]:
+        '''
+        Move creatures on a step (all of them, or just `rows`): the living
+        regain `regen` hit points and feel their effects, which then have a
+        step less to run. Effects can't take anyone below 1 hit point, and
+        nothing heals past hp_max. Return (creature, new hp) for the
+        creatures whose hit points changed.
+        '''
+        self.steps += 1
+        if rows is None:
+            rows = np.arange(len(self.creatures))
+        return self.fast_forward(rows, 1, regen)
+
+    def fast_forward(self, rows: np.ndarray, steps: int, regen: int) -> list[tuple[Creature, int]]:
+        '''
+        Catch `rows` up on `steps` missed steps in one go, e.g. creatures
+        whose zone was asleep. Totals are applied at once, so the floor and
+        cap only bind at the end rather than every step.
+        '''
+        if not len(rows) or steps <= 0:
+            return []
+        hp = self.columns['hp']
+        before = hp[rows]
+        delta = np.full(len(rows), regen * steps, np.int64)
+        for name, per_step in EFFECTS.items():
+            timers = self.effects[name]
+            left = timers[rows]
+            used = np.minimum(left, steps)
+            delta += per_step * used
+            timers[rows] = left - used
+        # healing stops at hp_max, but whoever is already above it stays there
+        after = np.clip(before + delta, 1, np.maximum(self.columns['hp_max'][rows], before))
+        changed = (before > 0) & (after != before)
+        rows, after = rows[changed], after[changed]
+        hp[rows] = after
+        self.written += len(rows)
+        creatures = self.creatures
+        return [(creatures[row], value) for row, value in zip(rows.tolist(), after.tolist())]
+
+    def _grow(self) -> None:
+        self.capacity *= 2
+        for name, column in self.columns.items():
+            grown = np.full(self.capacity, NOWHERE if name == 'room' else 0, np.int64)
+            grown[:len(column)] = column
+            self.columns[name] = grown
+        for name, timers in self.effects.items():
+            grown = np.zeros(self.capacity, np.int32)
+            grown[:len(timers)] = timers
+            self.effects[name] = grown
+
+    @staticmethod
+    def _value(creature: Creature, name: str) -> int:
+        value = getattr(creature, name)
+        if value is None:
+            value = creature.hp_max if name == 'hp' else 1
+        return value or 0
+
+    @staticmethod
+    def _room(creature: Creature) -> int:
+        owner = creature.__dict__.get('owner')
+        if owner is not None:
+            return owner.id if owner.id is not None else NOWHERE
+        return NOWHERE if creature.owner_id is None else creature.owner_id
+
+
+def _stat_setter(name: str):
+    def set_stat(creature, value, oldvalue, initiator):
+        for store in _stores:
+            row = store.rows.get(creature)
+            if row is not None:
+                store.columns[name][row] = 0 if value is None else value
+    return set_stat
+
+
+for _name in STATS:
+    event.listen(getattr(Creature, _name), 'set', _stat_setter(_name), propagate=True)
+
+
+@event.listens_for(GameObject.owner, 'set', propagate=True)
+def _creature_moved(obj, owner, oldvalue, initiator):
+    if not isinstance(obj, Creature):
+        return
+    for store in _stores:
+        row = store.rows.get(obj)
+        if row is not None:
+            store.columns['room'][row] = NOWHERE if owner is None or owner.id is None else owner.id
@@ -0,0 +1,310 @@
+import gc
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import bindparam, func, inspect, select, update
+from sqlalchemy.orm import Session, with_polymorphic
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.interfaces import MANYTOONE
+
+from .models import GameObject, Room, Exit, Creature
+from .graph import RoomGraph
+from .stats import StatStore
+from .metrics import metrics
+from . import snapshot
+
+
+class World():
+    '''
+    The live game world, held in memory.
+
+    load() reads every object and exit in one pass and wires up their
+    relationships itself, so afterwards the engine reads and writes plain
+    attributes and never waits on a lazy load. Changes are left pending in
+    the world session (which tracks what is dirty) and written to the
+    database in bulk by checkpoint(), every CHECKPOINT_INTERVAL seconds
+    once start_checkpointer() is running. A checkpoint only holds the lock
+    while it copies the changes out; the database write happens without
+    it, so the game carries on meanwhile.
+
+    On a clean stop() the world is also written to a snapshot file, which
+    load_snapshot() reads back at the next start without the database.
+    add()ing an object the snapshot doesn't have discards it.
+
+    Every command and action still runs under the one lock, one at a time:
+    the objects are shared and nothing else makes them safe to touch
+    concurrently. What keeps that cheap is that, once loaded, nothing done
+    under it waits on the database (no lazy loads, no commits); database
+    work that isn't about the live world (logins, character creation) uses
+    private sessions from session_scope() and never takes the lock. So the
+    world itself goes no faster than one thread, however many cores there
+    are; splitting it (e.g. a lock per zone) would be the next step.
+    '''
+    def __init__(self, session: Session, lock: threading.RLock):
+        self.session = session
+        self.lock = lock
+        self.loaded = False
+        self.objects: dict[int, GameObject] = {}
+        self.rooms: dict[int, Room] = {}
+        self.room_names: dict[str, int] = {}    # lowercased name -> lowest room id
+        self.exits: dict[int, Exit] = {}
+        self.graph = RoomGraph()
+        self.stats = StatStore()
+        self.journal = None     # emptied once a checkpoint has committed
+        self.snapshot_path = None   # written by stop()
+        self.checkpoints = 0
+        self.checkpoint_seconds = 0.0
+        self.unwritten: dict[tuple, dict] = {}  # (table, id) -> values a failed checkpoint left
+        self._checkpointing = threading.Lock()
+        self._stop = threading.Event()
+
+    def load(self) -> None:
+        ''' Load the whole world from the database. '''
+        with self.lock:
+            started = time.perf_counter()
+            everything = with_polymorphic(GameObject, '*')
+            objects = self.session.scalars(
+                select(everything).order_by(everything.id)).all()
+            exits = self.session.scalars(select(Exit).order_by(Exit.id)).all()
+            self.link(objects, exits)
+            print(f"Loaded {len(self.objects)} objects and {len(self.exits)} "
+                  f"exits in {time.perf_counter() - started:.2f}s")
+
+    def load_snapshot(self, path: str) -> None:
+        ''' Load the whole world from a snapshot file. '''
+        with self.lock:
+            started = time.perf_counter()
+            # nothing built here is garbage; don't let the collector rescan
+            # it all every few thousand allocations
+            gc.disable()
+            try:
+                objects, exits = snapshot.load(path, self.session)
+                self.link(objects, exits)
+            except Exception:
+                self.session.expunge_all()
+                self.loaded = False
+                raise
+            finally:
+                gc.enable()
+            print(f"Loaded {len(self.objects)} objects and {len(self.exits)} "
+                  f"exits from {path} in {time.perf_counter() - started:.2f}s")
+
+    def save_snapshot(self, path: str, checkpoint_seq: int = 0) -> None:
+        ''' Write the world, which must be checkpointed, to a snapshot file. '''
+        with self.lock:
+            if self.dirty:
+                raise snapshot.SnapshotError("Checkpoint the world before snapshotting it")
+            started = time.perf_counter()
+            snapshot.write(path, list(self.objects.values()), list(self.exits.values()),
+                           checkpoint_seq)
+        print(f"Snapshot of {len(self.objects)} objects written to {path} "
+              f"in {time.perf_counter() - started:.2f}s")
+
+    def link(self, objects: list, exits: list) -> None:
+        ''' Index loaded objects and fill in their relationships. '''
+        self.objects = {obj.id: obj for obj in objects}
+        self.rooms = {obj.id: obj for obj in objects if isinstance(obj, Room)}
+        self.exits = {exit.id: exit for exit in exits}
+
+        contents = defaultdict(list)
+        for obj in objects:
+            contents[obj.owner_id].append(obj)
+        for obj in objects:
+            set_committed_value(obj, 'owner', self.objects.get(obj.owner_id))
+            set_committed_value(obj, 'inventory', contents[obj.id])
+
+        exits_from, exits_to = defaultdict(list), defaultdict(list)
+        for exit in exits:
+            exits_from[exit.from_room_id].append(exit)
+            exits_to[exit.to_room_id].append(exit)
+            set_committed_value(exit, 'from_room', self.rooms.get(exit.from_room_id))
+            set_committed_value(exit, 'to_room', self.rooms.get(exit.to_room_id))
+        for room in self.rooms.values():
+            set_committed_value(room, 'exits', exits_from[room.id])
+            set_committed_value(room, 'entries', exits_to[room.id])
+        self.room_names = {}
+        for room_id in sorted(self.rooms, reverse=True):
+            self.room_names[self.rooms[room_id].name.lower()] = room_id
+        self.graph.build(self.rooms, ((exit.from_room_id, exit.to_room_id, exit.direction)
+                                      for exit in exits))
+        self.stats.build(obj for obj in objects if isinstance(obj, Creature))
+        self.loaded = True
+
+    def add(self, obj: GameObject) -> None:
+        ''' Bring an object created outside the world (e.g. a new player) in. '''
+        with self.lock:
+            if self.snapshot_path:
+                # the snapshot doesn't have it, so anything journaled about
+                # it couldn't be replayed on top of the snapshot: restart
+                # from the database instead, where it is
+                snapshot.discard(self.snapshot_path)
+            self.objects[obj.id] = obj
+            if isinstance(obj, Room):
+                self.rooms[obj.id] = obj
+                name = obj.name.lower()
+                if self.room_names.get(name, obj.id) >= obj.id:
+                    self.room_names[name] = obj.id
+                set_committed_value(obj, 'exits', [])
+                set_committed_value(obj, 'entries', [])
+            owner = self.objects.get(obj.owner_id)
+            set_committed_value(obj, 'owner', owner)
+            set_committed_value(obj, 'inventory', [])
+            if owner is not None:
+                set_committed_value(owner, 'inventory', list(owner.inventory) + [obj])
+            if isinstance(obj, Creature):
+                self.stats.add(obj)
+
+    def find_room(self, name: str) -> Room|None:
+        ''' A room by id ("42" or "#42") or by name, lowest id first. '''
+        with self.lock:
+            if name.lstrip('#').isdigit():
+                room_id = int(name.lstrip('#'))
+                if self.loaded:
+                    return self.rooms.get(room_id)
+                return self.session.get(Room, room_id)
+            if self.loaded:
+                return self.rooms.get(self.room_names.get(name.lower()))
+            return self.session.scalars(select(Room).where(func.lower(Room.name) == name.lower())
+                                        .order_by(Room.id).limit(1)).first()
+
+    def route(self, from_room: Room, to_room: Room, max_steps: int|None = None) -> list[str]|None:
+        ''' Directions for the shortest way between two rooms; see RoomGraph.route(). '''
+        with self.lock:
+            if not self.graph.built:
+                # without load() the exit table is read the first time it's needed
+                rooms = self.session.scalars(select(Room.id)).all()
+                exits = self.session.execute(
+                    select(Exit.from_room_id, Exit.to_room_id, Exit.direction)).all()
+                self.graph.build(rooms, exits)
+            return self.graph.route(from_room.id, to_room.id, max_steps)
+
+    @property
+    def dirty(self) -> int:
+        ''' Number of objects changed since the last checkpoint. '''
+        return len(self.session.dirty) + len(self.session.new) + len(self.session.deleted)
+
+    def checkpoint(self) -> int:
+        '''
+        Write every pending change to the database in one transaction.
+
+        Under the lock, the changed column values are copied out and the
+        objects marked clean; the UPDATEs then run on a connection of their
+        own with the lock released. The journal is only emptied of the
+        actions that the copy covered, and if the write fails its rows are
+        kept and tried again (merged with newer changes) next time.
+        '''
+        with self._checkpointing:
+            with self.lock:
+                if self.session.new or self.session.deleted:
+                    # objects created or deleted in the world session itself
+                    # (nothing does this today) need the session's own flush
+                    return self._commit_in_session()
+                started = time.perf_counter()
+                changes = self._take_changes()
+                through = self.journal.seq if self.journal else None
+            rows = self.unwritten
+            for key, values in changes.items():
+                rows.setdefault(key, {}).update(values)
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception as e:
+                self.unwritten = rows
+                print(f"Checkpoint of {len(rows)} rows failed, will retry:\n   {e}")
+                return 0
+            self.unwritten = {}
+            if self.journal:
+                self.journal.reset(through)
+            elapsed = time.perf_counter() - started
+            metrics.observe('commit', 'checkpoint', elapsed)
+            self.checkpoints += 1
+            self.checkpoint_seconds += elapsed
+        print(f"Checkpoint: {len(rows)} rows written in {elapsed * 1000:.0f}ms")
+        return len(rows)
+
+    def _take_changes(self) -> dict[tuple, dict]:
+        '''
+        The changed columns of every dirty object, as (table, id) -> values,
+        marking the objects clean. Call with the lock held.
+        '''
+        rows: dict[tuple, dict] = {}
+        for obj in list(self.session.dirty):
+            state = inspect(obj)
+            mapper = state.mapper
+            object_id = state.identity[0]
+            for prop in mapper.column_attrs:
+                if state.attrs[prop.key].history.has_changes():
+                    column = prop.columns[0]
+                    rows.setdefault((column.table, object_id), {})[column.name] = \
+                        getattr(obj, prop.key)
+            for prop in mapper.relationships:
+                if prop.direction is not MANYTOONE or \
+                        not state.attrs[prop.key].history.has_changes():
+                    continue
+                # e.g. owner: write owner_id, which isn't kept in step
+                # without a flush
+                related = getattr(obj, prop.key)
+                for local, remote in prop.local_remote_pairs:
+                    value = None if related is None else getattr(related, remote.key)
+                    rows.setdefault((local.table, object_id), {})[local.name] = value
+                    set_committed_value(obj, mapper.get_property_by_column(local).key, value)
+            state._commit_all(state.dict, self.session.identity_map)
+        return rows
+
+    def _write(self, rows: dict[tuple, dict]) -> None:
+        ''' UPDATE the rows in one transaction, batched by table and columns. '''
+        batches = defaultdict(list)
+        for (table, object_id), values in rows.items():
+            batches[table, tuple(sorted(values))].append(
+                {'_id': object_id, **{f'_{name}': value for name, value in values.items()}})
+        with self.session.get_bind().begin() as connection:
+            for (table, names), params in batches.items():
+                key, = table.primary_key.columns
+                statement = (update(table).where(key == bindparam('_id'))
+                             .values({name: bindparam(f'_{name}') for name in names}))
+                connection.execute(statement, params)
+
+    def _commit_in_session(self) -> int:
+        ''' The old way: commit the world session, holding the lock throughout. '''
+        dirty = self.dirty
+        started = time.perf_counter()
+        try:
+            self.session.commit()
+            if self.journal:
+                self.journal.reset()
+        except Exception as e:
+            # the session is unusable until rolled back, which reverts
+            # the world to the last checkpoint
+            self.session.rollback()
+            print(f"Checkpoint of {dirty} objects failed:\n   {e}")
+            return 0
+        elapsed = time.perf_counter() - started
+        metrics.observe('commit', 'checkpoint', elapsed)
+        self.checkpoints += 1
+        self.checkpoint_seconds += elapsed
+        print(f"Checkpoint: {dirty} objects written in {elapsed * 1000:.0f}ms")
+        return dirty
+
+    def start_checkpointer(self, interval: float) -> threading.Thread:
+        ''' Checkpoint every `interval` seconds on a background thread. '''
+        def run():
+            while not self._stop.wait(interval):
+                self.checkpoint()
+        thread = threading.Thread(target=run, daemon=True, name='checkpointer')
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        ''' Stop the checkpointer, write out what is left and snapshot it. '''
+        self._stop.set()
+        self.checkpoint()
+        if self.snapshot_path and self.journal and not self.dirty and not self.unwritten:
+            # a fresh checkpoint record names the state being snapshotted
+            self.journal.reset()
+            try:
+                self.save_snapshot(self.snapshot_path, self.journal.seq)
+            except Exception as e:
+                print(f"Could not write snapshot:\n   {e}")
+        if self.journal:
+            self.journal.close()
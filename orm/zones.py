@@ -0,0 +1,170 @@
+import time
+from collections import Counter
+from typing import Callable
+
+import numpy as np
+
+from .presence import Presence
+from .stats import NOWHERE
+
+
+class Zones():
+    '''
+    Which parts of the world are being simulated.
+
+    Rooms are grouped into zones by id (zone n is rooms zone_size * n and
+    up, as for Presence). A zone wakes the moment an online player arrives
+    in it, by logging in or being moved (Action.chown, travel, ...), and
+    goes back to sleep once it has had no players for `idle` seconds.
+
+    While a zone sleeps nothing in it is simulated: its creatures are left
+    out of regeneration (active_rows()), and timers scheduled through
+    after() are taken out of the scheduler. On waking the zone is fast-
+    forwarded over the time it slept: its creatures get the regeneration
+    steps they missed in one go, written back through write(creature, hp),
+    and its timers go back in with the time that passed taken off (any
+    that came due meanwhile fire on the next tick).
+
+    The scheduler is set once game time starts; until then zone timers
+    can't be scheduled. Call with world_lock held, like everything else
+    touching the world.
+    '''
+    def __init__(self, presence: Presence, world, zone_size: int, idle: float,
+                 regen: int = 0, write: Callable|None = None):
+        self.world = world
+        self.zone_size = zone_size
+        self.idle = idle            # seconds without players before a zone sleeps
+        self.regen = regen          # hit points a creature regains each step
+        self.write = write          # write(creature, hp) for fast-forwarded creatures
+        self.scheduler = None
+        self.players: Counter[int] = Counter()  # online players in each active zone
+        self.active: set[int] = set()
+        self.empty_since: dict[int, float] = {}     # active zones with no players
+        self.slept: dict[int, tuple[int, int]] = {} # zone -> (stats step, tick) at sleep
+        self.timers: dict[int, set] = {}            # zone -> its timers in the scheduler
+        self.suspended: dict[int, dict] = {}        # zone -> {timer: ticks left}
+        self.wakes = 0
+        self.sleeps = 0
+        presence.watch(self._moved)
+
+    def zone_of(self, room_id: int) -> int:
+        return room_id // self.zone_size
+
+    def is_active(self, zone: int) -> bool:
+        return zone in self.active
+
+    def after(self, room, seconds: float, subject, action: str, target=None, arg=None,
+              **kwargs):
+        '''
+        Like Scheduler.after(), but the timer belongs to the zone of `room`
+        and only counts down while that zone is awake.
+        '''
+        zone = self.zone_of(room.id)
+        ticks = self.scheduler.ticks_for(seconds)
+        timer = self.scheduler.schedule(ticks, (subject, action, target, arg, kwargs))
+        if zone in self.active:
+            self.timers.setdefault(zone, set()).add(timer)
+        else:
+            # wake() takes off all the time since the zone went to sleep,
+            # but this timer has only been counting since now
+            slept_tick = self.slept.get(zone, (0, 0))[1]
+            left = self.scheduler.suspend(timer) + self.scheduler.now - slept_tick
+            self.suspended.setdefault(zone, {})[timer] = left
+        return timer
+
+    def cancel(self, timer) -> bool:
+        ''' Cancel a zone timer, asleep or not. '''
+        for suspended in self.suspended.values():
+            if suspended.pop(timer, None) is not None:
+                return True
+        return self.scheduler.cancel(timer)
+
+    def wake(self, zone: int, arriving=None) -> None:
+        '''
+        Start simulating a zone again, catching it up on the time it slept.
+        The player `arriving` (who woke it) was not asleep with it.
+        '''
+        if zone in self.active:
+            return
+        self.active.add(zone)
+        self.wakes += 1
+        stats = self.world.stats
+        slept_step, slept_tick = self.slept.pop(zone, (0, 0))
+        rows = np.flatnonzero(self._zones() == zone)
+        if arriving is not None and arriving in stats.rows:
+            rows = rows[rows != stats.rows[arriving]]
+        for creature, hp in stats.fast_forward(rows, stats.steps - slept_step, self.regen):
+            if self.write:
+                self.write(creature, hp)
+        suspended = self.suspended.pop(zone, {})
+        if suspended:
+            slept_ticks = self.scheduler.now - slept_tick
+            timers = self.timers.setdefault(zone, set())
+            for timer, left in suspended.items():
+                timers.add(self.scheduler.resume(timer, left - slept_ticks))
+
+    def sleep(self, zone: int) -> None:
+        ''' Stop simulating a zone, suspending its timers. '''
+        if zone not in self.active:
+            return
+        self.active.discard(zone)
+        self.empty_since.pop(zone, None)
+        self.sleeps += 1
+        now = self.scheduler.now if self.scheduler else 0
+        self.slept[zone] = (self.world.stats.steps, now)
+        suspended = {}
+        for timer in self.timers.pop(zone, ()):
+            left = self.scheduler.suspend(timer)
+            if left is not None:
+                suspended[timer] = left
+        if suspended:
+            self.suspended[zone] = suspended
+
+    def sweep(self, now: float|None = None) -> int:
+        ''' Put zones that have been empty for `idle` seconds to sleep; return how many. '''
+        now = time.monotonic() if now is None else now
+        idle = [zone for zone, since in self.empty_since.items() if now - since >= self.idle]
+        for zone in idle:
+            self.sleep(zone)
+        # forget timers that have fired
+        for zone, timers in self.timers.items():
+            if timers:
+                self.timers[zone] = {timer for timer in timers if timer.active}
+        return len(idle)
+
+    def active_rows(self) -> np.ndarray:
+        ''' The StatStore rows of creatures in active zones. '''
+        if not self.active:
+            return np.zeros(0, dtype=np.intp)
+        return np.flatnonzero(np.isin(self._zones(), list(self.active)))
+
+    def dormant(self) -> int:
+        ''' How many zones with rooms in them are asleep. '''
+        known = {self.zone_of(room_id) for room_id in self.world.rooms}
+        return len((known | self.slept.keys()) - self.active)
+
+    def report(self) -> str:
+        suspended = sum(len(timers) for timers in self.suspended.values())
+        return (f"{len(self.active)} active, {self.dormant()} dormant, "
+                f"{self.wakes} woken, {self.sleeps} put to sleep, "
+                f"{suspended} timers suspended")
+
+    def _zones(self) -> np.ndarray:
+        ''' The zone of every StatStore row (NOWHERE for creatures in no room). '''
+        rooms = self.world.stats['room']
+        return np.where(rooms == NOWHERE, NOWHERE, rooms // self.zone_size)
+
+    def _moved(self, player, old_room: int|None, new_room: int|None) -> None:
+        old = None if old_room is None else self.zone_of(old_room)
+        new = None if new_room is None else self.zone_of(new_room)
+        if old == new:
+            return
+        if old is not None:
+            self.players[old] -= 1
+            if self.players[old] <= 0:
+                del self.players[old]
+                self.empty_since[old] = time.monotonic()
+        if new is not None:
+            self.players[new] += 1
+            self.empty_since.pop(new, None)
+            self.wake(new, arriving=player)
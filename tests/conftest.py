@@ -0,0 +1,41 @@
+import os
+import tempfile
+
+# A throwaway database for the tests that need one (never the one in .env);
+# anything written to the working directory, like a journal, lands beside it
+WORKDIR = tempfile.mkdtemp()
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'tests.db')}"
+os.chdir(WORKDIR)
+
+import engine  # noqa: F401,E402  (engine must be imported before orm)
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from orm.models import Base, Room, Exit, Item, Creature, Player  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """A session factory for a fresh database, with a small world in it."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'world.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, expire_on_commit=False)
+    with factory() as session:
+        hall = Room(name='Hall', noun='hall', description='A long hall.', owner_id=None)
+        kitchen = Room(name='Kitchen', noun='kitchen', description='A kitchen.', owner_id=None)
+        session.add_all([hall, kitchen])
+        session.flush()
+        session.add_all([Exit('north', hall, kitchen), Exit('south', kitchen, hall)])
+        session.add(Item(name='sword', noun='sword', description='A sword.',
+                         owner_id=hall.id, stats={}))
+        session.add(Creature(name='rat', noun='rat', description='A rat.',
+                             owner_id=hall.id, hp_max=3))
+        player = Player(username='tester', name='Tester', noun='tester',
+                        description='Testing.', owner_id=hall.id)
+        player.set_password('password')
+        session.add(player)
+        session.commit()
+    yield factory
+    engine.dispose()
@@ -0,0 +1,112 @@
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+from engine.io import IOHandler
+from orm.accounts import Accounts
+from orm.models import Player
+
+io_module = sys.modules['engine.io']
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def scope(database):
+    @contextmanager
+    def session_scope():
+        session = database()
+        try:
+            yield session
+            session.commit()
+        except:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return session_scope
+
+
+def create(scope, username: str) -> int:
+    with scope() as session:
+        player = Player(username=username, name=username.capitalize(), noun=username,
+                        description='', password_hash='hash')
+        session.add(player)
+        session.flush()
+        return player.id
+
+
+def test_loaded_accounts_need_no_queries(scope):
+    accounts = Accounts(scope)
+    assert accounts.load() == 1
+    player_id, password_hash = accounts.lookup('tester')
+    assert password_hash.startswith('$pbkdf2')
+    assert accounts.taken('tester')
+    assert (accounts.hits, accounts.queries) == (2, 0)
+    accounts.add('newbie', 99, 'hash')
+    assert accounts.lookup('newbie') == (99, 'hash')
+    assert accounts.queries == 0
+
+
+def test_accounts_made_elsewhere_are_found(scope):
+    accounts = Accounts(scope)
+    accounts.load()
+    player_id = create(scope, 'outsider')
+    assert accounts.lookup('outsider') == (player_id, 'hash')
+    assert accounts.lookup('outsider') == (player_id, 'hash')
+    assert (accounts.hits, accounts.queries) == (1, 1)
+
+
+def test_unknown_names_are_remembered_for_a_while(scope, monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sys.modules['orm.accounts'], 'time', clock)
+    accounts = Accounts(scope, negative_size=2, negative_ttl=60)
+    assert accounts.lookup('nobody') is None
+    assert accounts.lookup('nobody') is None
+    assert (accounts.negative_hits, accounts.queries) == (1, 1)
+    clock.now += 60
+    assert accounts.lookup('nobody') is None
+    assert accounts.queries == 2
+    accounts.lookup('anybody')
+    accounts.lookup('somebody')
+    assert list(accounts.missing) == ['anybody', 'somebody']
+
+
+class Scripted(IOHandler):
+    def __init__(self, answers: list):
+        super().__init__(None)
+        self.answers = answers
+        self.printed = []
+
+    def print(self, message: str = '', **kwargs) -> None:
+        self.printed.append(message)
+
+    def input(self, prompt: str|None = None) -> str:
+        answer = self.answers.pop(0)
+        return answer() if callable(answer) else answer
+
+
+def test_losing_the_race_for_a_name_asks_for_another(scope, monkeypatch):
+    accounts = Accounts(scope)
+    monkeypatch.setattr(io_module, 'accounts', accounts)
+    monkeypatch.setattr(io_module, 'session_scope', scope)
+    monkeypatch.setattr(io_module, 'load_player', lambda player_id: player_id)
+    monkeypatch.setattr(io_module.auth, 'hash', lambda password: 'hash')
+
+    def meanwhile():
+        # another connection creates 'newbie' while this one picks a password
+        create(scope, 'newbie')
+        return 'password'
+
+    io = Scripted(['newbie', meanwhile, 'newbie', 'other'])
+    player_id = io._create_player()
+    assert io.printed == ["Username taken", "Username taken"]
+    assert accounts.lookup('other') == (player_id, 'hash')
+    assert accounts.taken('newbie')
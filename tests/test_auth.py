@@ -0,0 +1,96 @@
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from engine.auth import AuthPool, LoginThrottle
+from engine.exceptions import LoginRefused
+
+auth_module = sys.modules['engine.auth']    # engine.auth is also the game's AuthPool
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(auth_module, 'time', clock)
+    return clock
+
+
+def settled(pool: AuthPool) -> bool:
+    """Wait for the done callbacks, which can run just after result() returns."""
+    deadline = time.monotonic() + 5
+    while pool.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return pool.pending == 0
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = AuthPool(workers=1, queue=4, throttle=LoginThrottle(failures=0))
+    yield pool
+    pool.stop()
+
+
+def test_throttle_counts_failures_in_the_window(clock):
+    throttle = LoginThrottle(failures=2, window=60)
+    throttle.record('1.2.3.4', False)
+    clock.now += 10
+    throttle.record('1.2.3.4', False)
+    assert throttle.wait('1.2.3.4') == 60 - 10
+    assert throttle.wait('5.6.7.8') == 0
+    clock.now += 50
+    assert throttle.wait('1.2.3.4') == 0     # the first has expired
+    throttle.record('1.2.3.4', False)
+    assert throttle.wait('1.2.3.4') > 0
+    throttle.record('1.2.3.4', True)
+    assert throttle.wait('1.2.3.4') == 0
+    assert throttle.recent == {}
+
+
+def test_admit_refuses_throttled_addresses(clock):
+    pool = AuthPool(workers=1, throttle=LoginThrottle(failures=1, window=60))
+    pool.admit('1.2.3.4')
+    pool.record('1.2.3.4', False)
+    with pytest.raises(LoginRefused, match='Try again in 60 seconds'):
+        pool.admit('1.2.3.4')
+    pool.admit(None)
+    assert (pool.logins, pool.failures, pool.throttled) == (1, 1, 1)
+
+
+def test_hash_and_verify_in_a_worker(pool):
+    password_hash = pool.hash('swordfish')
+    assert pool.verify('swordfish', password_hash)
+    assert not pool.verify('catfish', password_hash)
+    assert asyncio.run(pool.verify_async('swordfish', password_hash))
+    assert settled(pool)
+    assert pool.percentiles(50)[0] > 0
+
+
+def test_a_full_queue_refuses(pool):
+    pool.pending = pool.queue
+    try:
+        with pytest.raises(LoginRefused, match='busy'):
+            pool.hash('swordfish')
+    finally:
+        pool.pending = 0
+    assert pool.busy == 1
+
+
+def test_a_dead_worker_is_replaced(pool):
+    broken = pool.executor
+    with pytest.raises(BrokenProcessPool):
+        pool._submit(os._exit, 1).result()
+    assert pool.verify('swordfish', pool.hash('swordfish'))
+    assert settled(pool)
+    assert pool.executor is not broken
@@ -0,0 +1,86 @@
+import sys
+
+import pytest
+
+from orm.combat import Combat
+from orm.models import Room, Creature
+from orm.stats import StatStore
+
+combat_module = sys.modules['orm.combat']   # orm.combat is also the game's Combat
+
+HALL = Room(id=1, name='Hall', noun='hall', description='')
+KITCHEN = Room(id=2, name='Kitchen', noun='kitchen', description='')
+
+
+def creature(id: int, hp: int = 5, room: Room = HALL) -> Creature:
+    return Creature(id=id, name=f'mob {id}', noun='mob', description='',
+                    Str=1, Dex=1, hp_max=hp, owner=room)
+
+
+@pytest.fixture
+def always_hit(monkeypatch):
+    monkeypatch.setattr(combat_module, 'HIT_MIN', 1.0)
+    monkeypatch.setattr(combat_module, 'HIT_MAX', 1.0)
+
+
+def arena(*creatures: Creature, **kwargs) -> Combat:
+    stats = StatStore()
+    stats.build(creatures)
+    return Combat(stats, seed=1, **kwargs)
+
+
+def test_defender_fights_back_unless_busy():
+    rat, bat, cat = creature(1), creature(2), creature(3)
+    combat = arena(rat, bat, cat)
+    combat.engage(rat, bat)
+    assert combat.opponent(bat) is rat
+    combat.engage(cat, bat)
+    assert combat.opponent(bat) is rat
+    assert combat.disengage(bat) is rat
+    assert combat.opponent(bat) is None
+
+
+def test_round_deals_damage_to_both_sides(always_hit):
+    rat, bat = creature(1), creature(2)
+    combat = arena(rat, bat)
+    combat.engage(rat, bat)
+    outcome = combat.round()
+    assert len(outcome) == 2
+    assert outcome.damage.tolist() == [1, 1]
+    assert sorted(outcome.changed(), key=lambda change: change[0].id) == [(rat, 5, 4), (bat, 5, 4)]
+    # applying the outcome is the caller's job
+    assert rat.hp == 5
+
+
+def test_blows_land_together(always_hit):
+    rat, bat = creature(1, hp=1), creature(2, hp=1)
+    combat = arena(rat, bat)
+    combat.engage(rat, bat)
+    assert combat.round().hp_after.tolist() == [0, 0]
+
+
+def test_misses_hurt_nobody(monkeypatch):
+    monkeypatch.setattr(combat_module, 'HIT_MIN', 0.0)
+    monkeypatch.setattr(combat_module, 'HIT_MAX', 0.0)
+    rat, bat = creature(1), creature(2)
+    combat = arena(rat, bat)
+    combat.engage(rat, bat)
+    outcome = combat.round()
+    assert len(outcome) == 2 and outcome.changed() == []
+
+
+def test_fights_that_are_over_are_dropped(always_hit):
+    rat, bat, cat, dog = creature(1), creature(2), creature(3), creature(4)
+    ghost = creature(5)
+    combat = arena(rat, bat, cat, dog, ghost, present=lambda mob: mob is not ghost)
+    combat.engage(rat, bat)
+    combat.engage(cat, dog)
+    combat.fights[ghost] = rat
+    dog.owner = KITCHEN     # fled
+    outcome = combat.round()
+    assert outcome.fights == [(rat, bat), (bat, rat)]
+    assert set(combat.fights) == {rat, bat}
+    bat.hp = 0              # died
+    assert len(combat.round()) == 0
+    assert combat.fights == {}
+    assert (combat.rounds, combat.resolved) == (2, 2)
@@ -0,0 +1,88 @@
+import queue
+
+import pytest
+
+from orm import fairqueue
+from orm.fairqueue import FairQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(fairqueue, 'time', clock)
+    return clock
+
+
+def drain(actions: FairQueue) -> list:
+    taken = []
+    while True:
+        try:
+            taken.append(actions.get_nowait())
+        except queue.Empty:
+            return taken
+
+
+def test_subjects_take_turns(clock):
+    actions = FairQueue()
+    for n in range(3):
+        actions.put(('flooder', n))
+    actions.put(('alice', 0))
+    actions.put(('bob', 0))
+    assert drain(actions) == [('flooder', 0), ('alice', 0), ('bob', 0),
+                              ('flooder', 1), ('flooder', 2)]
+    assert actions.empty() and actions.idle()
+
+
+def test_weight_is_actions_a_turn(clock):
+    actions = FairQueue()
+    actions.set_weight('mob', 2)
+    for n in range(3):
+        actions.put(('mob', n))
+    actions.put(('alice', 0))
+    assert drain(actions) == [('mob', 0), ('mob', 1), ('alice', 0), ('mob', 2)]
+
+
+def test_every_action_costs_a_token(clock):
+    actions = FairQueue(rate=2, burst=2, limited=lambda subject: subject != 'mob')
+    for n in range(4):
+        actions.put(('alice', n))
+        actions.put(('mob', n))
+    # alice spends her burst, then sits out while the mob carries on
+    assert drain(actions) == [('alice', 0), ('mob', 0), ('alice', 1), ('mob', 1),
+                              ('mob', 2), ('mob', 3)]
+    assert actions.qsize() == 2 and actions.idle() and not actions.empty()
+    clock.now += 0.5
+    assert drain(actions) == [('alice', 2)]
+    clock.now += 1
+    assert drain(actions) == [('alice', 3)]
+
+
+def test_admits_caps_what_a_limited_subject_has_waiting(clock):
+    actions = FairQueue(cap=2, limited=lambda subject: subject != 'mob')
+    for n in range(2):
+        assert actions.admits('alice')
+        actions.put(('alice', n))
+        actions.put(('mob', n))
+    assert not actions.admits('alice')
+    assert actions.admits('mob')
+    assert actions.refused == 1
+    actions.get_nowait()
+    assert actions.admits('alice')
+    assert actions.report().endswith('1 refused')
+
+
+def test_wait_times(clock):
+    actions = FairQueue()
+    actions.put(('alice', 0))
+    clock.now += 0.25
+    actions.put(('bob', 0))
+    drain(actions)
+    assert actions.wait_times() == {'alice': (1, 0.25, 0.25), 'bob': (1, 0.0, 0.0)}
@@ -0,0 +1,56 @@
+from orm.graph import RoomGraph
+
+
+def grid(size: int) -> RoomGraph:
+    """Rooms numbered row by row, with exits both ways between neighbours."""
+    exits = []
+    for y in range(size):
+        for x in range(size):
+            room = y * size + x
+            if x + 1 < size:
+                exits += [(room, room + 1, 'east'), (room + 1, room, 'west')]
+            if y + 1 < size:
+                exits += [(room, room + size, 'south'), (room + size, room, 'north')]
+    graph = RoomGraph()
+    graph.build(range(size * size), exits)
+    return graph
+
+
+def follow(graph: RoomGraph, room: int, route: list[str]) -> int:
+    """The room a route leads to."""
+    for direction in route:
+        exits = dict(graph.exits_from(graph.index[room]))
+        room = graph.ids[exits[direction]]
+    return room
+
+
+def test_shortest_route():
+    graph = grid(5)
+    route = graph.route(0, 24)
+    assert len(route) == 8
+    assert follow(graph, 0, route) == 24
+
+
+def test_same_room():
+    assert grid(3).route(4, 4) == []
+
+
+def test_max_steps():
+    graph = grid(5)
+    assert graph.route(0, 24, max_steps=7) is None
+    assert len(graph.route(0, 24, max_steps=8)) == 8
+
+
+def test_one_way_and_unreachable():
+    graph = RoomGraph()
+    graph.build([1, 2, 3, 4], [(1, 2, 'down'), (2, 3, 'east')])
+    assert graph.route(1, 3) == ['down', 'east']
+    assert graph.route(3, 1) is None
+    assert graph.route(1, 4) is None
+    assert graph.route(1, 99) is None
+
+
+def test_room_ids_need_not_be_dense():
+    graph = RoomGraph()
+    graph.build([10, 500, 7000], [(10, 500, 'north'), (500, 7000, 'up'), (7000, 10, 'down')])
+    assert graph.route(500, 10) == ['up', 'down']
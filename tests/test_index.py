@@ -0,0 +1,57 @@
+from orm.index import target_index
+from orm.models import Room, Item
+
+
+def item(name: str, noun: str, adjectives=()) -> Item:
+    return Item(name=name, noun=noun, description='', adjectives=adjectives, stats={})
+
+
+def room_with(*items: Item) -> Room:
+    room = Room(name='Hall', noun='hall', description='')
+    room.inventory.extend(items)
+    return room
+
+
+def test_find_by_name_noun_and_adjectives():
+    rusty = item('rusty sword', 'sword', ['rusty', 'old'])
+    shiny = item('shiny sword', 'sword', ['shiny'])
+    excalibur = item('Excalibur', 'sword', ['shiny', 'legendary'])
+    index = target_index(room_with(rusty, shiny, excalibur))
+    assert index.find('sword') == [rusty, shiny, excalibur]
+    assert index.find('shiny sword') == [shiny, excalibur]
+    assert index.find('old rusty sword') == [rusty]
+    assert index.find('excalibur') == [excalibur]
+    assert index.find('legendary sword') == [excalibur]
+    assert index.find('blue sword') == []
+    assert index.find('') == []
+
+
+def test_adjectives_given_as_a_string():
+    rusty = item('rusty sword', 'sword', 'Rusty old')
+    index = target_index(room_with(rusty))
+    assert index.find('old sword') == [rusty]
+    assert ('r', 'sword') not in index.keys
+
+
+def test_moves_keep_the_index_up_to_date():
+    first, second, third = (item(f'coin {n}', 'coin', ['gold']) for n in range(3))
+    room = room_with(first, second, third)
+    index = target_index(room)
+    room.inventory.remove(second)
+    assert index.find('gold coin') == [first, third]
+    room.inventory.append(second)
+    assert index.find('coin') == [first, third, second]
+    for coin in (first, second, third):
+        room.inventory.remove(coin)
+    assert index.find('coin') == []
+    assert index.keys == {}
+    assert target_index(room) is index
+
+
+def test_renaming_rebuilds_the_index():
+    sword = item('sword', 'sword')
+    room = room_with(sword)
+    index = target_index(room)
+    sword.name = 'Excalibur'
+    assert target_index(room) is not index
+    assert target_index(room).find('excalibur') == [sword]
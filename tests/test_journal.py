@@ -0,0 +1,99 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from orm.journal import Journal, encode, decode_all, ACTION, CHECKPOINT
+
+PLAYER = SimpleNamespace(id=7)
+ROOM = SimpleNamespace(id=2)
+
+
+def test_round_trip():
+    data = (encode(1, ACTION, PLAYER, 'chown', PLAYER, ROOM)
+            + encode(2, ACTION, None, 'set_hp', PLAYER, '12')
+            + encode(3, CHECKPOINT, None, '', None, None))
+    records = [record for record, _ in decode_all(data)]
+    assert [(r.seq, r.kind, r.subject_id, r.action, r.target_id, r.arg, r.arg_is_object)
+            for r in records] == [
+        (1, ACTION, 7, 'chown', 7, 2, True),
+        (2, ACTION, None, 'set_hp', 7, '12', False),
+        (3, CHECKPOINT, None, '', None, None, False),
+    ]
+
+
+def test_non_ascii_text():
+    text = 'Ünïcödé ✓ 🐉'
+    record, _ = next(decode_all(encode(1, ACTION, PLAYER, 'say', None, text)))
+    assert record.arg == text
+
+
+def test_long_text_is_cut_on_a_character_boundary():
+    text = 'a' + 'é' * 40_000     # 80_001 bytes; 0xFFFF falls inside an é
+    record, _ = next(decode_all(encode(1, ACTION, PLAYER, 'say', None, text)))
+    assert record.arg == text[:len(record.arg)]
+    assert len(record.arg.encode()) <= 0xFFFF
+
+
+def test_stops_at_a_torn_or_corrupt_record():
+    first = encode(1, ACTION, PLAYER, 'say', None, 'hello')
+    second = encode(2, ACTION, PLAYER, 'say', None, 'there')
+    torn = list(decode_all(first + second[:-3]))
+    assert [(r.seq, end) for r, end in torn] == [(1, len(first))]
+    corrupt = bytearray(first + second)
+    corrupt[-1] ^= 0xFF
+    assert [r.seq for r, _ in decode_all(bytes(corrupt))] == [1]
+
+
+def test_reset_keeps_records_after_the_checkpoint(tmp_path):
+    journal = Journal(str(tmp_path / 'world.journal'))
+    journal.open()
+    for n in range(3):
+        journal.append(PLAYER, 'say', None, f'line {n}')
+    journal.sync()
+    journal.append(PLAYER, 'say', None, 'unsynced')
+    journal.reset(through=1)
+    assert [(r.seq, r.arg) for r in journal.read()] == [
+        (2, 'line 1'), (3, 'line 2'), (4, 'unsynced')]
+    assert journal.checkpoint_seq() == 5
+    journal.reset()
+    assert list(journal.read()) == []
+    journal.close()
+
+
+def test_reset_that_fails_leaves_the_old_journal(tmp_path, monkeypatch):
+    path = str(tmp_path / 'world.journal')
+    journal = Journal(path)
+    journal.open()
+    for n in range(3):
+        journal.append(PLAYER, 'say', None, f'line {n}')
+    journal.sync()
+
+    def crash(source, destination):
+        raise OSError('power cut')
+
+    monkeypatch.setattr(os, 'replace', crash)
+    with pytest.raises(OSError):
+        journal.reset(through=1)
+    assert [r.seq for r in Journal(path).read()] == [1, 2, 3]
+    # and it carries on where it was
+    monkeypatch.undo()
+    journal.append(PLAYER, 'say', None, 'line 3')
+    journal.sync()
+    assert [r.seq for r in Journal(path).read()] == [1, 2, 3, 5]
+    journal.close()
+
+
+def test_append_leaves_syncing_to_the_caller(tmp_path):
+    path = tmp_path / 'world.journal'
+    journal = Journal(str(path), sync_records=2, sync_interval=60)
+    journal.open()
+    journal.append(PLAYER, 'say', None, 'one')
+    assert not journal.due()
+    journal.append(PLAYER, 'say', None, 'two')
+    assert journal.due()
+    assert path.read_bytes() == b''
+    journal.sync()
+    assert not journal.due()
+    assert [r.arg for r in journal.read()] == ['one', 'two']
+    journal.close()
@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from orm.metrics import Histogram, Metrics, BOUNDS
+
+
+def test_timings_land_in_their_buckets():
+    histogram = Histogram()
+    for seconds in (0.5e-6, 1e-6, 1.5e-6, 0.003, 120.0):
+        histogram.add(seconds)
+    assert histogram.counts[0] == 2                          # up to 1us
+    assert histogram.counts[BOUNDS.index(2e-6)] == 1
+    assert histogram.counts[BOUNDS.index(5e-3)] == 1
+    assert histogram.counts[-1] == 1                         # past the last bound
+    assert histogram.count == 5 and histogram.worst == 120.0
+    assert histogram.total == pytest.approx(120.0030030)
+
+
+def test_percentiles_are_bucket_bounds():
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0.0
+    for _ in range(90):
+        histogram.add(0.0015)       # up to 2ms
+    for _ in range(9):
+        histogram.add(0.03)         # up to 50ms
+    histogram.add(0.04)
+    assert histogram.percentile(50) == pytest.approx(0.002)
+    assert histogram.percentile(95) == pytest.approx(0.04)  # capped at the worst
+    assert histogram.percentile(100) == 0.04
+    lone = Histogram()
+    lone.add(100.0)
+    assert lone.percentile(50) == 100.0
+
+
+def test_metrics_group_timings_by_name():
+    metrics = Metrics(enabled=True)
+    metrics.observe('command', 'look', 0.001)
+    metrics.observe('command', 'look', 0.002)
+    metrics.observe('action', 'chown', 0.0001)
+    metrics.closed(SimpleNamespace(bytes_in=10, bytes_out=200))
+    snapshot = metrics.snapshot()
+    assert snapshot['timings']['command']['look']['count'] == 2
+    assert snapshot['timings']['command']['look']['mean'] == pytest.approx(0.0015)
+    assert snapshot['closed_connections'] == {'count': 1, 'bytes_in': 10, 'bytes_out': 200}
+    report = metrics.report()
+    assert [line for line in report if line.endswith(':')] == ['action:', 'command:']
+    assert report[-1].split()[:2] == ['look', '2']
+    metrics.reset()
+    assert metrics.snapshot()['timings'] == {}
+
+
+def test_disabled_metrics_record_nothing(tmp_path):
+    metrics = Metrics(enabled=False)
+    metrics.observe('command', 'look', 0.001)
+    assert metrics.groups == {}
+    metrics.dump(str(tmp_path / 'metrics.json'))
+    assert not (tmp_path / 'metrics.json').exists()
+
+
+def test_dump_writes_json(tmp_path):
+    metrics = Metrics(enabled=True)
+    metrics.observe('queue', 'walk', 0.25)
+    path = tmp_path / 'metrics.json'
+    metrics.dump(str(path))
+    dumped = json.loads(path.read_text())
+    assert dumped['timings']['queue']['walk']['max'] == 0.25
+    assert dumped['bounds'] == BOUNDS
+    assert not (tmp_path / 'metrics.json.tmp').exists()
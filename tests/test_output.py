@@ -0,0 +1,104 @@
+import socket
+import threading
+
+import pytest
+
+from engine.io import TelnetIO
+from engine.output import OutputQueue
+
+
+def test_take_joins_everything_queued():
+    queue = OutputQueue(100)
+    assert queue.push(b'one ') and queue.push(b'two')
+    assert len(queue) == 7
+    assert queue.take() == b'one two'
+    assert queue.take() == b''
+    assert len(queue) == 0
+
+
+def test_unshift_goes_ahead_of_newer_output():
+    queue = OutputQueue(100)
+    queue.push(b'new')
+    queue.unshift(b'old ')
+    assert queue.take() == b'old new'
+
+
+def test_drop_oldest():
+    queue = OutputQueue(10, OutputQueue.DROP_OLDEST)
+    for chunk in (b'aaaa', b'bbbb', b'cccc'):
+        assert queue.push(chunk)
+    assert queue.take() == b'bbbbcccc'
+    assert queue.dropped == 4 and queue.overflows == 1
+
+
+def test_drop_oldest_keeps_the_end_of_an_oversized_chunk():
+    queue = OutputQueue(4, OutputQueue.DROP_OLDEST)
+    queue.push(b'abcdefgh')
+    assert queue.take() == b'efgh'
+
+
+def test_truncate_marks_the_gap_once():
+    queue = OutputQueue(10, OutputQueue.TRUNCATE)
+    queue.push(b'12345678')
+    assert queue.push(b'lost') and queue.push(b'lost too')
+    assert queue.take() == b'12345678' + OutputQueue.TRUNCATED
+    assert queue.dropped == 12
+    queue.push(b'later')
+    queue.push(b'x' * 10)
+    assert queue.take() == b'later' + OutputQueue.TRUNCATED
+
+
+def test_disconnect_refuses():
+    queue = OutputQueue(4, OutputQueue.DISCONNECT)
+    assert not queue.push(b'too long')
+    assert queue.take() == b''
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        OutputQueue(10, 'shrug')
+
+
+def received(client: socket.socket) -> bytes:
+    client.setblocking(False)
+    data = b''
+    try:
+        while chunk := client.recv(65536):
+            data += chunk
+    except BlockingIOError:
+        pass
+    return data
+
+
+def test_flush_sends_output_queued_while_another_thread_was_sending():
+    server, client = socket.socketpair()
+    io = TelnetIO(None, server)
+    send = io._send
+
+    def send_then_race(wait):
+        done = send(wait)
+        io._send = send
+        # more output, whose flush gives up because we hold the send lock
+        io.print('late')
+        racer = threading.Thread(target=io.flush, kwargs={'wait': False})
+        racer.start()
+        racer.join()
+        return done
+
+    io._send = send_then_race
+    io.print('first')
+    io.flush(wait=False)
+    assert received(client) == b'first\r\nlate\r\n'
+    server.close()
+    client.close()
+
+
+def test_echo_that_overflows_drops_the_link():
+    server, client = socket.socketpair()
+    io = TelnetIO(None, server)
+    io.outbuf = OutputQueue(8, OutputQueue.DISCONNECT)
+    client.sendall(b'a long line\r\n')
+    assert io.input('>') == 'a long line'
+    assert io.link_dead
+    server.close()
+    client.close()
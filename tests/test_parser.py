@@ -0,0 +1,62 @@
+from engine.commands import target_types, exact_only, CommandList, AliasList
+from engine.parser import CommandTable
+
+
+class Commands():
+    @target_types(None)
+    def inventory(player, **kwargs): pass
+
+    @target_types(None)
+    def south(player, **kwargs): pass
+
+    @target_types(None)
+    def southeast(player, **kwargs): pass
+
+    @exact_only
+    @target_types(None)
+    def quit(player, **kwargs): pass
+
+    def _helper(player): pass
+
+
+class Aliases():
+    i = Commands.inventory
+    s = Commands.south
+    @target_types(None)
+    def inventory(player, **kwargs): pass   # shadowed by Commands.inventory
+
+
+table = CommandTable(Commands, Aliases)
+
+
+def test_exact_verbs_and_aliases():
+    assert table.lookup('south') == (Commands.south, [])
+    assert table.lookup('s') == (Commands.south, [])
+    assert table.lookup('inventory') == (Commands.inventory, [])  # the first list wins
+
+
+def test_unique_prefix_is_an_abbreviation():
+    assert table.lookup('inv') == (Commands.inventory, [])
+    assert table.lookup('southe') == (Commands.southeast, [])
+
+
+def test_ambiguous_prefix_lists_the_longest_verbs():
+    assert table.lookup('so') == (None, ['south', 'southeast'])
+
+
+def test_unknown_verb():
+    assert table.lookup('dance') == (None, [])
+    assert table.lookup('_helper') == (None, [])
+
+
+def test_exact_only_is_never_abbreviated():
+    assert table.lookup('quit') == (Commands.quit, [])
+    assert table.lookup('qui') == (None, [])
+    assert table.lookup('q') == (None, [])
+
+
+def test_game_commands():
+    commands = CommandTable(CommandList, AliasList)
+    assert commands.lookup('quit')[0] is not None
+    assert commands.lookup('qui') == (None, [])
+    assert commands.lookup('invent')[0] is commands.lookup('inventory')[0]
@@ -0,0 +1,79 @@
+import gc
+
+from orm.models import Room, Player
+from orm.presence import Presence, GLOBAL, _live
+
+
+def setup(zone_size: int = 10):
+    delivered = []
+    presence = Presence(lambda player, message: delivered.append((player.name, message)),
+                        zone_size)
+    rooms = {id: Room(id=id, name=f'Room {id}', noun='room', description='')
+             for id in (1, 2, 15)}
+    alice, bob = (Player(id=100 + n, name=name, noun=name.lower(), username=name.lower(),
+                         description='', owner=rooms[1], owner_id=1)
+                  for n, name in enumerate(('Alice', 'Bob')))
+    return presence, rooms, alice, bob, delivered
+
+
+def test_enter_and_leave():
+    presence, _, alice, bob, _ = setup()
+    presence.enter(alice)
+    assert presence.is_online(alice) and not presence.is_online(bob)
+    assert presence.listeners('room:1') == {alice}
+    assert presence.listeners('zone:0') == {alice}
+    assert presence.online == {alice}
+    presence.leave(alice)
+    assert not presence.is_online(alice)
+    assert presence.online == set()
+    assert presence.channels.keys() == {GLOBAL}
+
+
+def test_publish_reaches_only_listeners():
+    presence, rooms, alice, bob, delivered = setup()
+    presence.enter(alice)
+    presence.enter(bob)
+    bob.owner = rooms[15]
+    assert presence.to_room(rooms[1], 'hello', exclude=alice) == 0
+    assert presence.to_room(rooms[15], 'hi') == 1
+    assert presence.to_zone(rooms[2], 'zone 0') == 1
+    assert presence.publish(GLOBAL, 'all') == 2
+    assert delivered[:2] == [('Bob', 'hi'), ('Alice', 'zone 0')]
+    assert sorted(delivered[2:]) == [('Alice', 'all'), ('Bob', 'all')]
+
+
+def test_moves_follow_owner_changes():
+    presence, rooms, alice, bob, _ = setup()
+    moves = []
+    presence.watch(lambda player, old, new: moves.append((player.name, old, new)))
+    presence.enter(alice)
+    alice.owner = rooms[2]
+    assert presence.listeners('room:1') == set()
+    assert presence.listeners('room:2') == {alice}
+    assert presence.listeners('zone:0') == {alice}
+    alice.owner = rooms[15]
+    assert presence.listeners('zone:1') == {alice}
+    assert 'zone:0' not in presence.channels
+    bob.owner = rooms[2]    # offline: not followed
+    assert presence.listeners('room:2') == set()
+    assert moves == [('Alice', None, 1), ('Alice', 1, 2), ('Alice', 2, 15)]
+
+
+def test_custom_channels():
+    presence, _, alice, bob, delivered = setup()
+    presence.enter(alice)
+    presence.subscribe(alice, 'guild:thieves')
+    assert presence.publish('guild:thieves', 'psst') == 1
+    presence.unsubscribe(alice, 'guild:thieves')
+    assert presence.publish('guild:thieves', 'psst') == 0
+    assert delivered == [('Alice', 'psst')]
+
+
+def test_a_discarded_presence_stops_following_moves():
+    presence, rooms, alice, _, _ = setup()
+    presence.enter(alice)
+    live = len(_live)
+    del presence
+    gc.collect()
+    assert len(_live) == live - 1
+    alice.owner = rooms[2]   # nothing left to tell
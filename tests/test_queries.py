@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import event
+
+import orm.db as db
+from tools import count_queries
+
+MODES = ('world', 'lazy')   # in this order; see count_queries.main
+
+
+@pytest.fixture(scope='module')
+def played():
+    """count_queries' script, played in both modes: mode -> result rows."""
+    player_ids = count_queries.seed(crowd=20)
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    write_behind = db.WRITE_BEHIND
+    event.listen(db.sql_engine, 'before_cursor_execute', record)
+    try:
+        yield {mode: count_queries.run(mode, player_ids, statements, verbose=False)
+               for mode in MODES}
+    finally:
+        event.remove(db.sql_engine, 'before_cursor_execute', record)
+        db.WRITE_BEHIND = write_behind
+        db.SQL.autoflush = not write_behind
+        db.SQL.close()
+        db.world.loaded = False
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_statements_per_command(played, mode):
+    counted = [(command, len(issued)) for _, command, issued, _ in played[mode]]
+    expected = list(zip(['login'] + count_queries.SCRIPT, count_queries.EXPECTED[mode]))
+    assert counted == expected
+
+
+@pytest.mark.parametrize('mode', MODES)
+def test_writes_per_command(played, mode):
+    counted = [writes for _, _, _, writes in played[mode][1:]]
+    assert counted == count_queries.EXPECTED_WRITES
@@ -0,0 +1,55 @@
+from orm.models import Room, Exit, Item, Creature
+
+
+def hall_with_rat() -> tuple[Room, Room, Creature]:
+    hall = Room(name='Hall', noun='hall', description='A long hall.')
+    kitchen = Room(name='Kitchen', noun='kitchen', description='A kitchen.')
+    Exit('north', hall, kitchen)
+    rat = Creature(name='rat', noun='rat', description='A rat.')
+    hall.inventory.append(rat)
+    return hall, kitchen, rat
+
+
+def test_repeated_looks_are_cached():
+    hall, _, _ = hall_with_rat()
+    hits = Room.view_hits
+    first = hall.view(None)
+    assert hall.view(None) is first
+    assert Room.view_hits == hits + 1
+
+
+def test_an_occupant_does_not_see_itself():
+    hall, _, rat = hall_with_rat()
+    assert 'rat' in hall.view(None)
+    assert 'rat' not in hall.view(rat)
+    assert 'rat' in hall.view(None)
+
+
+def test_contents_changes_invalidate():
+    hall, kitchen, rat = hall_with_rat()
+    hall.view(None)
+    sword = Item(name='sword', noun='sword', description='A sword.', stats={})
+    hall.inventory.append(sword)
+    assert 'sword' in hall.view(None)
+    rat.owner = kitchen
+    assert 'rat' not in hall.view(None)
+
+
+def test_renames_invalidate():
+    hall, _, rat = hall_with_rat()
+    hall.view(None)
+    rat.name = 'giant rat'
+    assert 'giant rat' in hall.view(None)
+    hall.description = 'A short hall.'
+    assert 'A short hall.' in hall.view(None)
+
+
+def test_exit_changes_invalidate():
+    hall, kitchen, _ = hall_with_rat()
+    assert 'Exits: north' in hall.view(None)
+    down = Exit('down', hall, kitchen)
+    assert 'Exits: north, down' in hall.view(None)
+    down.direction = 'up'
+    assert 'Exits: north, up' in hall.view(None)
+    hall.exits.remove(down)
+    assert hall.view(None).endswith('Exits: north')
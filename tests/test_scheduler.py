@@ -0,0 +1,48 @@
+from engine.scheduler import TimerWheel, ROOT_SIZE, LEVEL_SIZE
+
+
+def run(wheel: TimerWheel, ticks: int) -> list[tuple[int, object]]:
+    """(tick, payload) for everything that fires in the next `ticks` ticks."""
+    fired = []
+    for _ in range(ticks):
+        fired += [(wheel.now, payload) for payload in wheel.advance()]
+    return fired
+
+
+def test_timers_fire_on_their_tick_in_order():
+    wheel = TimerWheel()
+    # within the first level, on its edges, and cascaded from the next two
+    delays = [1, 5, ROOT_SIZE - 1, ROOT_SIZE, ROOT_SIZE + 1, 300,
+              ROOT_SIZE * LEVEL_SIZE - 1, ROOT_SIZE * LEVEL_SIZE + 7]
+    for delay in reversed(delays):
+        wheel.schedule(delay, delay)
+    fired = run(wheel, max(delays))
+    assert fired == [(delay, delay) for delay in delays]
+    assert len(wheel) == 0
+
+
+def test_schedule_from_a_later_tick():
+    wheel = TimerWheel()
+    run(wheel, 1000)
+    wheel.schedule(600, 'late')
+    wheel.schedule(3, 'soon')
+    assert run(wheel, 600) == [(1003, 'soon'), (1600, 'late')]
+
+
+def test_at_least_one_tick():
+    wheel = TimerWheel()
+    wheel.schedule(0, 'now')
+    assert run(wheel, 1) == [(1, 'now')]
+
+
+def test_cancel_and_resume():
+    wheel = TimerWheel()
+    kept = wheel.schedule(10, 'kept')
+    cancelled = wheel.schedule(10, 'cancelled')
+    assert wheel.cancel(cancelled)
+    assert not cancelled.active
+    assert not wheel.cancel(cancelled)
+    assert run(wheel, 10) == [(10, 'kept')]
+    assert not kept.active
+    wheel.resume(cancelled, 5)
+    assert run(wheel, 5) == [(15, 'cancelled')]
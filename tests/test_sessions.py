@@ -0,0 +1,69 @@
+import sys
+
+import pytest
+
+from engine.sessions import SessionRegistry
+
+sessions_module = sys.modules['engine.sessions']  # engine.sessions is also the game's registry
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions_module, 'time', clock)
+    return clock
+
+
+def test_a_token_resumes_once(clock):
+    registry = SessionRegistry(grace=60, token_bytes=8)
+    token = registry.login('alice')
+    assert len(token) == 16
+    registry.drop('alice')
+    assert registry.is_link_dead('alice')
+    assert registry.resume(f' {token.upper()}\n') == 'alice'
+    assert not registry.is_link_dead('alice')
+    # resuming logs in again, and the new token replaces the old one
+    fresh = registry.login('alice')
+    assert fresh != token
+    assert registry.resume(token) is None
+    assert registry.resume(fresh) == 'alice'
+    assert (registry.resumed, registry.refused) == (2, 1)
+
+
+def test_a_token_works_before_the_drop_is_noticed(clock):
+    registry = SessionRegistry(grace=60)
+    token = registry.login('alice')
+    assert registry.resume(token) == 'alice'
+
+
+def test_tokens_expire_after_the_grace_period(clock):
+    registry = SessionRegistry(grace=60)
+    token = registry.login('alice')
+    registry.login('bob')
+    registry.drop('alice')
+    clock.now += 59
+    assert registry.link_dead() == ['alice']
+    clock.now += 1
+    assert registry.link_dead() == []
+    assert registry.resume(token) is None
+    assert registry.report() == "1 connected, 0 link-dead, 0 resumed, 1 expired, 1 bad tokens"
+
+
+def test_logout_and_no_grace(clock):
+    registry = SessionRegistry(grace=60)
+    token = registry.login('alice')
+    registry.logout('alice')
+    assert registry.resume(token) is None
+    registry = SessionRegistry(grace=0)
+    token = registry.login('alice')
+    registry.drop('alice')
+    assert registry.resume(token) is None
+    assert registry.tokens == {} and registry.players == {}
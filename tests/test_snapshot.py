@@ -0,0 +1,76 @@
+import os
+import threading
+
+from orm import db
+from orm.journal import Journal
+from orm.models import Room, Player
+from orm.snapshot import read_header
+from orm.world import World
+
+
+def live_world(database) -> World:
+    world = World(database(autoflush=False), threading.RLock())
+    world.load()
+    return world
+
+
+def fields(world: World) -> tuple[dict, dict]:
+    objects = {obj.id: (type(obj), obj.name, obj.owner_id, getattr(obj, 'password_hash', None))
+               for obj in world.objects.values()}
+    exits = {exit.id: (exit.direction, exit.from_room_id, exit.to_room_id)
+             for exit in world.exits.values()}
+    return objects, exits
+
+
+def test_snapshot_round_trip(database, tmp_path):
+    path = str(tmp_path / 'world.snapshot')
+    world = live_world(database)
+    world.save_snapshot(path, 7)
+    assert read_header(path) == (7, len(world.objects), len(world.exits))
+
+    restored = World(database(autoflush=False), threading.RLock())
+    restored.load_snapshot(path)
+    assert fields(restored) == fields(world)
+    hall = next(room for room in restored.rooms.values() if room.name == 'Hall')
+    assert {obj.name for obj in hall.inventory} == {'sword', 'rat', 'Tester'}
+    assert [exit.direction for exit in hall.exits] == ['north']
+
+
+def restart(database, tmp_path, monkeypatch) -> World:
+    ''' A fresh world and journal, loaded the way main.py does it. '''
+    world = World(database(autoflush=False), threading.RLock())
+    world.snapshot_path = str(tmp_path / 'world.snapshot')
+    journal = Journal(str(tmp_path / 'world.journal'))
+    journal.open()
+    world.journal = journal
+    monkeypatch.setattr(db, 'world', world)
+    monkeypatch.setattr(db, 'journal', journal)
+    db.load_world()
+    return world
+
+
+def test_player_created_after_the_snapshot_survives_a_crash(database, tmp_path, monkeypatch):
+    world = restart(database, tmp_path, monkeypatch)
+    world.stop()
+    assert os.path.exists(world.snapshot_path)
+
+    world = restart(database, tmp_path, monkeypatch)
+    with database() as session:
+        hall = session.query(Room).filter_by(name='Hall').one()
+        session.add(Player(username='newbie', name='Newbie', noun='newbie',
+                           description='New.', owner_id=hall.id, password_hash='x'))
+        session.commit()
+    with world.lock:
+        newbie = world.session.query(Player).filter_by(username='newbie').one()
+        world.add(newbie)
+        kitchen = next(room for room in world.rooms.values() if room.name == 'Kitchen')
+        newbie.owner = kitchen
+        world.journal.append(newbie, 'chown', newbie, kitchen)
+    world.journal.sync()
+    assert not os.path.exists(world.snapshot_path)
+    world.journal.close()  # crash: no checkpoint
+
+    world = restart(database, tmp_path, monkeypatch)
+    [record] = world.journal.read()
+    assert record.subject_id == newbie.id
+    assert world.objects[newbie.id].name == 'Newbie'
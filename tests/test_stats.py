@@ -0,0 +1,95 @@
+import numpy as np
+
+from orm.models import Room, Creature
+from orm.stats import StatStore, NOWHERE
+
+
+def world():
+    hall = Room(id=1, name='Hall', noun='hall', description='')
+    kitchen = Room(id=2, name='Kitchen', noun='kitchen', description='')
+    rat = Creature(id=10, name='rat', noun='rat', description='', Str=2, hp_max=10, owner=hall)
+    bat = Creature(id=11, name='bat', noun='bat', description='', Dex=3, hp_max=4, owner=hall)
+    stats = StatStore()
+    stats.build([rat, bat])
+    return stats, hall, kitchen, rat, bat
+
+
+def test_columns_follow_the_creatures():
+    stats, _, kitchen, rat, bat = world()
+    assert stats['Str'].tolist() == [2, 1]
+    assert stats['Dex'].tolist() == [1, 3]
+    assert stats['hp'].tolist() == [10, 4]
+    assert stats['room'].tolist() == [1, 1]
+    rat.hp = 7
+    bat.owner = kitchen
+    assert stats['hp'].tolist() == [7, 4]
+    assert stats['room'].tolist() == [1, 2]
+    bat.owner = None
+    assert stats['room'][1] == NOWHERE
+
+
+def test_add_and_remove_rows():
+    stats, hall, _, rat, bat = world()
+    cat = Creature(id=12, name='cat', noun='cat', description='', hp_max=6, owner=hall)
+    assert stats.row(cat) == 2 and stats.add(cat) == 2
+    stats.afflict(cat, 'poisoned', 3)
+    stats.remove(rat)
+    assert stats.creatures == [cat, bat]
+    assert stats.rows == {cat: 0, bat: 1}
+    assert stats['hp'].tolist() == [6, 4]
+    assert stats.affected(cat, 'poisoned') == 3
+    rat.hp = 1      # no longer in the store
+    assert stats['hp'].tolist() == [6, 4]
+
+
+def test_step_regenerates_up_to_hp_max():
+    stats, _, _, rat, bat = world()
+    rat.hp, bat.hp = 5, 3
+    assert stats.step(2) == [(rat, 7), (bat, 4)]
+    assert stats.step(2) == [(rat, 9)]
+    assert stats.step(2) == [(rat, 10)]
+    assert stats.step(2) == []
+    # only the store changed: writing back is the caller's job
+    assert rat.hp == 5
+
+
+def test_the_dead_stay_dead():
+    stats, _, _, rat, bat = world()
+    rat.hp = 0
+    stats.afflict(rat, 'regenerating', 5)
+    assert stats.step(1, np.array([0, 1])) == []
+    assert stats['hp'][0] == 0
+
+
+def test_effects_run_out_and_never_kill():
+    stats, _, _, rat, bat = world()
+    stats.afflict(rat, 'poisoned', 2)
+    stats.afflict(bat, 'poisoned', 10)
+    bat.hp = 3
+    assert stats.step(0) == [(rat, 8), (bat, 1)]
+    assert stats.step(0) == [(rat, 6)]
+    assert stats.step(0) == []
+    assert stats.affected(rat, 'poisoned') == 0
+    assert stats.affected(bat, 'poisoned') == 7
+    stats.afflict(bat, 'poisoned', 0)
+    assert stats.affected(bat, 'poisoned') == 0
+
+
+def test_fast_forward_applies_the_totals():
+    stats, _, _, rat, _ = world()
+    rat.hp = 1
+    stats.afflict(rat, 'poisoned', 2)
+    # 5 steps of +3 regeneration, 2 of them poisoned (-2): +11, capped at 10
+    assert stats.fast_forward(np.array([0]), 5, 3) == [(rat, 10)]
+    assert stats.affected(rat, 'poisoned') == 0
+
+
+def test_the_store_grows():
+    stats = StatStore(capacity=2)
+    mobs = [Creature(id=n, name=f'mob {n}', noun='mob', description='', hp_max=n, owner_id=None)
+            for n in range(1, 6)]
+    for mob in mobs:
+        stats.add(mob)
+    assert stats.capacity == 8
+    assert stats['hp_max'].tolist() == [1, 2, 3, 4, 5]
+    assert stats['room'].tolist() == [NOWHERE] * 5
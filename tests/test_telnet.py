@@ -0,0 +1,52 @@
+from engine.telnet import TelnetLineReader, IAC, WILL, DO, SB, SE
+
+
+def test_splits_lines_and_echoes_them():
+    reader = TelnetLineReader()
+    echo = reader.feed(b'Look\r\nget Sword\r\n')
+    assert list(reader.lines) == ['look', 'get sword']
+    assert echo == b'Look\r\nget Sword\r\n'
+
+
+def test_line_endings():
+    reader = TelnetLineReader()
+    reader.feed(b'one\r\x00two\nthree\r')
+    reader.feed(b'\nfour\r\n')
+    assert list(reader.lines) == ['one', 'two', 'three', 'four']
+
+
+def test_partial_line_waits_for_the_rest():
+    reader = TelnetLineReader()
+    reader.feed(b'nor')
+    assert not reader.lines
+    reader.feed(b'th\r\n')
+    assert list(reader.lines) == ['north']
+
+
+def test_backspace():
+    reader = TelnetLineReader()
+    echo = reader.feed(b'lok\x08ok\x7f\x7f\x7fook\r\n')
+    assert list(reader.lines) == ['look']
+    assert echo.count(b'\x08 \x08') == 4
+
+
+def test_strips_negotiation_and_subnegotiation():
+    reader = TelnetLineReader()
+    data = (bytes([IAC, WILL, 1]) + b'lo' + bytes([IAC, DO, 3])
+            + bytes([IAC, SB, 31, 0, 80, IAC, IAC, 24, IAC, SE]) + b'ok\r\n')
+    echo = reader.feed(data)
+    assert list(reader.lines) == ['look']
+    assert echo == b'look\r\n'
+    assert list(reader.commands) == [(WILL, 1), (DO, 3), (SB, bytes([31, 0, 80, IAC, 24]))]
+
+
+def test_drops_non_ascii():
+    reader = TelnetLineReader()
+    reader.feed('say héllo\r\n'.encode())
+    assert list(reader.lines) == ['say hllo']
+
+
+def test_caps_line_length():
+    reader = TelnetLineReader()
+    reader.feed(b'x' * (TelnetLineReader.MAX_LINE + 100) + b'\r\n')
+    assert len(reader.lines[0]) == TelnetLineReader.MAX_LINE
@@ -0,0 +1,73 @@
+import threading
+
+from sqlalchemy import select
+
+from orm.journal import Journal
+from orm.models import Room, Item, Creature
+from orm.world import World
+
+
+def live_world(database) -> World:
+    world = World(database(autoflush=False), threading.RLock())
+    world.load()
+    return world
+
+
+def named(world: World, cls, name: str):
+    return next(obj for obj in world.objects.values()
+                if isinstance(obj, cls) and obj.name == name)
+
+
+def stored(database, cls, name: str):
+    with database() as session:
+        return session.scalars(select(cls).where(cls.name == name)).one()
+
+
+def test_checkpoint_writes_changes_and_marks_them_clean(database):
+    world = live_world(database)
+    sword, rat = named(world, Item, 'sword'), named(world, Creature, 'rat')
+    kitchen = named(world, Room, 'Kitchen')
+    with world.lock:
+        sword.owner = kitchen
+        rat.hp = 1
+    assert world.dirty
+    assert world.checkpoint() == 2
+    assert world.dirty == 0
+    assert sword.owner_id == kitchen.id
+    assert stored(database, Item, 'sword').owner_id == kitchen.id
+    assert stored(database, Creature, 'rat').hp == 1
+    assert world.checkpoint() == 0
+
+
+def test_failed_write_is_kept_and_retried_with_later_changes(database, tmp_path):
+    world = live_world(database)
+    world.journal = journal = Journal(str(tmp_path / 'world.journal'))
+    journal.open()
+    sword, rat = named(world, Item, 'sword'), named(world, Creature, 'rat')
+    kitchen = named(world, Room, 'Kitchen')
+    write = world._write
+
+    def broken(rows):
+        raise OSError('disk on fire')
+
+    world._write = broken
+    with world.lock:
+        sword.owner = kitchen
+        journal.append(None, 'chown', sword, kitchen)
+    journal.sync()
+    assert world.checkpoint() == 0
+    assert world.unwritten and world.dirty == 0
+    assert stored(database, Item, 'sword').owner_id != kitchen.id
+    # the journal still covers the change that didn't get written
+    assert [record.action for record in journal.read()] == ['chown']
+
+    world._write = write
+    with world.lock:
+        rat.hp = 2
+        journal.append(None, 'set_hp', rat, '2')
+    assert world.checkpoint() == 2
+    assert not world.unwritten
+    assert stored(database, Item, 'sword').owner_id == kitchen.id
+    assert stored(database, Creature, 'rat').hp == 2
+    assert list(journal.read()) == []
+    journal.close()
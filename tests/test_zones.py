@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from engine.scheduler import Scheduler
+from orm.models import Room, Creature, Player
+from orm.presence import Presence
+from orm.stats import StatStore
+from orm.zones import Zones
+
+IDLE = 30
+
+
+def setup():
+    rooms = {id: Room(id=id, name=f'Room {id}', noun='room', description='')
+             for id in (1, 15)}
+    rat = Creature(id=100, name='rat', noun='rat', description='', hp_max=10, owner=rooms[1])
+    rat.hp = 1
+    alice = Player(id=200, name='Alice', noun='alice', username='alice', description='',
+                   owner=rooms[15], owner_id=15)
+    stats = StatStore()
+    stats.build([rat])
+    world = SimpleNamespace(stats=stats, rooms=rooms)
+    presence = Presence(lambda player, message: None, zone_size=10)
+    written = []
+    zones = Zones(presence, world, 10, IDLE, regen=2,
+                  write=lambda creature, hp: written.append((creature, hp)))
+    zones.scheduler = Scheduler(tick_rate=10)
+    return zones, presence, rooms, rat, alice, written
+
+
+def test_zones_wake_when_a_player_arrives():
+    zones, presence, rooms, _, alice, _ = setup()
+    assert zones.active == set() and zones.dormant() == 2
+    presence.enter(alice)
+    assert zones.active == {1}
+    alice.owner = rooms[1]
+    assert zones.active == {0, 1}
+    assert zones.wakes == 2
+    assert zones.report().startswith('2 active, 0 dormant')
+
+
+def test_empty_zones_sleep_after_idle(monkeypatch):
+    zones, presence, rooms, _, alice, _ = setup()
+    monkeypatch.setattr('time.monotonic', lambda: 1000.0)
+    presence.enter(alice)
+    presence.leave(alice)
+    assert zones.sweep(1000.0 + IDLE - 1) == 0
+    assert zones.sweep(1000.0 + IDLE) == 1
+    assert zones.active == set() and zones.sleeps == 1
+    # back before the zone slept: it never does
+    presence.enter(alice)
+    presence.leave(alice)
+    presence.enter(alice)
+    assert zones.sweep(1000.0 + IDLE * 2) == 0
+    assert zones.active == {1}
+
+
+def test_a_sleeping_zone_is_caught_up_on_waking():
+    zones, presence, rooms, rat, alice, written = setup()
+    stats = zones.world.stats
+    presence.enter(alice)
+    assert zones.active_rows().tolist() == []
+    for _ in range(3):
+        stats.step(zones.regen, zones.active_rows())
+    assert stats['hp'].tolist() == [1]
+    alice.owner = rooms[1]
+    assert written == [(rat, 7)]
+    assert zones.active_rows().tolist() == [0]
+
+
+def test_zone_timers_are_caught_up_on_waking():
+    zones, presence, rooms, rat, alice, _ = setup()
+    wheel = zones.scheduler.wheel
+    presence.enter(alice)
+    awake = zones.after(rooms[15], 1.0, alice, 'echo')       # 10 ticks
+    asleep = zones.after(rooms[1], 0.5, rat, 'echo')         # 5 ticks
+    assert awake.active and not asleep.active
+    for _ in range(4):
+        wheel.advance()
+    presence.leave(alice)
+    zones.sweep(float('inf'))
+    assert not awake.active and zones.suspended[1] == {awake: 6}
+    for _ in range(100):
+        wheel.advance()
+    later = zones.after(rooms[15], 20.0, alice, 'echo')      # 200 ticks
+    for _ in range(50):
+        wheel.advance()
+    presence.enter(alice)
+    # the 6 ticks it had left ran out while the zone slept: due on the next tick
+    assert awake.active and awake.expires == wheel.now + 1
+    # only counting since it was scheduled, 50 ticks ago
+    assert later.active and later.expires == wheel.now + 150
+    alice.owner = rooms[1]
+    assert asleep.active and asleep.expires == wheel.now + 1
+    assert zones.cancel(asleep) and not asleep.active
@@ -0,0 +1,7 @@
+"""
+DungeonCrawler1995 developer tools
+---------------------------------
+Benchmarks and diagnostics; run from the repository root, e.g.:
+
+    python -m tools.bench_telnet_input
+"""
@@ -0,0 +1,96 @@
+"""
+Combat round cost, fight by fight against batched.
+
+Sets up N fights between pairs of creatures spread over rooms (ORM objects,
+never flushed), then times a round resolved three ways:
+
+    each     a Python loop rolling each attack in turn, as per-attacker
+             code would
+    round    Combat.round(): look the fighters up in the StatStore, check
+             which fights are on and resolve
+    resolve  Combat.resolve() alone, on the StatStore's columns
+
+Nothing is applied, so every round starts from the same hit points.
+
+    python -m tools.bench_combat [fights ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_combat.db')}"
+
+import numpy as np
+
+import engine  # noqa: F401  (engine must be imported before orm)
+from orm.combat import Combat, HIT_CHANCE, HIT_PER_DEX, HIT_MIN, HIT_MAX
+from orm.models import Room, Creature
+from orm.stats import StatStore
+from ini import TICK_RATE
+
+ROUNDS = 20
+
+
+def setup(fights: int) -> Combat:
+    rng = random.Random(1995)
+    rooms = [Room(id=n, name=f'Arena {n}', noun='arena', description='Sand.')
+             for n in range(max(1, fights // 10))]
+    combat = Combat(StatStore(), seed=1995)
+    for n in range(fights):
+        room = rooms[n % len(rooms)]
+        a, b = (Creature(name=f'fighter{n}{side}', noun='fighter', description='Grim.',
+                         Str=rng.randint(1, 10), Dex=rng.randint(1, 10),
+                         hp_max=rng.randint(20, 60))
+                for side in 'ab')
+        a.owner = b.owner = room
+        combat.engage(a, b)
+    return combat
+
+
+def each(fights: dict) -> tuple[list, dict]:
+    ''' The same rules, one attack at a time. '''
+    damage, hp = [], {}
+    for attacker, defender in fights.items():
+        if not (attacker.hp > 0 and defender.hp > 0 and attacker.owner is defender.owner):
+            continue
+        chance = min(HIT_MAX, max(HIT_MIN, HIT_CHANCE + HIT_PER_DEX * (attacker.Dex - defender.Dex)))
+        dealt = int(random.random() * max(attacker.Str, 1)) + 1 if random.random() < chance else 0
+        damage.append(dealt)
+        hp[defender] = hp.get(defender, defender.hp) - dealt
+    return damage, hp
+
+
+def best(func, *args) -> float:
+    times = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10_000, 50_000]
+    budget = 1 / TICK_RATE
+    print(f'best of {ROUNDS} rounds; a tick is {budget * 1000:.0f}ms')
+    print(f'{"fights":>8}{"each":>11}{"round":>11}{"resolve":>11}   (each / resolve)')
+    for size in sizes:
+        # engage() makes defenders fight back, so each pair is two fights
+        combat = setup(size // 2)
+        fights = dict(combat.fights)
+        each_seconds = best(each, fights)
+        round_seconds = best(lambda: (combat.fights.update(fights), combat.round()))
+        stats = combat.stats
+        attackers = np.array([stats.rows[a] for a in fights], dtype=np.intp)
+        defenders = np.array([stats.rows[d] for d in fights.values()], dtype=np.intp)
+        resolve_seconds = best(combat.resolve, stats['Str'], stats['Dex'], stats['hp'],
+                               attackers, defenders)
+        print(f'{len(fights):>8}{each_seconds * 1000:>9.2f}ms{round_seconds * 1000:>9.2f}ms'
+              f'{resolve_seconds * 1000:>9.2f}ms   ({each_seconds / resolve_seconds:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+How long quiet players wait behind a flood, FIFO against the FairQueue.
+
+One subject floods the queue with actions, then each of the other players
+queues one. The queue is drained and, for each quiet player, the number of
+actions served before theirs is counted: at ACTION_COST seconds an action,
+that is how long they waited. Also times put() and get() per action.
+
+    python -m tools.bench_fairqueue [flood] [players]
+"""
+import os
+import queue
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_fairqueue.db')}"
+
+import engine  # noqa: F401  (engine must be imported before orm)
+from orm.fairqueue import FairQueue
+
+ACTION_COST = 0.0002    # seconds to apply an action, roughly a chown
+
+
+def drain(q, flood: int, players: int) -> list[int]:
+    ''' For each quiet player, how many actions were served before theirs. '''
+    for n in range(flood):
+        q.put(('flooder', 'echo', None, n, {}))
+    for n in range(players):
+        q.put((f'player{n}', 'echo', None, n, {}))
+    served = 0
+    ahead = []
+    while True:
+        try:
+            subject, *_ = q.get_nowait()
+        except queue.Empty:
+            break
+        if subject != 'flooder':
+            ahead.append(served)
+        served += 1
+    return ahead
+
+
+def main():
+    flood = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    players = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    print(f'{flood} actions from one subject, then 1 each from {players} players')
+    for name, q in (('fifo', queue.Queue()), ('fair', FairQueue())):
+        ahead = drain(q, flood, players)
+        mean = sum(ahead) / len(ahead)
+        print(f'{name}  served ahead of a quiet player: mean {mean:7.1f}, worst {max(ahead):5d} '
+              f'({max(ahead) * ACTION_COST * 1000:.1f}ms at {ACTION_COST * 1e6:.0f}us an action)')
+
+    count = 200_000
+    q = FairQueue()
+    items = [(f'player{n % 100}', 'echo', None, n, {}) for n in range(count)]
+    started = time.perf_counter()
+    for item in items:
+        q.put(item)
+    put_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for _ in range(count):
+        q.get_nowait()
+    get_seconds = time.perf_counter() - started
+    print(f'put {put_seconds / count * 1e6:.2f}us, get {get_seconds / count * 1e6:.2f}us '
+          f'per action (100 subjects, no rate limit)')
+
+    # rate limited: how long the flood takes to drain at ACTION_RATE
+    rate, burst = 200, 20
+    q = FairQueue(rate, burst)
+    for n in range(400):
+        q.put(('flooder', 'echo', None, n, {}))
+    started = time.perf_counter()
+    for _ in range(400):
+        q.get()
+    elapsed = time.perf_counter() - started
+    print(f'400 actions at {rate}/s with bursts of {burst}: drained in {elapsed:.2f}s '
+          f'(expect {(400 - burst) / rate:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+A login storm, with password checks inline and in the auth pool.
+
+N clients log in at once, each on its own thread as with GameServer, while
+a stand-in for everyone already playing runs a Python loop of 1ms steps.
+For each way of checking passwords it reports login latency percentiles,
+logins refused because the queue was full, and how far the players' loop
+fell behind (its worst step, and the steps it managed over the storm).
+
+    python -m tools.bench_logins [clients] [workers] [queue]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_logins.db')}"
+
+from passlib.hash import pbkdf2_sha256
+
+from engine.auth import AuthPool, LoginThrottle
+from engine.exceptions import LoginRefused
+from ini import AUTH_WORKERS, AUTH_QUEUE
+
+PASSWORD = 'correct horse battery staple'
+STEP = 0.001        # seconds of the players' loop between checks
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def storm(clients: int, check) -> dict:
+    ''' Log `clients` in at once through check(); measure everyone else meanwhile. '''
+    password_hash = pbkdf2_sha256.hash(PASSWORD)
+    latencies, refused = [], 0
+    lock = threading.Lock()
+    start = threading.Event()
+
+    def client():
+        nonlocal refused
+        start.wait()
+        began = time.perf_counter()
+        try:
+            assert check(PASSWORD, password_hash)
+        except LoginRefused:
+            with lock:
+                refused += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    done = threading.Event()
+    steps, worst = 0, 0.0
+
+    def players():
+        nonlocal steps, worst
+        while not done.is_set():
+            began = time.perf_counter()
+            busy(STEP)
+            worst = max(worst, time.perf_counter() - began)
+            steps += 1
+
+    loop = threading.Thread(target=players)
+    began = time.perf_counter()
+    loop.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    done.set()
+    loop.join()
+    latencies.sort()
+    pick = lambda point: latencies[min(len(latencies) - 1, int(len(latencies) * point))]
+    return {'elapsed': elapsed, 'refused': refused,
+            'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99),
+            'steps': steps, 'expected_steps': elapsed / STEP, 'worst_step': worst}
+
+
+def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else AUTH_WORKERS
+    queue = int(sys.argv[3]) if len(sys.argv) > 3 else AUTH_QUEUE
+    pool = AuthPool(workers, queue, LoginThrottle(failures=0))
+    pool.start()
+    print(f'{clients} simultaneous logins, {os.cpu_count()} cpus; '
+          f'pool of {workers} workers, queue {queue}')
+    print(f'{"":8}{"total":>8}{"refused":>9}{"p50":>9}{"p95":>9}{"p99":>9}'
+          f'{"players":>10}{"worst step":>12}')
+    for name, check in (('inline', pbkdf2_sha256.verify), ('pool', pool.verify)):
+        result = storm(clients, check)
+        print(f'{name:8}{result["elapsed"]:>7.2f}s{result["refused"]:>9}'
+              f'{result["p50"] * 1000:>7.0f}ms{result["p95"] * 1000:>7.0f}ms'
+              f'{result["p99"] * 1000:>7.0f}ms'
+              f'{result["steps"] / result["expected_steps"]:>10.0%}'
+              f'{result["worst_step"] * 1000:>10.1f}ms')
+    print(f'pool: {pool.report()}')
+    pool.stop()
+
+
+if __name__ == '__main__':
+    main()
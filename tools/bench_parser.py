@@ -0,0 +1,77 @@
+"""
+Parse cost per command.
+
+Times verb lookup the old way (getattr on CommandList, then AliasList)
+against the Parser's CommandTable, and whole Parser.parse() calls (with
+metrics off, then on), on a player standing in an in-memory room
+(nothing touches the database).
+
+    python -m tools.bench_parser [iterations]
+"""
+import os
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_parser.db')}"
+
+from engine import Parser
+from engine.commands import AliasList, CommandList
+import orm.db as db
+from orm import metrics
+from orm.models import Room, Item, Player
+
+VERBS = ['look', 'l', 'inventory', 'inv', 'invent', 'n', 'north', 'say', 'get', 'xyzzy']
+COMMANDS = ['look', 'l', 'inventory', 'inv', 'invent', 'lo', 'get sword', 'get the sword',
+            'n', 'so', 'say hello there', "'hi", 'xyzzy']
+
+
+class NullIO:
+    def print(self, message: str = '', **kwargs) -> None:
+        pass
+
+
+def legacy_lookup(verb: str):
+    command = getattr(CommandList, verb, None)
+    alias = getattr(AliasList, verb, None)
+    return command or alias
+
+
+def per_call(func, args: list, iterations: int) -> float:
+    """Mean microseconds per call of func over args."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for arg in args:
+            func(arg)
+    return (time.perf_counter() - started) / (iterations * len(args)) * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    parser = Parser()
+
+    room = Room(name='Hall', noun='hall', description='A long hall.', owner_id=None)
+    player = Player(username='bench', name='Bench', noun='bench', description='Benching.')
+    player.owner = room
+    for name in ('sword', 'shield', 'torch'):
+        Item(name=name, noun=name, description=f'A {name}.').owner = room
+    player.io = NullIO()
+
+    def parse(command):
+        parser.parse(player, command)
+        db.action_queue.clear()   # nothing processes the actions here
+
+    print(f'{"":<26}{"us/call":>9}')
+    print(f'{"getattr lookup":<26}{per_call(legacy_lookup, VERBS, iterations):>9.3f}')
+    print(f'{"CommandTable.lookup":<26}{per_call(parser.commands.lookup, VERBS, iterations):>9.3f}')
+    print(f'{"Parser.parse":<26}{per_call(parse, COMMANDS, iterations // 10):>9.3f}')
+    metrics.enabled = True
+    print(f'{"Parser.parse, metrics on":<26}{per_call(parse, COMMANDS, iterations // 10):>9.3f}')
+    metrics.enabled = False
+    for command in COMMANDS:
+        print(f'  {command:<24}{per_call(parse, [command], iterations // 10):>9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Route queries on a generated world.
+
+Builds a RoomGraph for a square grid of rooms (100k+ by default) with a
+share of the exits knocked out, then times random route queries, exit
+changes (patches) and compaction. Nothing touches the database.
+
+    python -m tools.bench_pathfinding [rooms] [queries]
+"""
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_pathfinding.db')}"
+
+import engine  # noqa: F401  (engine must be imported before orm)
+from orm.graph import RoomGraph
+
+MISSING = 0.2       # share of grid exits left out, so routes have to wind
+
+
+def grid(rooms: int, rng: random.Random) -> tuple[int, list]:
+    side = math.isqrt(rooms - 1) + 1
+    exits = []
+    for n in range(side * side):
+        x, y = n % side, n // side
+        for direction, back, dx, dy in (('east', 'west', 1, 0), ('south', 'north', 0, 1)):
+            if x + dx < side and y + dy < side and rng.random() > MISSING:
+                to = (y + dy) * side + x + dx
+                exits += [(n, to, direction), (to, n, back)]
+    return side, exits
+
+
+def percentile(times: list, p: float) -> float:
+    return sorted(times)[min(len(times) - 1, int(len(times) * p))] * 1000
+
+
+def main():
+    rooms = int(sys.argv[1]) if len(sys.argv) > 1 else 102_400
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(1995)
+    side, exits = grid(rooms, rng)
+
+    graph = RoomGraph()
+    started = time.perf_counter()
+    graph.build(range(side * side), exits)
+    print(f'{side * side} rooms, {len(exits)} exits: built in '
+          f'{(time.perf_counter() - started) * 1000:.0f}ms')
+
+    for label, near in (('random pairs', None), ('within 20 rooms', 20)):
+        times, lengths, unreachable = [], [], 0
+        for _ in range(queries):
+            start = rng.randrange(side * side)
+            if near:
+                x = min(side - 1, max(0, start % side + rng.randint(-near, near)))
+                y = min(side - 1, max(0, start // side + rng.randint(-near, near)))
+                goal = y * side + x
+            else:
+                goal = rng.randrange(side * side)
+            started = time.perf_counter()
+            route = graph.route(start, goal)
+            times.append(time.perf_counter() - started)
+            if route is None:
+                unreachable += 1
+            else:
+                lengths.append(len(route))
+        print(f'{label:<16} p50 {percentile(times, 0.5):7.2f}ms  p95 {percentile(times, 0.95):7.2f}ms'
+              f'  mean route {sum(lengths) / max(len(lengths), 1):.0f} steps'
+              f'  unreachable {unreachable}')
+
+    # exit changes: re-point a room's exits without rebuilding
+    started = time.perf_counter()
+    for n in rng.sample(range(side * side), 1000):
+        graph.patched[n] = graph.exits_from(n)[:1]
+    patch_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    graph.compact()
+    print(f'1000 patches in {patch_seconds * 1000:.1f}ms, compacted in '
+          f'{(time.perf_counter() - started) * 1000:.0f}ms')
+
+
+if __name__ == '__main__':
+    main()
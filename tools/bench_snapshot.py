@@ -0,0 +1,92 @@
+"""
+World load time: database versus snapshot.
+
+Builds a world of N objects in a throwaway SQLite database, then times
+World.load() against writing and loading a snapshot of it, and checks the
+two worlds match.
+
+    python -m tools.bench_snapshot [objects]
+"""
+import os
+import sys
+import tempfile
+import time
+
+WORK_DIR = tempfile.mkdtemp()
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(WORK_DIR, 'bench_snapshot.db')}"
+
+import engine  # noqa: F401  (engine must be imported before orm)
+import orm.db as db
+from orm.models import Base, Room, Exit, Item, Creature, Player
+from orm.world import World
+
+ROOM_SHARE = 10     # one object in ROOM_SHARE is a room
+
+
+def seed(count: int) -> None:
+    """Rooms in a ring, each holding items and creatures; some players."""
+    Base.metadata.create_all(db.sql_engine)
+    rooms = max(2, count // ROOM_SHARE)
+    with db.session_scope() as session:
+        ring = [Room(id=n, name=f'Room {n}', noun='room',
+                     description=f'Room number {n}.', owner_id=None)
+                for n in range(rooms)]
+        session.add_all(ring)
+        session.flush()
+        for n, room in enumerate(ring):
+            session.add(Exit('east', room, ring[(n + 1) % rooms]))
+            session.add(Exit('west', room, ring[n - 1]))
+        for n in range(rooms, count):
+            room = n % rooms
+            if n % 50 == 0:
+                player = Player(id=n, username=f'player{n}', name=f'Player{n}',
+                                noun=f'player{n}', description='A player.',
+                                owner_id=room, hp_max=10)
+                player.password_hash = 'x'
+                session.add(player)
+            elif n % 3:
+                session.add(Item(id=n, name=f'sword {n}', noun='sword', adjectives=['rusty'],
+                                 description='A sword.', owner_id=room, stats={'damage': n % 7}))
+            else:
+                session.add(Creature(id=n, name=f'rat {n}', noun='rat',
+                                     description='A rat.', owner_id=room, hp_max=3))
+
+
+def fingerprint(world: World) -> list:
+    columns = ('id', 'owner_id', 'object_type', 'name', 'noun', 'adjectives', 'description',
+               'article', 'Str', 'Dex', 'Int', 'hp', 'hp_max', 'username', 'password_hash',
+               'stats')
+    objects = [tuple(getattr(obj, column, None) for column in columns)
+               + (tuple(o.id for o in obj.inventory),)
+               for obj in sorted(world.objects.values(), key=lambda o: o.id)]
+    exits = [(e.id, e.direction, e.from_room.id, e.to_room.id)
+             for e in sorted(world.exits.values(), key=lambda e: e.id)]
+    return objects + exits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    path = os.path.join(WORK_DIR, 'bench.snapshot')
+    started = time.perf_counter()
+    seed(count)
+    print(f'seeded {count} objects in {time.perf_counter() - started:.1f}s')
+
+    from_db = World(db.session_factory(autoflush=False), db.world_lock)
+    started = time.perf_counter()
+    from_db.load()
+    db_seconds = time.perf_counter() - started
+    from_db.save_snapshot(path)
+
+    from_snapshot = World(db.session_factory(autoflush=False), db.world_lock)
+    started = time.perf_counter()
+    from_snapshot.load_snapshot(path)
+    snapshot_seconds = time.perf_counter() - started
+
+    same = fingerprint(from_db) == fingerprint(from_snapshot)
+    print(f'database {db_seconds:.2f}s, snapshot {snapshot_seconds:.2f}s '
+          f'({os.path.getsize(path) / 1e6:.1f} MB); worlds match: {same}')
+    sys.exit(0 if same and not from_snapshot.dirty else 1)
+
+
+if __name__ == '__main__':
+    main()
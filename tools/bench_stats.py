@@ -0,0 +1,89 @@
+"""
+Regeneration step cost, object by object against the StatStore.
+
+Makes N creatures (ORM objects, never flushed), most of them at full
+health, and a few poisoned, then times one regeneration step done two
+ways:
+
+    each    a loop over every Creature reading and setting hp
+    store   StatStore.step() on the columns, then setting hp only on the
+            creatures whose hit points changed
+
+and how many creatures each one writes to.
+
+    python -m tools.bench_stats [creatures ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_stats.db')}"
+
+import engine  # noqa: F401  (engine must be imported before orm)
+from orm.models import Creature
+from orm.stats import StatStore, EFFECTS
+from ini import REGEN_HP
+
+HURT = 0.1          # share of creatures below hp_max
+POISONED = 0.01     # share of creatures poisoned
+STEPS = 10
+
+
+def setup(count: int) -> tuple[list, StatStore]:
+    rng = random.Random(1995)
+    creatures = []
+    for n in range(count):
+        creature = Creature(name=f'rat{n}', noun='rat', description='A rat.',
+                            hp_max=rng.randint(10, 50))
+        if rng.random() < HURT:
+            creature.hp = rng.randint(1, creature.hp_max)
+        creatures.append(creature)
+    stats = StatStore()
+    stats.build(creatures)
+    for creature in rng.sample(creatures, int(count * POISONED)):
+        stats.afflict(creature, 'poisoned', STEPS * 100)
+    return creatures, stats
+
+
+def each(creatures: list) -> int:
+    ''' The same rules, one creature at a time. '''
+    written = 0
+    for creature in creatures:
+        if creature.hp <= 0:
+            continue
+        hp = min(creature.hp + REGEN_HP, max(creature.hp_max, creature.hp))
+        creature.hp = hp
+        written += 1
+    return written
+
+
+def store(stats: StatStore) -> int:
+    changed = stats.step(REGEN_HP)
+    for creature, hp in changed:
+        creature.hp = hp
+    return len(changed)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1000, 10_000, 100_000]
+    print(f'{HURT:.0%} hurt, {POISONED:.0%} poisoned ({EFFECTS["poisoned"]} hp a step); '
+          f'mean of {STEPS} steps')
+    print(f'{"creatures":>10}{"each":>11}{"writes":>9}{"store":>11}{"writes":>9}')
+    for size in sizes:
+        creatures, stats = setup(size)
+        started = time.perf_counter()
+        each_writes = sum(each(creatures) for _ in range(STEPS)) / STEPS
+        each_seconds = (time.perf_counter() - started) / STEPS
+        creatures, stats = setup(size)
+        started = time.perf_counter()
+        store_writes = sum(store(stats) for _ in range(STEPS)) / STEPS
+        store_seconds = (time.perf_counter() - started) / STEPS
+        print(f'{size:>10}{each_seconds * 1000:>9.2f}ms{each_writes:>9.0f}'
+              f'{store_seconds * 1000:>9.2f}ms{store_writes:>9.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""
+Syscalls per command for the telnet input path.
+
+Compares the old per-byte reader (recv(1) + send(1) for every keystroke)
+against TelnetIO.input itself, over a socketpair, for a line-mode client
+(one packet per command) and a pasted burst of commands (everything in one
+packet). Both send a prompt before each command, as the game does.
+
+    python -m tools.bench_telnet_input [commands]
+"""
+import os
+import socket
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_telnet_input.db')}"
+
+from engine.io import TelnetIO
+
+COMMANDS = [b'look\r\n', b'get rusty sword\r\n', b'north\r\n',
+            b"say hello there\r\n", b'inventory\r\n']
+
+
+class CountingSocket:
+    """
+    Socket proxy that counts the reads and writes; anything else (select()
+    asking for fileno(), setblocking() and the like) goes straight through.
+    """
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def recv(self, size):
+        self.calls += 1
+        return self.sock.recv(size)
+
+    def recv_into(self, buffer):
+        self.calls += 1
+        return self.sock.recv_into(buffer)
+
+    def send(self, data):
+        self.calls += 1
+        return self.sock.send(data)
+
+    def sendall(self, data):
+        self.calls += 1
+        return self.sock.sendall(data)
+
+
+def legacy_input(connection) -> str:
+    """The per-byte reader TelnetIO.input used to have."""
+    connection.sendall(b' >> ')
+    line = ''
+    while True:
+        byte = connection.recv(1)
+        if not byte:
+            raise ConnectionError("Client disconnected")
+        if byte == b'\xff':
+            connection.recv(1)
+            connection.recv(1)
+            continue
+        if byte == b'\r':
+            continue
+        if byte == b'\n':
+            connection.send(b'\r\n')
+            return line.strip().lower()
+        if byte == b'\x7f' or byte == b'\x08':
+            if line:
+                line = line[:-1]
+                connection.send(b'\x08 \x08')
+            continue
+        if byte.isascii():
+            line += byte.decode()
+            connection.send(byte)
+
+
+def buffered_input(connection):
+    """The real TelnetIO.input."""
+    return TelnetIO(None, connection).input
+
+
+def run(reader_factory, commands: int, burst: bool):
+    server, client = socket.socketpair()
+    counting = CountingSocket(server)
+    read = reader_factory(counting)
+    payload = [COMMANDS[i % len(COMMANDS)] for i in range(commands)]
+    start = time.perf_counter()
+    if burst:
+        client.sendall(b''.join(payload))
+    for each in payload:
+        if not burst:
+            client.sendall(each)
+        read()
+        client.setblocking(False)
+        try:
+            while client.recv(65536):   # drain our prompts and echo
+                pass
+        except BlockingIOError:
+            pass
+        client.setblocking(True)
+    elapsed = time.perf_counter() - start
+    server.close()
+    client.close()
+    return counting.calls / commands, elapsed / commands * 1e6
+
+
+def main():
+    commands = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    legacy = lambda connection: (lambda: legacy_input(connection))
+    print(f'{"reader":<10}{"client":<12}{"syscalls/cmd":>14}{"us/cmd":>10}')
+    for name, factory in (('legacy', legacy), ('buffered', buffered_input)):
+        for mode, burst in (('line mode', False), ('paste', True)):
+            calls, micros = run(factory, commands, burst)
+            print(f'{name:<10}{mode:<12}{calls:>14.2f}{micros:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Regeneration with zones asleep, and the cost of waking one.
+
+Spreads N creatures (ORM objects, never flushed) over ZONES zones, hurts
+them all, then times a regeneration step over the whole world against one
+over the few zones with players in, and the fast-forward when a zone that
+slept through STEPS steps wakes.
+
+    python -m tools.bench_zones [creatures] [active zones]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+# never connected to, but orm.db needs somewhere to point
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_zones.db')}"
+
+import engine  # noqa: F401  (engine must be imported before orm)
+from orm.models import Room, Creature
+from orm.presence import Presence
+from orm.stats import StatStore
+from orm.zones import Zones
+from ini import ZONE_SIZE, REGEN_HP
+
+ZONES = 100
+STEPS = 50
+
+
+class BenchWorld():
+    ''' Just what Zones reads from a World. '''
+    def __init__(self, rooms: dict, stats: StatStore):
+        self.rooms = rooms
+        self.stats = stats
+
+
+def setup(count: int) -> Zones:
+    rng = random.Random(1995)
+    rooms = {zone * ZONE_SIZE: Room(id=zone * ZONE_SIZE, name=f'Zone {zone}',
+                                    noun='room', description='Empty.')
+             for zone in range(ZONES)}
+    creatures = []
+    for n in range(count):
+        creature = Creature(name=f'rat{n}', noun='rat', description='A rat.', hp_max=100)
+        creature.owner = rooms[(n % ZONES) * ZONE_SIZE]
+        creature.hp = rng.randint(1, 50)
+        creatures.append(creature)
+    stats = StatStore()
+    stats.build(creatures)
+    return Zones(Presence(lambda player, message: None, ZONE_SIZE),
+                 BenchWorld(rooms, stats), ZONE_SIZE, idle=0, regen=REGEN_HP)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    awake = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    zones = setup(count)
+    stats = zones.world.stats
+    for zone in range(awake):
+        zones.wake(zone)
+
+    started = time.perf_counter()
+    for _ in range(STEPS):
+        stats.step(REGEN_HP)
+    everything = (time.perf_counter() - started) / STEPS
+
+    zones = setup(count)
+    stats = zones.world.stats
+    for zone in range(awake):
+        zones.wake(zone)
+    started = time.perf_counter()
+    for _ in range(STEPS):
+        stats.step(REGEN_HP, zones.active_rows())
+    active = (time.perf_counter() - started) / STEPS
+
+    report = zones.report()
+    started = time.perf_counter()
+    zones.wake(ZONES - 1)
+    wake = time.perf_counter() - started
+
+    print(f'{count} creatures in {ZONES} zones, {awake} awake ({report})')
+    print(f'step, every zone      {everything * 1000:7.2f}ms')
+    print(f'step, awake zones     {active * 1000:7.2f}ms')
+    print(f'wake after {STEPS} steps  {wake * 1000:7.2f}ms '
+          f'({count // ZONES} creatures fast-forwarded)')
+
+
+if __name__ == '__main__':
+    main()
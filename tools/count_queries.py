@@ -0,0 +1,192 @@
+"""
+SQL statements issued per command.
+
+Builds a small world in a throwaway SQLite database, then runs look, get,
+drop and go through the real Parser and action processor, counting the
+statements each one sends to the database. Counts are checked against
+EXPECTED, and must not depend on how crowded the room is (--crowd), so a
+change that brings back an N+1 pattern fails loudly:
+
+    python -m tools.count_queries [--crowd N] [-v]
+
+"world" runs after World.load(), with WRITE_BEHIND on as configured, where
+every command should be served from memory. "lazy" then runs with
+WRITE_BEHIND off: it starts from an empty world session, exercising the
+relationship loading strategies in orm/models.py, and every action
+commits as it goes. tests/test_queries.py runs the same checks.
+
+Output is counted too: the socket writes each command costs the player
+and a bystander, which coalescing (see TelnetIO.flush) keeps to one per
+flush point, however many lines are printed. Those are checked against
+EXPECTED_WRITES.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'count_queries.db')
+os.environ['DB_URL'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import event
+
+from engine import Parser
+from engine.io import IOHandler
+import orm.db as db
+from orm.models import Base, Room, Exit, Item, Creature, Player
+
+SCRIPT = ['look', 'get sword', 'drop sword', 'north', 'look']
+# statements expected for login, then each command of SCRIPT
+# (lazy: get, drop and the move each commit one UPDATE)
+EXPECTED = {
+    'lazy':  [6, 0, 1, 1, 4, 0],
+    'world': [0, 0, 0, 0, 0, 0],
+}
+# writes to (the player, the bystander) for each command of SCRIPT: the
+# player gets one with the prompt, plus one at the end of the action tick
+# when an action has something to tell them; a bystander gets one per tick
+EXPECTED_WRITES = [(1, 0), (1, 1), (1, 1), (2, 1), (1, 0)]
+
+
+class CaptureIO(IOHandler):
+    """
+    Collects output instead of sending it anywhere, counting writes as
+    TelnetIO does: everything printed since the last flush is one write.
+    """
+    def __init__(self):
+        super().__init__(parser=None)
+        self.output = []
+        self.queued = []
+
+    def print(self, message: str = '', **kwargs) -> None:
+        self.prints += 1
+        self.queued.append(message)
+
+    def flush(self, wait: bool = True) -> None:
+        if self.queued:
+            self.output.extend(self.queued)
+            self.queued.clear()
+            self.writes += 1
+
+    def prompt(self) -> None:
+        """What TelnetIO.input does before it waits: send the prompt, with anything queued."""
+        self.output.extend(self.queued)
+        self.queued.clear()
+        self.writes += 1
+
+    def input(self, prompt: str|None = None) -> str:
+        raise EOFError
+
+
+def seed(crowd: int) -> tuple[int, int]:
+    """Create the test world; return the ids of the player and a bystander."""
+    Base.metadata.create_all(db.sql_engine)
+    with db.session_scope() as session:
+        hall = Room(name='Hall', noun='hall', description='A long hall.', owner_id=None)
+        kitchen = Room(name='Kitchen', noun='kitchen', description='A kitchen.', owner_id=None)
+        session.add_all([hall, kitchen])
+        session.flush()
+        session.add_all([Exit('north', hall, kitchen), Exit('south', kitchen, hall)])
+        for name in ('sword', 'shield', 'torch'):
+            session.add(Item(name=name, noun=name, description=f'A {name}.',
+                             owner_id=hall.id, stats={}))
+        # a crowded room, so per-object loading shows up as large counts
+        for n in range(crowd):
+            session.add(Item(name=f'pebble{n}', noun='pebble', description='A pebble.',
+                             owner_id=hall.id, stats={}))
+            session.add(Creature(name=f'rat{n}', noun='rat', description='A rat.',
+                                 owner_id=hall.id, hp_max=3))
+        session.add(Item(name='pot', noun='pot', description='A pot.',
+                         owner_id=kitchen.id, stats={}))
+        tester = Player(username='tester', name='Tester', noun='tester',
+                        description='Testing.', owner_id=hall.id)
+        cook = Player(username='cook', name='Cook', noun='cook',
+                      description='Cooking.', owner_id=hall.id)
+        for player in (tester, cook):
+            player.set_password('password')
+        session.add_all([tester, cook])
+        session.flush()
+        session.add(Item(name='coin', noun='coin', description='A coin.',
+                         owner_id=tester.id, stats={}))
+        return tester.id, cook.id
+
+
+def run(mode: str, player_ids: tuple[int, int], statements: list, verbose: bool) -> list:
+    """Play the script; return (mode, command, statements issued, writes) rows."""
+    db.SQL.close()
+    db.world.loaded = False
+    write_behind = mode == 'world'
+    db.WRITE_BEHIND = write_behind
+    db.SQL.autoflush = not write_behind
+    if mode == 'world':
+        db.world.load()
+    parser = Parser()
+    results = []
+
+    statements.clear()
+    player = db.load_player(player_ids[0])
+    player.io = CaptureIO()
+    db.presence.enter(player)
+    results.append((mode, 'login', list(statements), None))
+
+    # someone to see our comings and goings
+    other = db.load_player(player_ids[1])
+    other.io = CaptureIO()
+    db.presence.enter(other)
+
+    for command in SCRIPT:
+        statements.clear()
+        writes = player.io.writes, other.io.writes
+        with db.world_lock:
+            parser.parse(player, command)
+        # the session thread prompts straight away; the action thread
+        # flushes what its actions printed once the queue is empty
+        player.io.prompt()
+        db.run_pending()
+        results.append((mode, command, list(statements),
+                        (player.io.writes - writes[0], other.io.writes - writes[1])))
+
+    if verbose:
+        print('\n'.join(player.io.output))
+        print('\n'.join(other.io.output))
+    for someone in (player, other):
+        db.presence.leave(someone)
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='SQL statements issued per command.')
+    arg_parser.add_argument('--crowd', type=int, default=20,
+                            help='extra items and creatures in the starting room')
+    arg_parser.add_argument('-v', dest='verbose', action='store_true',
+                            help='show the output and every statement')
+    args = arg_parser.parse_args()
+    verbose = args.verbose
+    player_ids = seed(args.crowd)
+    statements = []
+    event.listen(db.sql_engine, 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    failed = False
+    print(f'{"":22}{"statements":>18}{"writes (you, other)":>24}')
+    print(f'{"mode":<8}{"command":<14}{"expected":>9}{"counted":>9}{"expected":>12}{"counted":>12}')
+    # world first: lazy commits, and would leave the player in the kitchen
+    for mode in ('world', 'lazy'):
+        results = run(mode, player_ids, statements, verbose)
+        for (mode, command, issued, writes), expected, expected_writes in zip(
+                results, EXPECTED[mode], [None] + EXPECTED_WRITES):
+            mark = '' if len(issued) == expected and writes == expected_writes \
+                else '  <-- MISMATCH'
+            failed |= bool(mark)
+            shown = '-' if writes is None else '%d, %d' % writes
+            shown_expected = '-' if expected_writes is None else '%d, %d' % expected_writes
+            print(f'{mode:<8}{command:<14}{expected:>9}{len(issued):>9}'
+                  f'{shown_expected:>12}{shown:>12}{mark}')
+            if verbose or mark:
+                for statement in issued:
+                    print('        ' + ' '.join(statement.split())[:150])
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""
+Inspect the action journal.
+
+Lists the actions journaled since the last checkpoint, i.e. what recover()
+would replay on the next startup (--all lists every record in the file).
+
+    python -m tools.journal [path] [--all]
+"""
+import argparse
+import time
+
+import engine  # noqa: F401  (engine must be imported before orm)
+from orm.journal import Journal, decode_all, CHECKPOINT
+import ini
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('path', nargs='?', default=ini.JOURNAL_PATH)
+    arg_parser.add_argument('--all', action='store_true',
+                            help='include records from before the last checkpoint')
+    args = arg_parser.parse_args()
+
+    if args.all:
+        with open(args.path, 'rb') as f:
+            records = [record for record, _ in decode_all(f.read())]
+    else:
+        records = list(Journal(args.path).read())
+
+    for record in records:
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.time))
+        if record.kind == CHECKPOINT:
+            print(f'{record.seq:>10} {when}  -- checkpoint --')
+            continue
+        arg = f'#{record.arg}' if record.arg_is_object else repr(record.arg)
+        print(f'{record.seq:>10} {when}  {record.action}'
+              f' subject=#{record.subject_id} target=#{record.target_id} arg={arg}')
+    print(f'{len(records)} records')
+
+
+if __name__ == '__main__':
+    main()
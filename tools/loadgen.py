@@ -0,0 +1,375 @@
+"""
+How many players can the server take? A headless load generator.
+
+Starts the real server in-process on a throwaway SQLite database (a grid
+of rooms with things lying about, and an account for every simulated
+player) and connects N telnet clients to it from one asyncio loop. Each
+logs in, then plays until the run ends: walking, looking, talking,
+picking things up and putting them down again, either at random or by
+cycling through --script, with a random pause (mean --think seconds)
+between commands. Clients connect over --ramp seconds, as players would
+after a restart.
+
+Reports logins, commands a second, and command-to-prompt latency (from
+sending a command to the server asking for the next one) at p50, p95 and
+p99, overall and by command, and writes the same as JSON (--output) to
+compare across commits:
+
+    python -m tools.loadgen [--clients N] [--duration S] [--async] [--output FILE]
+
+--connect HOST:PORT plays against a server that is already running
+instead; clients then create new characters rather than log in.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CWD = os.getcwd()
+WORKDIR = tempfile.mkdtemp()
+# the server's stand-in database; its journal and snapshot land next to it
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'loadgen.db')}"
+os.chdir(WORKDIR)
+
+from passlib.hash import pbkdf2_sha256
+
+PASSWORD = 'loadgen'
+LOGIN_MENU = b'[C]reate character'
+PROMPT = b' >> '
+# the random mix of commands, by weight; {item} is something found in every room
+MIX = [('look', 3), ('north', 2), ('south', 2), ('east', 2), ('west', 2),
+       ('say hello there', 2), ('get {item}', 1), ('drop {item}', 1),
+       ('inventory', 1), ('who', 1)]
+ITEMS = ('rock', 'stick', 'bone')
+
+
+def percentiles(samples: list, *points: float) -> list[float]:
+    ''' Percentiles (0-100) of `samples`, 0 if there are none. '''
+    samples = sorted(samples)
+    if not samples:
+        return [0.0 for _ in points]
+    return [samples[min(len(samples) - 1, int(len(samples) * point / 100))]
+            for point in points]
+
+
+def seed(clients: int, width: int, rng: random.Random) -> list[str]:
+    ''' A width x width grid of rooms, and an account for each client; return their usernames. '''
+    import engine  # noqa: F401  (engine must be imported before orm)
+    import orm.db as db
+    from orm.models import Base, Room, Exit, Item, Player
+
+    Base.metadata.create_all(db.sql_engine)
+    # stored with few rounds so logging in doesn't dominate the run
+    password_hash = pbkdf2_sha256.using(rounds=1000).hash(PASSWORD)
+    usernames = [f'load{n}' for n in range(clients)]
+    with db.session_scope() as session:
+        rooms = [Room(id=n, name=f'Room {n}', noun='room', description='A plain room.',
+                      owner_id=None) for n in range(width * width)]
+        session.add_all(rooms)
+        session.flush()
+        for n, room in enumerate(rooms):
+            x, y = n % width, n // width
+            if x + 1 < width:
+                session.add_all([Exit('east', room, rooms[n + 1]),
+                                 Exit('west', rooms[n + 1], room)])
+            if y + 1 < width:
+                session.add_all([Exit('south', room, rooms[n + width]),
+                                 Exit('north', rooms[n + width], room)])
+            for name in ITEMS:
+                session.add(Item(name=name, noun=name, description=f'A {name}.',
+                                 owner_id=room.id, stats={}))
+        for username in usernames:
+            player = Player(username=username, name=username.capitalize(), noun=username,
+                            description='A simulated player.', article=False,
+                            owner_id=rng.randrange(width * width))
+            player.password_hash = password_hash
+            session.add(player)
+    return usernames
+
+
+def start_server(use_async: bool) -> tuple[object, int]:
+    ''' Start the game as main.py does, on a free local port; return the server and port. '''
+    from engine import GameServer, AsyncGameServer, scheduler, auth
+    from orm import process_actions, world, load_world, recover, do, zones, accounts
+    import ini
+
+    auth.start()
+    if ini.WRITE_BEHIND:
+        load_world()
+        recover()
+        world.start_checkpointer(ini.CHECKPOINT_INTERVAL)
+    accounts.load()
+    threading.Thread(target=process_actions, daemon=True).start()
+    zones.scheduler = scheduler
+    scheduler.start()
+    scheduler.every(ini.COMBAT_ROUND, do, None, 'combat_round', None, None)
+    scheduler.every(ini.REGEN_INTERVAL, do, None, 'regenerate', None, None)
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = (AsyncGameServer if use_async else GameServer)('127.0.0.1', port)
+    threading.Thread(target=server.start, daemon=True).start()
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port)).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+    return server, port
+
+
+def stop_server(server) -> None:
+    from engine import scheduler, auth
+    from orm import world
+
+    server.stop()
+    scheduler.stop()
+    auth.stop()
+    if world.loaded:
+        world.stop()
+
+
+class Client:
+    ''' One simulated player. '''
+    def __init__(self, username: str, create: bool, script: list[str]|None,
+                 think: float, rng: random.Random):
+        self.username = username
+        self.create = create
+        self.script = script
+        self.think = think
+        self.rng = rng
+        self.reader: asyncio.StreamReader|None = None
+        self.writer: asyncio.StreamWriter|None = None
+        self.buffer = b''
+        self.login_latency: float|None = None
+        self.login_retries = 0
+        self.latencies: dict[str, list[float]] = {}    # verb -> seconds
+        self.errors = 0
+
+    async def expect(self, *markers: bytes, timeout: float = 30) -> bytes:
+        ''' Read until one of `markers` arrives; return it, dropping everything up to it. '''
+        deadline = time.monotonic() + timeout
+        while True:
+            found = [(self.buffer.find(marker), marker) for marker in markers]
+            found = [(at, marker) for at, marker in found if at >= 0]
+            if found:
+                at, marker = min(found)
+                self.buffer = self.buffer[at + len(marker):]
+                return marker
+            data = await asyncio.wait_for(self.reader.read(4096),
+                                          max(0.0, deadline - time.monotonic()))
+            if not data:
+                raise ConnectionError('server hung up')
+            self.buffer += data
+
+    def send(self, line: str) -> None:
+        self.writer.write(line.encode() + b'\r\n')
+
+    async def login(self, host: str, port: int) -> None:
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        began = time.perf_counter()
+        while True:
+            await self.expect(LOGIN_MENU)
+            if self.create:
+                self.send('c')
+                await self.expect(b'Choose username: ')
+                self.send(self.username)
+                await self.expect(b'Choose password: ')
+            else:
+                self.send('l')
+                await self.expect(b'Username: ')
+                self.send(self.username)
+                await self.expect(b'Password: ')
+            self.send(PASSWORD)
+            if await self.expect(PROMPT, LOGIN_MENU) == PROMPT:
+                break
+            # turned away (the server was busy); try again in a moment
+            self.buffer = LOGIN_MENU
+            self.login_retries += 1
+            await asyncio.sleep(self.rng.uniform(0.5, 1.5))
+        self.login_latency = time.perf_counter() - began
+
+    def next_command(self, turn: int) -> str:
+        if self.script:
+            command = self.script[turn % len(self.script)]
+        else:
+            commands, weights = zip(*MIX)
+            command = self.rng.choices(commands, weights)[0]
+        return command.format(item=self.rng.choice(ITEMS))
+
+    async def play(self, until: float) -> None:
+        turn = 0
+        while time.monotonic() < until:
+            await asyncio.sleep(self.rng.expovariate(1 / self.think) if self.think else 0)
+            command = self.next_command(turn)
+            turn += 1
+            self.buffer = b''   # anything said to us meanwhile
+            began = time.perf_counter()
+            self.send(command)
+            try:
+                await self.expect(PROMPT)
+            except asyncio.TimeoutError:
+                self.errors += 1
+                continue
+            self.latencies.setdefault(command.split()[0], []).append(
+                time.perf_counter() - began)
+
+    async def quit(self) -> None:
+        try:
+            self.send('quit')
+            await self.writer.drain()
+        except Exception:
+            pass
+        self.writer.close()
+
+
+async def run_clients(host: str, port: int, usernames: list[str], args,
+                      rng: random.Random) -> tuple[list[Client], float]:
+    script = [command.strip() for command in args.script.split(',')] if args.script else None
+    clients = [Client(username, args.connect is not None, script, args.think,
+                      random.Random(rng.random())) for username in usernames]
+
+    async def session(n: int, client: Client, until: float) -> None:
+        await asyncio.sleep(args.ramp * n / len(clients))
+        try:
+            await client.login(host, port)
+            await client.play(until)
+        except Exception as e:
+            client.errors += 1
+            print(f'{client.username}: {e!r}', file=sys.stderr)
+        finally:
+            if client.writer:
+                await client.quit()
+
+    began = time.monotonic()
+    until = began + args.ramp + args.duration
+    await asyncio.gather(*(session(n, client, until)
+                           for n, client in enumerate(clients)))
+    return clients, time.monotonic() - began
+
+
+def summarize(clients: list[Client], elapsed: float, args) -> dict:
+    logins = [client.login_latency for client in clients if client.login_latency is not None]
+    every = [latency for client in clients for samples in client.latencies.values()
+             for latency in samples]
+    by_verb: dict[str, list[float]] = {}
+    for client in clients:
+        for verb, samples in client.latencies.items():
+            by_verb.setdefault(verb, []).extend(samples)
+
+    def latency(samples: list) -> dict:
+        p50, p95, p99 = percentiles(samples, 50, 95, 99)
+        return {'count': len(samples), 'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000,
+                'p99_ms': p99 * 1000, 'max_ms': max(samples, default=0) * 1000}
+
+    def git(*command) -> str|None:
+        try:
+            return subprocess.run(['git', *command], cwd=REPO, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+        'when': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'cpus': os.cpu_count(),
+        'config': {'clients': args.clients, 'duration': args.duration, 'ramp': args.ramp,
+                   'think': args.think, 'script': args.script, 'async': args.use_async,
+                   'connect': args.connect, 'grid': args.grid, 'seed': args.seed},
+        'elapsed': elapsed,
+        'logged_in': len(logins),
+        'login_retries': sum(client.login_retries for client in clients),
+        'errors': sum(client.errors for client in clients),
+        'login': latency(logins),
+        'commands': len(every),
+        'commands_per_sec': len(every) / elapsed if elapsed else 0,
+        'latency': latency(every),
+        'by_command': {verb: latency(samples) for verb, samples in sorted(by_verb.items())},
+    }
+
+
+def report(results: dict, out) -> None:
+    config = results['config']
+    if config['connect']:
+        server = f'server at {config["connect"]}'
+    else:
+        server = f'{"asyncio" if config["async"] else "threaded"} server'
+    print(f'{config["clients"]} clients for {config["duration"]}s, {results["cpus"]} cpus, '
+          f'{server}; {results["logged_in"]} logged in '
+          f'({results["login_retries"]} retries), {results["errors"]} errors', file=out)
+    print(f'{results["commands"]} commands, {results["commands_per_sec"]:.1f}/s', file=out)
+    print(f'{"":12}{"count":>8}{"p50":>9}{"p95":>9}{"p99":>9}{"max":>9}', file=out)
+    rows = [('login', results['login']), ('all', results['latency'])]
+    rows += sorted(results['by_command'].items())
+    for name, row in rows:
+        print(f'{name:12}{row["count"]:>8}{row["p50_ms"]:>7.1f}ms{row["p95_ms"]:>7.1f}ms'
+              f'{row["p99_ms"]:>7.1f}ms{row["max_ms"]:>7.1f}ms', file=out)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description='Load test the game server.')
+    arg_parser.add_argument('--clients', type=int, default=50)
+    arg_parser.add_argument('--duration', type=float, default=30,
+                            help='seconds of play once everyone has connected')
+    arg_parser.add_argument('--ramp', type=float, default=5,
+                            help='seconds over which clients connect')
+    arg_parser.add_argument('--think', type=float, default=0.5,
+                            help='mean seconds between a client\'s commands (0 for none)')
+    arg_parser.add_argument('--script', help='comma separated commands to cycle through '
+                                             'instead of a random mix')
+    arg_parser.add_argument('--grid', type=int, default=10,
+                            help='the world is a grid of GRID x GRID rooms')
+    arg_parser.add_argument('--async', dest='use_async', action='store_true',
+                            help='run the asyncio server rather than thread per client')
+    arg_parser.add_argument('--connect', metavar='HOST:PORT',
+                            help='play against a running server instead of starting one')
+    arg_parser.add_argument('--seed', type=int, default=1995)
+    arg_parser.add_argument('--output', help='write the results here as JSON')
+    args = arg_parser.parse_args()
+    rng = random.Random(args.seed)
+    out = sys.stdout
+
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        port = int(port)
+        run = f'{rng.randrange(16 ** 4):04x}'
+        usernames = [f'load{run}x{n}' for n in range(args.clients)]
+        server = None
+    else:
+        usernames = seed(args.clients, args.grid, rng)
+        # the server talks a lot; keep it out of the report
+        log_path = os.path.join(WORKDIR, 'server.log')
+        print(f'Server output in {log_path}', file=out)
+        sys.stdout = open(log_path, 'w')
+        server, port = start_server(args.use_async)
+        host = '127.0.0.1'
+
+    try:
+        clients, elapsed = asyncio.run(run_clients(host, port, usernames, args, rng))
+    finally:
+        if server:
+            stop_server(server)
+            sys.stdout.close()
+            sys.stdout = out
+
+    results = summarize(clients, elapsed, args)
+    report(results, out)
+    if args.output:
+        path = os.path.join(CWD, args.output)
+        with open(path, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f'Results written to {path}', file=out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Write or inspect a world snapshot.
+
+`write` loads the world from the database and writes it as a snapshot
+tagged with the journal's last checkpoint, so the next startup can skip the
+database. Run it while the server is down. `info` shows what a snapshot holds.
+
+    python -m tools.snapshot write [path]
+    python -m tools.snapshot info [path]
+"""
+import argparse
+import os
+
+import engine  # noqa: F401  (engine must be imported before orm)
+import ini
+
+
+def write(path: str) -> None:
+    from orm.db import world, journal
+    seq = 0
+    if journal:
+        seq = journal.checkpoint_seq()
+        if seq is None:
+            if any(True for _ in journal.read()):
+                print("The journal holds actions not yet in the database; "
+                      "start the server once to replay them, then try again")
+                return
+            # nothing journaled: the database is the latest checkpoint
+            journal.open()
+            journal.reset()
+            journal.close()
+            seq = journal.seq
+    world.load()
+    world.save_snapshot(path, seq)
+
+
+def info(path: str) -> None:
+    from orm.snapshot import read_header
+    from orm.journal import Journal
+    seq, objects, exits = read_header(path)
+    print(f'{path}: {objects} objects, {exits} exits, {os.path.getsize(path)} bytes')
+    print(f'taken at checkpoint {seq}', end='')
+    if ini.JOURNAL_PATH:
+        current = Journal(ini.JOURNAL_PATH).checkpoint_seq()
+        print(' (current)' if current == seq else f' (last checkpoint is {current})', end='')
+    print()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arg_parser.add_argument('command', choices=['write', 'info'])
+    arg_parser.add_argument('path', nargs='?', default=ini.SNAPSHOT_PATH)
+    args = arg_parser.parse_args()
+    if args.command == 'write':
+        write(args.path)
+    else:
+        info(args.path)
+
+
+if __name__ == '__main__':
+    main()